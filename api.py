@@ -3,20 +3,220 @@ REST API для калькулятора.
 Предоставляет интерфейс для выполнения математических операций через HTTP запросы.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from calculator import add, subtract, multiply, divide, power
+from calculator import OPERATIONS, OPERATION_NAMES, estimate_cost, get_operation, rounding_name
+from history_store import HistoryEntry, HistoryStore, SQLiteHistoryStore
+from expression_engine import evaluate, normalize
+import metrics
+from profiling import ProfileStore, ProfilingMiddleware, format_stats
+from idempotency import IdempotencyCache, IdempotencyConflict, IdempotencyKeyReused
+from history_events import HistoryBroadcaster, SubscriptionClosed
+from jobs import CANCELLED, JobQueue, JobQueueFull
+from number_format import digit_count, display, is_large, to_decimal_string
+from operation_request import (
+    FLOAT_OVERFLOW_ERROR, NOT_REAL_ERROR, compute_function, evaluate_operation,
+    operation_outcome, parse_mode, parse_operation
+)
+import result_cache
+from single_flight import SingleFlight
+from datetime import datetime
+from decimal import Decimal
+import atexit
+import hashlib
+import io
+import json
 import os
+import time
+
+
+def _json_default(value):
+    """Сериализация записей истории: текст выражения формируется только здесь."""
+    if isinstance(value, HistoryEntry):
+        return value.to_dict()
+    return DefaultJSONProvider.default(value)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """JSON-провайдер Flask, умеющий сериализовать записи истории."""
+    default = staticmethod(_json_default)
+
 
 app = Flask(__name__)
+app.json = JSONProvider(app)
 CORS(app)  # Разрешаем CORS для работы с фронтендом
 
 # Простой API-ключ для авторизации 
 API_KEY = os.getenv('CALCULATOR_API_KEY', 'secret_key_12345')
 
-# История вычислений 
-calculation_history = []
-history_id_counter = 1
+# Ключ администратора для профилирования (пустой - административные функции выключены)
+ADMIN_API_KEY = os.getenv('CALCULATOR_ADMIN_KEY', '')
+
+# Максимальное количество операций в одном пакетном запросе
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 1000))
+
+# Ответы /api/calculate по заголовку Idempotency-Key: повтор запроса с тем же ключом
+# получает сохранённый ответ без повторного вычисления, записи в историю и уведомления
+IDEMPOTENCY_TTL = float(os.getenv('IDEMPOTENCY_TTL', 86400))
+idempotency_cache = IdempotencyCache(
+    max_size=int(os.getenv('IDEMPOTENCY_MAX_KEYS', 10000)), ttl=IDEMPOTENCY_TTL
+)
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# Потоковый режим: уведомления Telegram отправляются блоками такого размера
+STREAM_NOTIFY_CHUNK = 1000
+
+# Список операций для /api/operations формируется один раз при запуске
+OPERATIONS_RESPONSE = {
+    'operations': [
+        {
+            'name': operation.title,
+            'symbol': operation.symbol,
+            'description': operation.description,
+            'endpoint': '/api/calculate',
+            'example': {'operation': operation.name, 'a': operation.example[0], 'b': operation.example[1]}
+        }
+        for operation in OPERATIONS
+    ],
+    'total': len(OPERATIONS)
+}
+# Тело ответа и ETag тоже вычисляются один раз
+OPERATIONS_BODY = app.json.dumps(OPERATIONS_RESPONSE)
+OPERATIONS_ETAG = hashlib.sha1(OPERATIONS_BODY.encode('utf-8')).hexdigest()[:16]
+
+# История вычислений (ограничена HISTORY_MAX_SIZE записями, старые вытесняются).
+# Если задан HISTORY_DB_PATH, история хранится в SQLite и сохраняется между перезапусками.
+HISTORY_MAX_SIZE = int(os.getenv('HISTORY_MAX_SIZE', 100000))
+HISTORY_DB_PATH = os.getenv('HISTORY_DB_PATH', '')
+if HISTORY_DB_PATH:
+    calculation_history = SQLiteHistoryStore(HISTORY_DB_PATH, max_size=HISTORY_MAX_SIZE)
+else:
+    calculation_history = HistoryStore(max_size=HISTORY_MAX_SIZE)
+
+# Размер страницы истории по умолчанию при постраничном выводе (?after_id=)
+HISTORY_PAGE_SIZE = 100
+
+# Рассылка новых записей истории подписчикам /api/history/stream
+history_broadcaster = HistoryBroadcaster(
+    subscriber_queue_size=int(os.getenv('HISTORY_STREAM_QUEUE_SIZE', 1000))
+)
+# Интервал комментариев keep-alive в потоке событий (секунды)
+HISTORY_STREAM_KEEPALIVE = 15.0
+
+# Очередь заданий для дорогих вычислений: вычисления дороже JOB_COST_THRESHOLD
+# (оценка calculator.estimate_cost - цифр результата) выполняются в пуле процессов
+# с лимитом процессорного времени JOB_CPU_LIMIT секунд на задание
+JOB_COST_THRESHOLD = int(os.getenv('JOB_COST_THRESHOLD', 100000))
+JOB_CPU_LIMIT = float(os.getenv('JOB_CPU_LIMIT', 10))
+# Максимальное время ожидания результата в GET /api/jobs/<id>?wait= (секунды)
+JOB_MAX_WAIT = 30.0
+
+# Одинаковые одновременные вычисления точного и десятичного режимов выполняются
+# один раз, остальные запросы ждут их результат (REQUEST_COALESCING=false - выключено).
+# Дорогие вычисления объединяются в очереди заданий (задания с одним ключом).
+# Каждый запрос по-прежнему получает свою запись истории
+REQUEST_COALESCING = os.getenv('REQUEST_COALESCING', 'true').lower() == 'true'
+in_flight_calculations = SingleFlight()
+
+# Префикс ETag истории: версия хранилища считается заново в каждом процессе,
+# поэтому ETag другого процесса или до перезапуска не совпадёт с текущим
+HISTORY_ETAG_PREFIX = os.urandom(4).hex()
+
+# ========== Метрики ==========
+
+# Сбор метрик можно отключить (METRICS_ENABLED=false)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+REQUESTS_TOTAL = metrics.Counter(
+    'calculator_http_requests_total', 'HTTP-запросы по эндпоинтам и кодам ответа',
+    ('endpoint', 'method', 'status')
+)
+REQUEST_SECONDS = metrics.Histogram(
+    'calculator_http_request_duration_seconds', 'Время обработки HTTP-запроса',
+    ('endpoint',)
+)
+OPERATIONS_TOTAL = metrics.Counter(
+    'calculator_operations_total', 'Вычисления по операциям и результату (HTTP-код)',
+    ('operation', 'status')
+)
+OPERATION_SECONDS = metrics.Histogram(
+    'calculator_operation_duration_seconds', 'Время вычисления одной операции',
+    ('operation',)
+)
+TELEGRAM_NOTIFY_SECONDS = metrics.Histogram(
+    'calculator_telegram_notify_duration_seconds',
+    'Время постановки уведомлений Telegram в очередь'
+)
+metrics.GaugeFunction(
+    'calculator_history_entries', 'Количество записей в истории',
+    lambda: len(calculation_history)
+)
+
+
+def _telegram_stats():
+    """Счётчики очереди уведомлений или None, если Telegram не включён."""
+    if not telegram_enabled():
+        return None
+    stats = get_notification_dispatcher().stats()
+    return {(key,): stats[key] for key in ('queue_depth', 'enqueued', 'sent', 'failed', 'dropped')}
+
+
+metrics.GaugeFunction(
+    'calculator_history_stream', 'Рассылка записей истории: подписчики, очередь и счётчики',
+    lambda: {(key,): value for key, value in history_broadcaster.stats().items()}, ('state',)
+)
+metrics.GaugeFunction(
+    'calculator_jobs', 'Очередь заданий: задания, процессы и счётчики',
+    lambda: {(key,): value for key, value in job_queue.stats().items()}, ('state',)
+)
+metrics.GaugeFunction(
+    'calculator_result_cache', 'Кэш результатов операций: записи, память и счётчики',
+    lambda: {(key,): value for key, value in result_cache.shared_cache.stats().items()}, ('state',)
+)
+metrics.GaugeFunction(
+    'calculator_coalesced_calculations', 'Объединение одинаковых одновременных вычислений',
+    lambda: {(key,): value for key, value in in_flight_calculations.stats().items()}, ('state',)
+)
+metrics.GaugeFunction(
+    'calculator_telegram_notifications', 'Очередь уведомлений Telegram: глубина и счётчики',
+    _telegram_stats, ('state',)
+)
+
+
+# ========== Профилирование запросов ==========
+
+# Запрос профилируется по заголовку X-Profile с ключом администратора
+# или случайно с долей PROFILE_SAMPLE_RATE (по умолчанию выключено)
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+profile_store = ProfileStore(max_size=int(os.getenv('PROFILE_STORE_SIZE', 50)))
+request_profiler = ProfilingMiddleware(
+    app.wsgi_app, profile_store, sample_rate=PROFILE_SAMPLE_RATE, admin_key=ADMIN_API_KEY
+)
+app.wsgi_app = request_profiler
+
+
+def validate_admin_key():
+    """Проверяет ключ администратора в заголовке X-Admin-Key."""
+    admin_key = request.headers.get('X-Admin-Key')
+    if not request_profiler.admin_key or admin_key != request_profiler.admin_key:
+        return jsonify({'error': 'Неверный или отсутствующий ключ администратора'}), 401
+    return None
+
+
+@app.before_request
+def _start_timer():
+    g.started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    if METRICS_ENABLED and 'started' in g:
+        # Для неизвестных путей request.endpoint равен None - все они учитываются вместе
+        endpoint = request.endpoint or 'unknown'
+        REQUEST_SECONDS.observe(time.perf_counter() - g.started, endpoint)
+        REQUESTS_TOTAL.inc(endpoint, request.method, response.status_code)
+    return response
 
 
 def validate_api_key():
@@ -27,6 +227,15 @@ def validate_api_key():
     return None
 
 
+def _not_modified(etag):
+    """Возвращает ответ 304, если клиент прислал совпадающий If-None-Match."""
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Проверка работоспособности API."""
@@ -39,54 +248,223 @@ def health_check():
 
 @app.route('/api/operations', methods=['GET'])
 def get_operations():
-    """Получение списка доступных операций."""
+    """
+    Получение списка доступных операций.
+    
+    Поддерживает условный запрос: при совпадении If-None-Match возвращается 304.
+    """
     # Проверка API-ключа
     auth_error = validate_api_key()
     if auth_error:
         return auth_error
     
-    operations = [
-        {
-            'name': 'addition',
-            'symbol': '+',
-            'description': 'Сложение двух чисел',
-            'endpoint': '/api/calculate',
-            'example': {'operation': 'add', 'a': 10, 'b': 5}
-        },
-        {
-            'name': 'subtraction',
-            'symbol': '-',
-            'description': 'Вычитание второго числа из первого',
-            'endpoint': '/api/calculate',
-            'example': {'operation': 'subtract', 'a': 10, 'b': 5}
-        },
-        {
-            'name': 'multiplication',
-            'symbol': '*',
-            'description': 'Умножение двух чисел',
-            'endpoint': '/api/calculate',
-            'example': {'operation': 'multiply', 'a': 10, 'b': 5}
-        },
-        {
-            'name': 'division',
-            'symbol': '/',
-            'description': 'Деление первого числа на второе',
-            'endpoint': '/api/calculate',
-            'example': {'operation': 'divide', 'a': 10, 'b': 5}
-        },
-        {
-            'name': 'power',
-            'symbol': '^',
-            'description': 'Возведение первого числа в степень второго',
-            'endpoint': '/api/calculate',
-            'example': {'operation': 'power', 'a': 2, 'b': 3}
-        }
-    ]
+    not_modified = _not_modified(OPERATIONS_ETAG)
+    if not_modified:
+        return not_modified
     
-    return jsonify({
-        'operations': operations,
-        'total': len(operations)
-    }), 200
+    response = app.response_class(OPERATIONS_BODY, mimetype='application/json')
+    response.set_etag(OPERATIONS_ETAG)
+    return response
+
+
+def _evaluate(data, chat_id):
+    """
+    evaluate_operation, который ставит дорогие вычисления в очередь заданий.
+    
+    Для дорогого вычисления возвращается описание задания с кодом 202;
+    запись в историю и уведомление появятся после его выполнения.
+    """
+    parsed, error = parse_operation(data)
+    if error is not None:
+        return error[0], error[1], None
+    op, a, b, mode, number_context = parsed
+    # Размер результата не ограничен только в точном режиме: десятичный
+    # ограничен точностью контекста, float - разрядностью
+    cost = estimate_cost(op.name, a, b) if mode == 'exact' else 1
+    if cost <= JOB_COST_THRESHOLD or result_cache.shared_cache.get(
+            op.name, a, b, mode, number_context) is not None:
+        # Дешёвое вычисление или результат уже в кэше: ответ сразу
+        return operation_outcome(op, a, b, _coalesced_function(op, mode, number_context))
+    try:
+        # Одинаковые дорогие вычисления выполняются одним процессом,
+        # но каждый запрос получает своё задание и свою запись истории
+        key = _calculation_key(op, a, b, mode, number_context) if REQUEST_COALESCING else None
+        job = job_queue.submit(
+            op.name, a, b, mode, number_context, context={'cost': cost, 'chat_id': chat_id}, key=key
+        )
+    except JobQueueFull as e:
+        return {'error': str(e), 'operation': op.name}, 503, None
+    return job_body(job), 202, None
+
+
+def _coalesced_function(op, mode, context=None):
+    """
+    compute_function, объединяющая одинаковые одновременные вычисления.
+    float не объединяется: ожидание под блокировкой дороже вычисления.
+    """
+    function = compute_function(op, mode, context)
+    if not REQUEST_COALESCING or mode == 'float':
+        return function
+
+    def coalesced(a, b):
+        return in_flight_calculations.do(
+            _calculation_key(op, a, b, mode, context), lambda: function(a, b)
+        )
+    return coalesced
+
+
+def _calculation_key(op, a, b, mode, context=None):
+    """Ключ одинаковых вычислений для объединения запросов и заданий."""
+    # Decimal входит в ключ своей записью: "1.5" и "1.50" дают разные результаты
+    return (
+        op.name, mode,
+        str(a) if type(a) is Decimal else a,
+        str(b) if type(b) is Decimal else b,
+        context.prec if context is not None else None,
+        context.rounding if context is not None else None,
+    )
+
+
+def _evaluate_measured(data, chat_id=None):
+    """_evaluate с учётом времени и результата вычисления в метриках."""
+    if not METRICS_ENABLED:
+        return _evaluate(data, chat_id)
+    started = time.perf_counter()
+    body, status, history_entry = _evaluate(data, chat_id)
+    elapsed = time.perf_counter() - started
+    if history_entry is not None:
+        operation = history_entry['operation']
+    else:
+        # Неизвестные операции не попадают в метки, чтобы их число оставалось ограниченным
+        operation = body.get('operation', 'invalid')
+    OPERATION_SECONDS.observe(elapsed, operation)
+    OPERATIONS_TOTAL.inc(operation, status)
+    return body, status, history_entry
+
+
+def _record_history(entries):
+    """Добавляет записи в историю, присваивая им идентификаторы, и рассылает подписчикам."""
+    calculation_history.extend(entries)
+    history_broadcaster.publish(entries)
+
+
+def _response_for(entry):
+    """
+    Формирует ответ на успешное вычисление по записи истории.
+    Для большого точного результата добавляются количество цифр
+    и адрес выгрузки полной записи.
+    """
+    result = entry['result']
+    response = {
+        'result': display(result),
+        'operation': entry['operation'],
+        'a': display(entry['a']),
+        'b': display(entry['b']),
+        'expression': entry['expression'],
+        'id': entry['id']
+    }
+    if is_large(result):
+        if isinstance(result, int):
+            response['digits'] = digit_count(result)
+        response['result_url'] = f"/api/history/{entry['id']}/result"
+    return response
+
+
+def _job_finished(job):
+    """Записывает результат выполненного задания в историю и отправляет уведомление."""
+    name, a, b, mode, number_context = job.args
+    body, status, history_entry = operation_outcome(
+        get_operation(name), a, b, lambda a, b: job.outcome()
+    )
+    if history_entry is not None:
+        # Повтор того же вычисления не ставится в очередь, а берётся из кэша
+        result_cache.shared_cache.put(name, a, b, job.outcome(), mode, number_context)
+        _record_history([history_entry])
+        body = _response_for(history_entry)
+        notify_telegram([history_entry], job.context['chat_id'])
+    job.context['response'] = (body, status)
+
+
+job_queue = JobQueue(
+    workers=int(os.getenv('JOB_WORKERS', 2)), cpu_limit=JOB_CPU_LIMIT,
+    max_pending=int(os.getenv('JOB_MAX_PENDING', 100)), on_finish=_job_finished
+)
+# Обработчики atexit выполняются в обратном порядке: сначала останавливается
+# очередь заданий, затем записывается очередь записей истории SQLite
+# (поток записи - фоновый и иначе завершился бы вместе с процессом)
+if HISTORY_DB_PATH:
+    atexit.register(calculation_history.close)
+atexit.register(job_queue.shutdown)
+
+
+def job_body(job):
+    """Описание задания для ответов API."""
+    name, a, b, mode, number_context = job.args
+    body = {
+        'job_id': job.id,
+        'status': job.status,
+        'operation': name,
+        'mode': mode,
+        'a': display(a),
+        'b': display(b),
+        'estimated_cost': job.context['cost'],
+        'created': job.created,
+        'started': job.started,
+        'finished': job.finished,
+        'url': f'/api/jobs/{job.id}'
+    }
+    if number_context is not None:
+        body['precision'] = number_context.prec
+        body['rounding'] = rounding_name(number_context)
+    response = job.context.get('response')
+    if response is not None and job.is_finished:
+        # Ответ, который вернул бы /api/calculate, и его код
+        body['result'], body['result_status'] = response
+    return body
+
+
+def telegram_enabled():
+    """Включены ли уведомления Telegram (TELEGRAM_ENABLED)."""
+    return os.getenv('TELEGRAM_ENABLED', 'false').lower() == 'true'
+
+
+def telegram_chat_id(headers):
+    """ID чата для уведомлений: заголовок X-Telegram-Chat-ID или TELEGRAM_CHAT_ID."""
+    return headers.get('X-Telegram-Chat-ID') or os.getenv('TELEGRAM_CHAT_ID')
+
+
+# Диспетчер уведомлений ASGI-версии API; None - общий фоновый диспетчер
+notification_dispatcher = None
+
+
+def get_notification_dispatcher():
+    """Диспетчер уведомлений Telegram, через который работает API."""
+    if notification_dispatcher is not None:
+        return notification_dispatcher
+    from telegram_integration import get_dispatcher
+    return get_dispatcher()
+
+
+def _notify_telegram(entries):
+    """Отправляет уведомления в Telegram о выполненных вычислениях (если настроено)."""
+    notify_telegram(entries, telegram_chat_id(request.headers))
+
+
+def notify_telegram(entries, chat_id):
+    """Ставит уведомления о записях entries в очередь отправки в чат chat_id."""
+    if not telegram_enabled() or not entries:
+        return
+    try:
+        if chat_id:
+            # Уведомления только ставятся в очередь, отправка идёт в фоне
+            dispatcher = get_notification_dispatcher()
+            with TELEGRAM_NOTIFY_SECONDS.time():
+                for entry in entries:
+                    dispatcher.enqueue(entry['expression'], display(entry['result']), chat_id)
+    except Exception as e:
+        # Логируем ошибку, но не прерываем выполнение API
+        import logging
+        logging.error(f"Ошибка при отправке уведомления в Telegram: {e}")
 
 
 @app.route('/api/calculate', methods=['POST'])
@@ -98,7 +476,10 @@ def calculate():
     {
         "operation": "add|subtract|multiply|divide|power",
         "a": число,
-        "b": число
+        "b": число,
+        "mode": "float|exact|decimal"  (необязательно, по умолчанию float),
+        "precision": 28,  (необязательно, только для decimal)
+        "rounding": "half_even"  (необязательно, только для decimal)
     }
     
     Формат ответа:
@@ -110,6 +491,16 @@ def calculate():
         "expression": "10 + 5 = 15",
         "id": 1
     }
+    
+    В точном режиме дробь возвращается строкой "p/q", а результат длиннее
+    EXACT_DISPLAY_DIGITS цифр - строкой в краткой записи с полями digits
+    и result_url (выгрузка всех цифр). В десятичном режиме результат -
+    строка с десятичной записью ("0.3"), кроме целых результатов, точно
+    представимых во float: они вычисляются без Decimal и возвращаются числом.
+    
+    Необязательный заголовок Idempotency-Key: повтор запроса с тем же ключом
+    в течение IDEMPOTENCY_TTL секунд возвращает исходный ответ (с тем же id)
+    и заголовком Idempotent-Replayed: true.
     """
     # Проверка API-ключа
     auth_error = validate_api_key()
@@ -121,100 +512,321 @@ def calculate():
         return jsonify({'error': 'Требуется JSON формат данных'}), 400
     
     data = request.get_json()
+    key = request.headers.get('Idempotency-Key')
+    if not key:
+        return _calculate(data)
     
-    # Валидация входных данных
-    required_fields = ['operation', 'a', 'b']
-    for field in required_fields:
-        if field not in data:
-            return jsonify({
-                'error': f'Отсутствует обязательное поле: {field}'
-            }), 400
-    
-    operation = data['operation'].lower()
-    try:
-        a = float(data['a'])
-        b = float(data['b'])
-    except (ValueError, TypeError):
+    if len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
         return jsonify({
-            'error': 'Поля "a" и "b" должны быть числами'
+            'error': f'Ключ идемпотентности длиннее {MAX_IDEMPOTENCY_KEY_LENGTH} символов'
         }), 400
+    try:
+        stored = idempotency_cache.begin(key, json.dumps(data, sort_keys=True))
+    except IdempotencyKeyReused as e:
+        return jsonify({'error': str(e)}), 422
+    except IdempotencyConflict as e:
+        return jsonify({'error': str(e)}), 409
+    
+    if stored is not None:
+        body, status = stored
+        response = jsonify(body)
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response, status
     
-    # Выполнение операции
     try:
-        if operation == 'add':
-            result = add(a, b)
-            symbol = '+'
-        elif operation == 'subtract':
-            result = subtract(a, b)
-            symbol = '-'
-        elif operation == 'multiply':
-            result = multiply(a, b)
-            symbol = '*'
-        elif operation == 'divide':
-            result = divide(a, b)
-            symbol = '/'
-        elif operation == 'power':
-            result = power(a, b)
-            symbol = '^'
+        response, status = _calculate(data)
+    except Exception:
+        idempotency_cache.abandon(key)
+        raise
+    idempotency_cache.complete(key, (response.get_json(), status))
+    return response, status
+
+
+def _calculate(data):
+    """Вычисление, запись в историю и уведомление для /api/calculate."""
+    body, status, entries = calculate_body(data, telegram_chat_id(request.headers))
+    
+    # Интеграция с Telegram: отправка уведомления (если настроено)
+    _notify_telegram(entries)
+    
+    return jsonify(body), status
+
+
+# ========== Обработка запросов без привязки к Flask ==========
+# Функции ниже получают разобранные данные запроса и возвращают тело ответа
+# и HTTP-код. Их используют и маршруты Flask, и ASGI-версия API (api_async).
+
+def calculate_body(data, chat_id=None):
+    """
+    Вычисление для /api/calculate с записью в историю (без уведомления).
+    Дорогое вычисление ставится в очередь заданий (код 202); chat_id нужен
+    для уведомления о его результате.
+    
+    Returns:
+        tuple: (тело ответа, HTTP-код, записи для уведомления)
+    """
+    body, status, history_entry = _evaluate_measured(data, chat_id)
+    if history_entry is None:
+        return body, status, []
+    
+    # Создание записи в истории
+    _record_history([history_entry])
+    
+    return _response_for(history_entry), 200, [history_entry]
+
+
+def batch_body(data, chat_id=None):
+    """
+    Пакетное вычисление для /api/calculate/batch с записью в историю.
+    Дорогие вычисления ставятся в очередь заданий (элементы с кодом 202).
+    
+    Returns:
+        tuple: (тело ответа, HTTP-код, записи для уведомления)
+    """
+    operations = data.get('operations') if isinstance(data, dict) else data
+    if not isinstance(operations, list):
+        return {
+            'error': 'Поле "operations" должно быть списком операций'
+        }, 400, []
+    
+    if len(operations) > MAX_BATCH_SIZE:
+        return {
+            'error': f'Слишком много операций в запросе (максимум {MAX_BATCH_SIZE})'
+        }, 400, []
+    
+    evaluated = [_evaluate_measured(item, chat_id) for item in operations]
+    
+    # Все успешные вычисления добавляются в историю одним блоком
+    history_entries = [entry for _, _, entry in evaluated if entry is not None]
+    _record_history(history_entries)
+    
+    results = []
+    queued = 0
+    for body, status, history_entry in evaluated:
+        item = _response_for(history_entry) if history_entry is not None else body
+        item['status'] = status
+        results.append(item)
+        if status == 202:
+            queued += 1
+    
+    response = {
+        'results': results,
+        'total': len(results),
+        'succeeded': len(history_entries),
+        'failed': len(results) - len(history_entries) - queued
+    }
+    if queued:
+        response['queued'] = queued
+    return response, 200, history_entries
+
+
+def stream_line(number, line, chat_id=None):
+    """
+    Вычисляет одну строку NDJSON потокового режима.
+    
+    Returns:
+        tuple: (строка ответа, запись истории или None, HTTP-код строки);
+        (None, None, None) для пустой строки
+    """
+    line = line.strip()
+    if not line:
+        return None, None, None
+    try:
+        data = json.loads(line)
+    except ValueError:
+        body, status, history_entry = {'error': 'Некорректный JSON в строке'}, 400, None
+    else:
+        body, status, history_entry = _evaluate_measured(data, chat_id)
+    
+    if history_entry is None:
+        item = body
+    else:
+        # ID нужен в ответе сразу, поэтому запись добавляется в историю до вывода
+        _record_history([history_entry])
+        item = _response_for(history_entry)
+    item['status'] = status
+    item['line'] = number
+    return json.dumps(item, ensure_ascii=False) + '\n', history_entry, status
+
+
+def stream_summary(succeeded, failed, queued=0):
+    """Итоговая строка ответа потокового режима."""
+    summary = {
+        'total': succeeded + failed + queued,
+        'succeeded': succeeded,
+        'failed': failed
+    }
+    if queued:
+        summary['queued'] = queued
+    return json.dumps({'summary': summary}) + '\n'
+
+
+@app.route('/api/calculate/batch', methods=['POST'])
+def calculate_batch():
+    """
+    Выполнение нескольких операций за один запрос.
+    
+    Формат запроса:
+    {
+        "operations": [
+            {"operation": "add", "a": 10, "b": 5},
+            {"operation": "divide", "a": 1, "b": 0}
+        ]
+    }
+    
+    Формат ответа (результаты в порядке запроса, ошибки - по каждому элементу):
+    {
+        "results": [
+            {"result": 15, "operation": "add", ..., "id": 1, "status": 200},
+            {"error": "Деление на ноль невозможно!", ..., "status": 400}
+        ],
+        "total": 2,
+        "succeeded": 1,
+        "failed": 1
+    }
+    """
+    # Проверка API-ключа
+    auth_error = validate_api_key()
+    if auth_error:
+        return auth_error
+    
+    # Проверка наличия данных
+    if not request.is_json:
+        return jsonify({'error': 'Требуется JSON формат данных'}), 400
+    
+    body, status, history_entries = batch_body(request.get_json(), telegram_chat_id(request.headers))
+    
+    _notify_telegram(history_entries)
+    
+    return jsonify(body), status
+
+
+def _stream_results(lines):
+    """
+    Вычисляет записи NDJSON по мере чтения и выдаёт строки ответа.
+    
+    Память не зависит от количества записей: в ней находится только
+    текущий блок записей для уведомлений.
+    """
+    succeeded = failed = queued = 0
+    pending = []
+    chat_id = telegram_chat_id(request.headers)
+    for number, line in enumerate(lines, start=1):
+        output, history_entry, status = stream_line(number, line, chat_id)
+        if output is None:
+            continue
+        if status == 202:
+            queued += 1
+        elif history_entry is None:
+            failed += 1
         else:
-            return jsonify({
-                'error': f'Неизвестная операция: {operation}',
-                'available_operations': ['add', 'subtract', 'multiply', 'divide', 'power']
-            }), 400
-        
+            succeeded += 1
+            # Уведомления Telegram отправляются блоками
+            pending.append(history_entry)
+            if len(pending) >= STREAM_NOTIFY_CHUNK:
+                _notify_telegram(pending)
+                pending = []
+        yield output
+    
+    _notify_telegram(pending)
+    yield stream_summary(succeeded, failed, queued)
+
+
+@app.route('/api/calculate/stream', methods=['POST'])
+def calculate_stream():
+    """
+    Потоковое выполнение операций в формате NDJSON.
+    
+    Тело запроса - по одной записи {"operation", "a", "b"} на строку.
+    Ответ передаётся по частям (chunked), по одной строке на запись в порядке
+    запроса, в том же формате, что элементы ответа /api/calculate/batch,
+    с номером строки "line". Последняя строка - итог {"summary": {...}}.
+    Пустые строки пропускаются.
+    """
+    # Проверка API-ключа
+    auth_error = validate_api_key()
+    if auth_error:
+        return auth_error
+    
+    # Буферизованное чтение: LimitedStream читает строку побайтно
+    lines = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8', errors='replace')
+    return app.response_class(
+        stream_with_context(_stream_results(lines)),
+        mimetype='application/x-ndjson'
+    )
+
+
+@app.route('/api/evaluate', methods=['POST'])
+def evaluate_expression():
+    """
+    Вычисление арифметического выражения.
+    
+    Формат запроса:
+    {
+        "expression": "2 × (3 + 4) ^ 2",
+        "mode": "float|exact|decimal"  (необязательно, по умолчанию float),
+        "precision", "rounding"  (необязательно, только для decimal)
+    }
+    
+    Формат ответа:
+    {
+        "expression": "2 * (3 + 4) ^ 2",
+        "result": 98
+    }
+    """
+    # Проверка API-ключа
+    auth_error = validate_api_key()
+    if auth_error:
+        return auth_error
+    
+    # Проверка наличия данных
+    if not request.is_json:
+        return jsonify({'error': 'Требуется JSON формат данных'}), 400
+    
+    body, status = expression_body(request.get_json())
+    return jsonify(body), status
+
+
+def expression_body(data):
+    """Вычисление выражения для /api/evaluate: (тело ответа, HTTP-код)."""
+    text = data.get('expression') if isinstance(data, dict) else None
+    if not isinstance(text, str):
+        return {
+            'error': 'Отсутствует обязательное поле: expression'
+        }, 400
+    
+    parsed_mode, error = parse_mode(data)
+    if error is not None:
+        return error
+    mode, context = parsed_mode
+    
+    try:
+        expression = normalize(text, mode)
+        result = evaluate(text, mode, context)
+        if isinstance(result, complex):
+            raise ValueError(NOT_REAL_ERROR)
         # Форматирование результата
-        if result == int(result):
+        if isinstance(result, float) and result == int(result):
             result = int(result)
-        
-        # Создание записи в истории
-        global history_id_counter
-        history_entry = {
-            'id': history_id_counter,
-            'operation': operation,
-            'a': a,
-            'b': b,
-            'result': result,
-            'expression': f'{a} {symbol} {b} = {result}'
-        }
-        calculation_history.append(history_entry)
-        history_id_counter += 1
-        
-        # Формирование ответа
-        response = {
-            'result': result,
-            'operation': operation,
-            'a': a,
-            'b': b,
-            'expression': history_entry['expression'],
-            'id': history_entry['id']
-        }
-        
-        # Интеграция с Telegram: отправка уведомления (если настроено)
-        telegram_enabled = os.getenv('TELEGRAM_ENABLED', 'false').lower() == 'true'
-        if telegram_enabled:
-            try:
-                from telegram_integration import send_notification_sync
-                chat_id = request.headers.get('X-Telegram-Chat-ID') or os.getenv('TELEGRAM_CHAT_ID')
-                if chat_id:
-                    send_notification_sync(history_entry['expression'], result, chat_id)
-            except Exception as e:
-                # Логируем ошибку, но не прерываем выполнение API
-                import logging
-                logging.error(f"Ошибка при отправке уведомления в Telegram: {e}")
-        
-        return jsonify(response), 200
-        
     except ValueError as e:
-        return jsonify({
+        return {
             'error': str(e),
-            'operation': operation,
-            'a': a,
-            'b': b
-        }), 400
+            'expression': text
+        }, 400
+    except OverflowError:
+        return {
+            'error': FLOAT_OVERFLOW_ERROR,
+            'expression': text
+        }, 400
     except Exception as e:
-        return jsonify({
+        return {
             'error': f'Произошла ошибка при вычислении: {str(e)}'
-        }), 500
+        }, 500
+    
+    return {
+        'expression': expression,
+        'result': display(result)
+    }, 200
 
 
 @app.route('/api/history', methods=['GET'])
@@ -224,24 +836,228 @@ def get_history():
     
     Параметры запроса (опционально):
     - limit: количество последних записей (по умолчанию все)
+    - after_id: постраничный вывод - записи с ID больше after_id
+      (не более limit, по умолчанию HISTORY_PAGE_SIZE); в ответе next_after_id
+      содержит курсор следующей страницы или null, если страниц больше нет
+    
+    ETag ответа строится по версии истории: если история не менялась
+    и клиент прислал совпадающий If-None-Match, возвращается 304 без тела.
     """
     # Проверка API-ключа
     auth_error = validate_api_key()
     if auth_error:
         return auth_error
     
-    limit = request.args.get('limit', type=int)
+    # Версия читается до выборки: если история изменится во время запроса,
+    # ETag окажется устаревшим и следующий опрос получит полный ответ
+    etag = history_etag()
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
     
-    if limit and limit > 0:
-        history = calculation_history[-limit:]
-    else:
-        history = calculation_history
+    response = jsonify(history_body(request.args))
+    response.set_etag(etag)
+    return response, 200
+
+
+def history_etag():
+    """ETag истории: меняется при каждом изменении хранилища."""
+    return f'{HISTORY_ETAG_PREFIX}-{calculation_history.version}'
+
+
+def history_body(args):
+    """Тело ответа /api/history по параметрам запроса args."""
+    limit = _int_arg(args, 'limit')
+    after_id = _int_arg(args, 'after_id')
     
-    return jsonify({
+    if after_id is not None:
+        page_size = limit if limit and limit > 0 else HISTORY_PAGE_SIZE
+        history = calculation_history.page(after_id, page_size)
+        return {
+            'history': history,
+            'total': len(calculation_history),
+            'returned': len(history),
+            'next_after_id': history[-1]['id'] if len(history) == page_size else None
+        }
+    
+    history = calculation_history.recent(limit)
+    return {
         'history': history,
         'total': len(calculation_history),
         'returned': len(history)
-    }), 200
+    }
+
+
+def sse_event(entry):
+    """Формирует событие SSE для записи истории (id события - ID записи)."""
+    data = json.dumps(entry, ensure_ascii=False, default=_json_default)
+    return f"id: {entry['id']}\nevent: calculation\ndata: {data}\n\n"
+
+
+def _history_events(last_id):
+    """
+    Генератор событий SSE: сначала записи истории после last_id
+    (при переподключении), затем новые записи из подписки.
+    """
+    # Подписка оформляется до чтения истории, чтобы не пропустить записи между ними,
+    # и внутри генератора, чтобы не остаться висеть, если ответ так и не начали читать
+    subscription = history_broadcaster.subscribe()
+    try:
+        yield 'retry: 3000\n\n'
+        if last_id is not None:
+            # Пропущенные записи дочитываются из истории постранично
+            while True:
+                page = calculation_history.page(last_id, HISTORY_PAGE_SIZE)
+                if not page:
+                    break
+                for entry in page:
+                    yield sse_event(entry)
+                last_id = page[-1]['id']
+        while True:
+            try:
+                entry = subscription.get(timeout=HISTORY_STREAM_KEEPALIVE)
+            except SubscriptionClosed:
+                if subscription.overflowed:
+                    # Клиент переподключится с Last-Event-ID и дочитает пропущенное из истории
+                    yield 'event: overflow\ndata: {}\n\n'
+                return
+            if entry is None:
+                yield ': keep-alive\n\n'
+            elif last_id is None or entry['id'] > last_id:
+                # Записи, уже отданные из истории при переподключении, пропускаются
+                yield sse_event(entry)
+    finally:
+        history_broadcaster.unsubscribe(subscription)
+
+
+@app.route('/api/history/stream', methods=['GET'])
+def stream_history():
+    """
+    Поток новых записей истории (Server-Sent Events).
+    
+    Каждая запись - событие "calculation" с id, равным ID записи.
+    Заголовок Last-Event-ID (или параметр last_event_id) возобновляет поток:
+    сначала отдаются записи истории с большим ID. Клиент, не успевающий
+    читать, отключается событием "overflow" и переподключается.
+    
+    EventSource в браузере не передаёт заголовки, поэтому API-ключ
+    можно указать в параметре api_key.
+    """
+    api_key = request.headers.get('X-API-Key') or request.args.get('api_key')
+    if api_key != API_KEY:
+        return jsonify({'error': 'Неверный или отсутствующий API-ключ'}), 401
+    
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_id is not None:
+        try:
+            last_id = int(last_id)
+        except ValueError:
+            return jsonify({'error': 'Last-Event-ID должен быть целым числом'}), 400
+    
+    response = app.response_class(_history_events(last_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _int_arg(args, name, default=None):
+    """Читает целочисленный параметр запроса (default, если не задан или не число)."""
+    try:
+        return int(args[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def _number_arg(args, name):
+    """Читает числовой параметр запроса (None, если не задан)."""
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f'Параметр "{name}" должен быть числом') from None
+
+
+def _time_arg(args, name):
+    """Читает параметр времени: Unix time в секундах или дата ISO 8601."""
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f'Параметр "{name}" должен быть Unix time или датой ISO 8601') from None
+
+
+@app.route('/api/history/query', methods=['GET'])
+def query_history():
+    """
+    Поиск по истории вычислений с фильтрами. Фильтры обслуживаются
+    вторичными индексами хранилища, а не полным перебором истории.
+    
+    Параметры запроса (все необязательны):
+    - operation: имя операции (add, subtract, multiply, divide, power)
+    - since, until: границы времени (Unix time или ISO 8601, включительно)
+    - last: только записи за последние N секунд
+    - min_result, max_result: границы результата (включительно)
+    - after_id: курсор - записи с ID больше after_id
+    - limit: максимальное количество записей (по умолчанию HISTORY_PAGE_SIZE)
+    """
+    # Проверка API-ключа
+    auth_error = validate_api_key()
+    if auth_error:
+        return auth_error
+    
+    body, status = query_body(request.args)
+    return jsonify(body), status
+
+
+def query_body(args):
+    """Поиск по истории для /api/history/query: (тело ответа, HTTP-код)."""
+    operation = args.get('operation')
+    if operation:
+        op = get_operation(operation.lower())
+        if op is None:
+            return {
+                'error': f'Неизвестная операция: {operation}',
+                'available_operations': list(OPERATION_NAMES)
+            }, 400
+        operation = op.name
+    else:
+        operation = None
+    
+    try:
+        since = _time_arg(args, 'since')
+        until = _time_arg(args, 'until')
+        last = _number_arg(args, 'last')
+        min_result = _number_arg(args, 'min_result')
+        max_result = _number_arg(args, 'max_result')
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    
+    if last is not None:
+        since = max(since or 0.0, time.time() - last)
+    
+    limit = _int_arg(args, 'limit')
+    limit = limit if limit and limit > 0 else HISTORY_PAGE_SIZE
+    after_id = _int_arg(args, 'after_id', 0)
+    
+    history = calculation_history.query(
+        operation=operation, since=since, until=until,
+        min_result=min_result, max_result=max_result,
+        after_id=after_id, limit=limit
+    )
+    
+    return {
+        'history': history,
+        'returned': len(history),
+        'next_after_id': history[-1]['id'] if len(history) == limit else None
+    }, 200
 
 
 @app.route('/api/history/<int:history_id>', methods=['DELETE'])
@@ -254,27 +1070,57 @@ def delete_history_entry(history_id):
     if auth_error:
         return auth_error
     
-    global calculation_history
-    
-    # Поиск записи по ID
-    entry_to_delete = None
-    for entry in calculation_history:
-        if entry['id'] == history_id:
-            entry_to_delete = entry
-            break
+    body, status = delete_body(history_id)
+    return jsonify(body), status
+
+
+def delete_body(history_id):
+    """Удаление записи истории по ID: (тело ответа, HTTP-код)."""
+    entry_to_delete = calculation_history.delete(history_id)
     
     if not entry_to_delete:
-        return jsonify({
+        return {
             'error': f'Запись с ID {history_id} не найдена'
-        }), 404
-    
-    # Удаление записи
-    calculation_history.remove(entry_to_delete)
+        }, 404
     
-    return jsonify({
+    return {
         'message': f'Запись с ID {history_id} успешно удалена',
         'deleted_entry': entry_to_delete
-    }), 200
+    }, 200
+
+
+@app.route('/api/history/<int:history_id>/result', methods=['GET'])
+def download_result(history_id):
+    """
+    Выгрузка всех цифр результата записи истории (text/plain).
+    
+    Нужна для больших результатов точного режима, которые в ответах
+    выводятся кратко. Десятичная запись строится за субквадратичное время.
+    """
+    # Проверка API-ключа
+    auth_error = validate_api_key()
+    if auth_error:
+        return auth_error
+    
+    body, status = result_text(history_id)
+    if status != 200:
+        return jsonify(body), status
+    response = app.response_class(body, mimetype='text/plain')
+    response.headers['Content-Disposition'] = f'attachment; filename=result-{history_id}.txt'
+    return response
+
+
+def result_text(history_id):
+    """Полная запись результата: (текст, 200) или (тело ошибки, HTTP-код)."""
+    entry = calculation_history.get(history_id)
+    if entry is None:
+        return {
+            'error': f'Запись с ID {history_id} не найдена'
+        }, 404
+    result = entry['result']
+    if isinstance(result, float):
+        return repr(result) + '\n', 200
+    return to_decimal_string(result) + '\n', 200
 
 
 @app.route('/api/history', methods=['DELETE'])
@@ -287,28 +1133,179 @@ def clear_history():
     if auth_error:
         return auth_error
     
-    global calculation_history
-    count = len(calculation_history)
-    calculation_history.clear()
+    count = calculation_history.clear()
     
     return jsonify({
         'message': f'История очищена. Удалено записей: {count}'
     }), 200
 
 
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Состояние задания дорогого вычисления.
+    
+    Параметры запроса (опционально):
+    - wait: сколько секунд ждать завершения задания (не больше JOB_MAX_WAIT)
+    
+    После завершения в ответе есть result - ответ, который вернул бы
+    /api/calculate, - и его код result_status.
+    """
+    # Проверка API-ключа
+    auth_error = validate_api_key()
+    if auth_error:
+        return auth_error
+    
+    job, error = find_job(job_id)
+    if error:
+        return jsonify(error[0]), error[1]
+    
+    job.wait(job_wait_time(request.args))
+    return jsonify(job_body(job)), 200
+
+
+def find_job(job_id):
+    """Возвращает (задание, None) или (None, (тело ошибки, HTTP-код))."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return None, ({'error': f'Задание с ID {job_id} не найдено'}, 404)
+    return job, None
+
+
+def job_wait_time(args):
+    """Время ожидания задания из параметра wait (0, если не задан)."""
+    try:
+        wait = float(args.get('wait') or 0)
+    except ValueError:
+        return 0.0
+    return min(max(wait, 0.0), JOB_MAX_WAIT)
+
+
+@app.route('/api/jobs/<int:job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Отмена задания в очереди или выполняющегося."""
+    # Проверка API-ключа
+    auth_error = validate_api_key()
+    if auth_error:
+        return auth_error
+    
+    body, status = cancel_job_body(job_id)
+    return jsonify(body), status
+
+
+def cancel_job_body(job_id):
+    """Отмена задания: (тело ответа, HTTP-код)."""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return {'error': f'Задание с ID {job_id} не найдено'}, 404
+    if job.status != CANCELLED:
+        return {'error': f'Задание с ID {job_id} уже завершено', 'job': job_body(job)}, 409
+    return {'message': f'Задание с ID {job_id} отменено', 'job': job_body(job)}, 200
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Метрики в текстовом формате Prometheus. Как и /api/health,
+    не требует авторизации, чтобы его мог опрашивать сборщик метрик.
+    """
+    return app.response_class(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """Список сохранённых профилей запросов (от новых к старым)."""
+    auth_error = validate_admin_key()
+    if auth_error:
+        return auth_error
+    
+    profiles = profile_store.list()
+    return jsonify({
+        'profiles': profiles,
+        'total': len(profiles),
+        'sample_rate': request_profiler.sample_rate
+    }), 200
+
+
+@app.route('/api/admin/profiles/<int:profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """
+    Профиль запроса в формате pstats (python -m pstats файл).
+    
+    Параметры запроса (опционально):
+    - format=text: текстовая сводка вместо файла pstats
+    """
+    auth_error = validate_admin_key()
+    if auth_error:
+        return auth_error
+    
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({'error': f'Профиль с ID {profile_id} не найден'}), 404
+    _, data = profile
+    
+    if request.args.get('format') == 'text':
+        return app.response_class(format_stats(data), mimetype='text/plain')
+    
+    response = app.response_class(data, mimetype='application/octet-stream')
+    response.headers['Content-Disposition'] = f'attachment; filename=profile-{profile_id}.pstats'
+    return response
+
+
+@app.route('/api/admin/profiles', methods=['DELETE'])
+def clear_profiles():
+    """Удаление всех сохранённых профилей."""
+    auth_error = validate_admin_key()
+    if auth_error:
+        return auth_error
+    
+    count = profile_store.clear()
+    return jsonify({'message': f'Профили удалены: {count}'}), 200
+
+
+@app.route('/api/notifications/stats', methods=['GET'])
+def notification_stats():
+    """Состояние очереди уведомлений Telegram: глубина и счётчики."""
+    # Проверка API-ключа
+    auth_error = validate_api_key()
+    if auth_error:
+        return auth_error
+    
+    if not telegram_enabled():
+        return jsonify({'enabled': False}), 200
+    
+    return jsonify(dict(get_notification_dispatcher().stats(), enabled=True)), 200
+
+
+AVAILABLE_ENDPOINTS = [
+    'GET /api/health',
+    'GET /api/operations',
+    'POST /api/calculate',
+    'POST /api/calculate/batch',
+    'POST /api/calculate/stream',
+    'POST /api/evaluate',
+    'GET /api/history',
+    'GET /api/history/query',
+    'GET /api/history/stream',
+    'GET /api/history/<id>/result',
+    'DELETE /api/history/<id>',
+    'DELETE /api/history',
+    'GET /api/jobs/<id>',
+    'DELETE /api/jobs/<id>',
+    'GET /api/notifications/stats',
+    'GET /api/metrics',
+    'GET /api/admin/profiles',
+    'GET /api/admin/profiles/<id>',
+    'DELETE /api/admin/profiles'
+]
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Обработка несуществующих эндпоинтов."""
     return jsonify({
         'error': 'Эндпоинт не найден',
-        'available_endpoints': [
-            'GET /api/health',
-            'GET /api/operations',
-            'POST /api/calculate',
-            'GET /api/history',
-            'DELETE /api/history/<id>',
-            'DELETE /api/history'
-        ]
+        'available_endpoints': AVAILABLE_ENDPOINTS
     }), 404
 
 
@@ -338,9 +1335,16 @@ if __name__ == '__main__':
     - GET  /api/health          - Проверка работоспособности
     - GET  /api/operations       - Список операций
     - POST /api/calculate        - Выполнение вычисления
+    - POST /api/calculate/batch  - Пакетное выполнение вычислений
+    - POST /api/calculate/stream - Потоковое выполнение вычислений (NDJSON)
+    - POST /api/evaluate         - Вычисление выражения
     - GET  /api/history          - История вычислений
+    - GET  /api/history/query    - Поиск по истории с фильтрами
+    - GET  /api/history/stream   - Поток новых записей истории (SSE)
     - DELETE /api/history/<id>   - Удаление записи
     - DELETE /api/history        - Очистка истории
+    - GET  /api/metrics          - Метрики в формате Prometheus
+    - GET  /api/admin/profiles   - Профили запросов (ключ администратора)
     
     Пример запроса:
     curl -X POST http://localhost:{port}/api/calculate \\
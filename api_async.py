@@ -0,0 +1,552 @@
+"""
+Асинхронная (ASGI) версия REST API калькулятора.
+
+Те же маршруты и JSON-ответы, что у api.app, на Starlette. Обработка
+запросов, история вычислений, кэш идемпотентности, рассылка SSE и метрики
+общие с api: модуль использует его функции и объекты, поэтому в одном
+процессе обе версии работают с одной историей.
+
+Отличия от версии Flask:
+- вычисления с float выполняются прямо в цикле событий (они занимают
+  микросекунды), а точные и десятичные и блокирующие обращения к
+  SQLite-хранилищу - в пуле потоков: точный результат до JOB_COST_THRESHOLD
+  цифр (выражения - до EXACT_MAX_DIGITS) вычисляется и форматируется
+  миллисекунды и дольше; более дорогие вычисления уходят в очередь заданий;
+- уведомления Telegram отправляет AsyncNotificationDispatcher - задача
+  в цикле событий сервера, а не отдельный поток;
+- подписчики /api/history/stream ждут записи без занятого потока;
+- административные маршруты профилирования не подключены: ProfilingMiddleware
+  оборачивает WSGI-приложение.
+
+Запуск:
+    uvicorn api_async:app --port 5000
+"""
+
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+import api
+import metrics
+from history_events import SubscriptionClosed
+from history_store import SQLiteHistoryStore
+from idempotency import IdempotencyConflict, IdempotencyKeyReused
+
+# Чтение и удаление в SQLite-хранилище ждут диска: такие вызовы уводятся в пул потоков.
+# Добавление записей не блокирует (запись на диск идёт в потоке записи хранилища).
+_HISTORY_BLOCKS = isinstance(api.calculation_history, SQLiteHistoryStore)
+
+# Эндпоинты для ответа 404 (без административных маршрутов профилирования)
+AVAILABLE_ENDPOINTS = [
+    endpoint for endpoint in api.AVAILABLE_ENDPOINTS if '/api/admin/' not in endpoint
+]
+
+
+async def _history_call(function, *args):
+    """Вызывает метод хранилища истории, не блокируя цикл событий."""
+    if _HISTORY_BLOCKS:
+        return await run_in_threadpool(function, *args)
+    return function(*args)
+
+
+def _is_float_mode(data):
+    """Проверяет, что запрос (или каждая операция пакета) вычисляется с float."""
+    if isinstance(data, dict) and 'operations' in data:
+        data = data['operations']
+    if isinstance(data, list):
+        return all(_is_float_mode(item) for item in data)
+    return not isinstance(data, dict) or data.get('mode', 'float') == 'float'
+
+
+async def _compute(function, data, *args):
+    """
+    Вызывает function(data, *args); точные и десятичные вычисления
+    выполняются в пуле потоков, чтобы не блокировать цикл событий.
+    """
+    if _is_float_mode(data):
+        return function(data, *args)
+    return await run_in_threadpool(function, data, *args)
+
+
+def json_response(body, status=200, headers=None):
+    """Ответ JSON, побайтно совпадающий с jsonify версии Flask."""
+    return Response(
+        api.app.json.dumps(body, separators=(',', ':')) + '\n',
+        status_code=status, headers=headers, media_type='application/json'
+    )
+
+
+def validate_api_key(request):
+    """Проверяет наличие и корректность API-ключа в заголовках запроса."""
+    api_key = request.headers.get('X-API-Key')
+    if not api_key or api_key != api.API_KEY:
+        return json_response({'error': 'Неверный или отсутствующий API-ключ'}, 401)
+    return None
+
+
+def _not_modified(request, etag):
+    """Возвращает ответ 304, если клиент прислал совпадающий If-None-Match."""
+    header = request.headers.get('If-None-Match')
+    if header is None:
+        return None
+    tags = [tag.strip() for tag in header.split(',')]
+    if '*' in tags or f'"{etag}"' in tags:
+        return Response(status_code=304, headers={'ETag': f'"{etag}"'})
+    return None
+
+
+async def _json_body(request):
+    """
+    Читает тело запроса JSON.
+
+    Returns:
+        tuple: (данные, ответ с ошибкой или None)
+    """
+    content_type = request.headers.get('Content-Type', '').split(';')[0].strip()
+    if content_type != 'application/json' and not (
+            content_type.startswith('application/') and content_type.endswith('+json')):
+        return None, json_response({'error': 'Требуется JSON формат данных'}, 400)
+    try:
+        return await request.json(), None
+    except ValueError:
+        return None, json_response({'error': 'Некорректный JSON в теле запроса'}, 400)
+
+
+async def health_check(request):
+    """Проверка работоспособности API."""
+    return json_response({
+        'status': 'ok',
+        'message': 'API калькулятора работает',
+        'version': '1.0'
+    })
+
+
+async def get_operations(request):
+    """Получение списка доступных операций (с поддержкой If-None-Match)."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    not_modified = _not_modified(request, api.OPERATIONS_ETAG)
+    if not_modified:
+        return not_modified
+
+    return Response(
+        api.OPERATIONS_BODY, media_type='application/json',
+        headers={'ETag': f'"{api.OPERATIONS_ETAG}"'}
+    )
+
+
+async def calculate(request):
+    """Выполнение математической операции (см. api.calculate)."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    data, error = await _json_body(request)
+    if error:
+        return error
+
+    key = request.headers.get('Idempotency-Key')
+    if not key:
+        return await _calculate(request, data)
+
+    if len(key) > api.MAX_IDEMPOTENCY_KEY_LENGTH:
+        return json_response({
+            'error': f'Ключ идемпотентности длиннее {api.MAX_IDEMPOTENCY_KEY_LENGTH} символов'
+        }, 400)
+    try:
+        # begin() может ждать завершения запроса с тем же ключом
+        stored = await run_in_threadpool(
+            api.idempotency_cache.begin, key, json.dumps(data, sort_keys=True)
+        )
+    except IdempotencyKeyReused as e:
+        return json_response({'error': str(e)}, 422)
+    except IdempotencyConflict as e:
+        return json_response({'error': str(e)}, 409)
+
+    if stored is not None:
+        body, status = stored
+        return json_response(body, status, {'Idempotent-Replayed': 'true'})
+
+    chat_id = api.telegram_chat_id(request.headers)
+    try:
+        body, status, entries = await _compute(api.calculate_body, data, chat_id)
+    except Exception:
+        api.idempotency_cache.abandon(key)
+        raise
+    api.idempotency_cache.complete(key, (body, status))
+    api.notify_telegram(entries, chat_id)
+    return json_response(body, status)
+
+
+async def _calculate(request, data):
+    chat_id = api.telegram_chat_id(request.headers)
+    body, status, entries = await _compute(api.calculate_body, data, chat_id)
+    api.notify_telegram(entries, chat_id)
+    return json_response(body, status)
+
+
+async def calculate_batch(request):
+    """Пакетное выполнение операций (см. api.calculate_batch)."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    data, error = await _json_body(request)
+    if error:
+        return error
+
+    chat_id = api.telegram_chat_id(request.headers)
+    body, status, entries = await _compute(api.batch_body, data, chat_id)
+    api.notify_telegram(entries, chat_id)
+    return json_response(body, status)
+
+
+async def _request_lines(request):
+    """Строки тела запроса по мере поступления (без символа перевода строки)."""
+    buffer = b''
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            yield line.decode('utf-8', errors='replace')
+    if buffer:
+        yield buffer.decode('utf-8', errors='replace')
+
+
+async def _stream_results(request, chat_id):
+    """Асинхронный вариант api._stream_results."""
+    succeeded = failed = queued = 0
+    pending = []
+    number = 0
+    async for line in _request_lines(request):
+        number += 1
+        if '"mode"' in line:
+            # Строка может задавать точный или десятичный режим: без поля
+            # "mode" вычисление идёт с float, и разбирать JSON дважды не нужно
+            output, history_entry, status = await run_in_threadpool(
+                api.stream_line, number, line, chat_id
+            )
+        else:
+            output, history_entry, status = api.stream_line(number, line, chat_id)
+        if output is None:
+            continue
+        if status == 202:
+            queued += 1
+        elif history_entry is None:
+            failed += 1
+        else:
+            succeeded += 1
+            pending.append(history_entry)
+            if len(pending) >= api.STREAM_NOTIFY_CHUNK:
+                api.notify_telegram(pending, chat_id)
+                pending = []
+        yield output
+
+    api.notify_telegram(pending, chat_id)
+    yield api.stream_summary(succeeded, failed, queued)
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    Потоковый ответ, который читает тело запроса во время ответа.
+
+    StreamingResponse при ASGI младше 2.4 параллельно ждёт отключения
+    клиента через receive() и забрал бы себе части тела запроса. Здесь
+    receive() читает только генератор ответа; отключение клиента он
+    получает как ClientDisconnect из request.stream().
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+async def calculate_stream(request):
+    """Потоковое вычисление NDJSON (см. api.calculate_stream)."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    chat_id = api.telegram_chat_id(request.headers)
+    return _DuplexStreamingResponse(
+        _stream_results(request, chat_id), media_type='application/x-ndjson'
+    )
+
+
+async def evaluate_expression(request):
+    """Вычисление арифметического выражения (см. api.evaluate_expression)."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    data, error = await _json_body(request)
+    if error:
+        return error
+
+    body, status = await _compute(api.expression_body, data)
+    return json_response(body, status)
+
+
+async def get_history(request):
+    """Получение истории вычислений (см. api.get_history)."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    etag = api.history_etag()
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    body = await _history_call(api.history_body, request.query_params)
+    return json_response(body, headers={'ETag': f'"{etag}"'})
+
+
+async def _history_events(last_id):
+    """Асинхронный вариант api._history_events."""
+    subscription = api.history_broadcaster.subscribe(loop=asyncio.get_running_loop())
+    try:
+        yield 'retry: 3000\n\n'
+        if last_id is not None:
+            while True:
+                page = await _history_call(
+                    api.calculation_history.page, last_id, api.HISTORY_PAGE_SIZE
+                )
+                if not page:
+                    break
+                for entry in page:
+                    yield api.sse_event(entry)
+                last_id = page[-1]['id']
+        while True:
+            try:
+                entry = await subscription.get(timeout=api.HISTORY_STREAM_KEEPALIVE)
+            except SubscriptionClosed:
+                if subscription.overflowed:
+                    yield 'event: overflow\ndata: {}\n\n'
+                return
+            if entry is None:
+                yield ': keep-alive\n\n'
+            elif last_id is None or entry['id'] > last_id:
+                yield api.sse_event(entry)
+    finally:
+        api.history_broadcaster.unsubscribe(subscription)
+
+
+async def stream_history(request):
+    """Поток новых записей истории (см. api.stream_history)."""
+    api_key = request.headers.get('X-API-Key') or request.query_params.get('api_key')
+    if api_key != api.API_KEY:
+        return json_response({'error': 'Неверный или отсутствующий API-ключ'}, 401)
+
+    last_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+    if last_id is not None:
+        try:
+            last_id = int(last_id)
+        except ValueError:
+            return json_response({'error': 'Last-Event-ID должен быть целым числом'}, 400)
+
+    return StreamingResponse(
+        _history_events(last_id), media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+async def query_history(request):
+    """Поиск по истории вычислений с фильтрами (см. api.query_history)."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    body, status = await _history_call(api.query_body, request.query_params)
+    return json_response(body, status)
+
+
+async def delete_history_entry(request):
+    """Удаление записи из истории вычислений по ID."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    body, status = await _history_call(api.delete_body, request.path_params['history_id'])
+    return json_response(body, status)
+
+
+async def download_result(request):
+    """Выгрузка всех цифр результата записи истории (см. api.download_result)."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    history_id = request.path_params['history_id']
+    # Перевод большого числа в десятичную запись занимает заметное время - в пуле потоков
+    body, status = await run_in_threadpool(api.result_text, history_id)
+    if status != 200:
+        return json_response(body, status)
+    return Response(body, media_type='text/plain', headers={
+        'Content-Disposition': f'attachment; filename=result-{history_id}.txt'
+    })
+
+
+async def clear_history(request):
+    """Очистка всей истории вычислений."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    count = await _history_call(api.calculation_history.clear)
+    return json_response({'message': f'История очищена. Удалено записей: {count}'})
+
+
+async def get_job(request):
+    """Состояние задания дорогого вычисления (см. api.get_job)."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    job, error = api.find_job(request.path_params['job_id'])
+    if error:
+        return json_response(*error)
+
+    wait = api.job_wait_time(request.query_params)
+    if wait and not job.is_finished:
+        await run_in_threadpool(job.wait, wait)
+    return json_response(api.job_body(job))
+
+
+async def cancel_job(request):
+    """Отмена задания в очереди или выполняющегося."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    return json_response(*api.cancel_job_body(request.path_params['job_id']))
+
+
+async def get_metrics(request):
+    """Метрики в текстовом формате Prometheus (без авторизации)."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+async def notification_stats(request):
+    """Состояние очереди уведомлений Telegram: глубина и счётчики."""
+    auth_error = validate_api_key(request)
+    if auth_error:
+        return auth_error
+
+    if not api.telegram_enabled():
+        return json_response({'enabled': False})
+
+    return json_response(dict(api.get_notification_dispatcher().stats(), enabled=True))
+
+
+async def not_found(request, exc):
+    """Обработка несуществующих эндпоинтов."""
+    return json_response({
+        'error': 'Эндпоинт не найден',
+        'available_endpoints': AVAILABLE_ENDPOINTS
+    }, 404)
+
+
+async def internal_error(request, exc):
+    """Обработка внутренних ошибок сервера."""
+    return json_response({'error': 'Внутренняя ошибка сервера'}, 500)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-обёртка, учитывающая запросы в метриках api (REQUESTS_TOTAL,
+    REQUEST_SECONDS). Эндпоинт - имя функции-обработчика, как у Flask.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not api.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status):
+            nonlocal recorded
+            recorded = True
+            # Маршрутизатор Starlette кладёт обработчик в scope; для неизвестных путей его нет
+            endpoint = getattr(scope.get('endpoint'), '__name__', 'unknown')
+            api.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
+            api.REQUESTS_TOTAL.inc(endpoint, scope['method'], status)
+
+        async def send_with_metrics(message):
+            if message['type'] == 'http.response.start':
+                record(message['status'])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if not recorded:
+                record(500)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Запуск и остановка асинхронной отправки уведомлений и рассылки SSE."""
+    dispatcher = None
+    if api.telegram_enabled():
+        from telegram_integration import AsyncNotificationDispatcher
+        dispatcher = AsyncNotificationDispatcher().start()
+        api.notification_dispatcher = dispatcher
+    try:
+        yield
+    finally:
+        # Открытые потоки SSE иначе не дали бы серверу завершиться
+        api.history_broadcaster.shutdown()
+        if dispatcher is not None:
+            api.notification_dispatcher = None
+            await dispatcher.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/health', health_check, methods=['GET']),
+        Route('/api/operations', get_operations, methods=['GET']),
+        Route('/api/calculate', calculate, methods=['POST']),
+        Route('/api/calculate/batch', calculate_batch, methods=['POST']),
+        Route('/api/calculate/stream', calculate_stream, methods=['POST']),
+        Route('/api/evaluate', evaluate_expression, methods=['POST']),
+        Route('/api/history', get_history, methods=['GET']),
+        Route('/api/history', clear_history, methods=['DELETE']),
+        Route('/api/history/query', query_history, methods=['GET']),
+        Route('/api/history/stream', stream_history, methods=['GET']),
+        Route('/api/history/{history_id:int}', delete_history_entry, methods=['DELETE']),
+        Route('/api/history/{history_id:int}/result', download_result, methods=['GET']),
+        Route('/api/jobs/{job_id:int}', get_job, methods=['GET']),
+        Route('/api/jobs/{job_id:int}', cancel_job, methods=['DELETE']),
+        Route('/api/metrics', get_metrics, methods=['GET']),
+        Route('/api/notifications/stats', notification_stats, methods=['GET']),
+    ],
+    middleware=[
+        Middleware(MetricsMiddleware),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+    ],
+    exception_handlers={404: not_found, 500: internal_error},
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.getenv('PORT', 5000))
+    print(f"API калькулятора (ASGI): http://localhost:{port}")
+    uvicorn.run(app, host='0.0.0.0', port=port, log_level='warning')
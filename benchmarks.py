@@ -0,0 +1,364 @@
+"""
+Набор бенчмарков калькулятора.
+
+Измеряет функции calculator, API (через тестовый клиент Flask) и разбор
+сообщений Telegram-бота. Результаты сохраняются в JSON, чтобы сравнивать
+два запуска: замедление больше порога считается регрессией, и запуск
+завершается с кодом 1.
+
+Примеры:
+    python benchmarks.py --output baseline.json
+    python benchmarks.py --output current.json --baseline baseline.json --threshold 0.2
+    python benchmarks.py --filter api --quick
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+
+BENCHMARKS = {}
+
+# Порог регрессии по умолчанию (доля замедления)
+DEFAULT_THRESHOLD = 0.2
+
+
+def benchmark(name):
+    """
+    Регистрирует бенчмарк.
+
+    Декорируемая функция выполняет подготовку и возвращает кортеж
+    (функция одного прогона, количество операций в прогоне).
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def measure(run, operations, repeat=5, min_time=0.2):
+    """
+    Измеряет время одной операции в наносекундах.
+
+    Каждый замер повторяет прогон, пока не пройдёт min_time секунд;
+    из repeat замеров берутся лучший и медианный результаты.
+    """
+    samples = []
+    for _ in range(repeat):
+        loops = 0
+        started = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            run()
+            loops += 1
+            elapsed = time.perf_counter() - started
+        samples.append(elapsed * 1e9 / (loops * operations))
+    return {
+        'ns_per_op': min(samples),
+        'median_ns_per_op': statistics.median(samples),
+        'ops_per_second': 1e9 / min(samples),
+    }
+
+
+# ========== Функции calculator ==========
+
+def _core_benchmark(name):
+    from calculator import get_operation
+    func = get_operation(name).func
+    pairs = [(float(i), float(i % 7 + 1)) for i in range(1000)]
+
+    def run():
+        for a, b in pairs:
+            func(a, b)
+    return run, len(pairs)
+
+
+for _name in ('add', 'subtract', 'multiply', 'divide', 'power'):
+    benchmark(f'core.{_name}')(lambda _name=_name: _core_benchmark(_name))
+
+
+def _mode_benchmark(mode, operands):
+    # Полный путь вычисления: приведение операндов из JSON и calculator.calculate
+    from calculator import calculate, to_number
+    names = ('add', 'subtract', 'multiply', 'divide')
+    items = [(names[i % len(names)], a, b) for i, (a, b) in enumerate(operands)]
+
+    def run():
+        for name, a, b in items:
+            calculate(name, to_number(a, mode), to_number(b, mode), mode)
+    return run, len(items)
+
+
+# Сравнение десятичного режима с float: дробные операнды (Decimal)
+# и целые (быстрый путь без Decimal)
+_FRACTIONAL = [(i + 0.25 * (i % 4) + 0.01, i % 7 + 1.1) for i in range(1000)]
+_INTEGRAL = [(i, i % 7 + 1) for i in range(1000)]
+benchmark('core.mode_float')(lambda: _mode_benchmark('float', _FRACTIONAL))
+benchmark('core.mode_decimal')(lambda: _mode_benchmark('decimal', _FRACTIONAL))
+benchmark('core.mode_decimal_fast')(lambda: _mode_benchmark('decimal', _INTEGRAL))
+
+
+def _cache_benchmark(cache):
+    # Повторяющиеся пары операндов: 10 разных степеней в точном режиме
+    from result_cache import ResultCache
+    pairs = [(i % 10 + 2, 200 + i % 10) for i in range(1000)]
+    calculate = ResultCache(enabled=cache).calculate
+
+    def run():
+        for a, b in pairs:
+            calculate('power', a, b, 'exact')
+    return run, len(pairs)
+
+
+benchmark('core.power_exact')(lambda: _cache_benchmark(False))
+benchmark('core.power_exact_cached')(lambda: _cache_benchmark(True))
+
+
+@benchmark('core.batch_divide')
+def _batch_divide():
+    from calculator_batch import batch_calculate
+    a = list(range(100000))
+    b = [i % 7 for i in range(100000)]
+
+    def run():
+        batch_calculate('divide', a, b)
+    return run, len(a)
+
+
+@benchmark('core.expression')
+def _expression():
+    from expression_engine import evaluate
+    expressions = [f'{i} * ({i % 9} + 1) ^ 2 - {i} / 3' for i in range(100)]
+
+    def run():
+        for text in expressions:
+            evaluate(text)
+    return run, len(expressions)
+
+
+# ========== API ==========
+
+def _api_client():
+    import api
+    api.calculation_history.clear()
+    return api, api.app.test_client(), {'X-API-Key': api.API_KEY}
+
+
+@benchmark('api.calculate')
+def _api_calculate():
+    api, client, headers = _api_client()
+    payload = {'operation': 'multiply', 'a': 7, 'b': 6}
+
+    def run():
+        client.post('/api/calculate', json=payload, headers=headers)
+    return run, 1
+
+
+@benchmark('api.calculate_decimal')
+def _api_calculate_decimal():
+    api, client, headers = _api_client()
+    payload = {'operation': 'multiply', 'a': '19.99', 'b': 3, 'mode': 'decimal', 'precision': 10}
+
+    def run():
+        client.post('/api/calculate', json=payload, headers=headers)
+    return run, 1
+
+
+@benchmark('api.calculate_no_metrics')
+def _api_calculate_no_metrics():
+    # Сравнение с api.calculate показывает накладные расходы метрик
+    api, client, headers = _api_client()
+    payload = {'operation': 'multiply', 'a': 7, 'b': 6}
+
+    def run():
+        api.METRICS_ENABLED = False
+        try:
+            client.post('/api/calculate', json=payload, headers=headers)
+        finally:
+            api.METRICS_ENABLED = True
+    return run, 1
+
+
+@benchmark('metrics.record_request')
+def _metrics_record_request():
+    # Всё, что метрики добавляют к одному запросу /api/calculate
+    import api
+    operations = 1000
+
+    def run():
+        for _ in range(operations):
+            api.OPERATION_SECONDS.observe(0.00002, 'multiply')
+            api.OPERATIONS_TOTAL.inc('multiply', 200)
+            api.REQUEST_SECONDS.observe(0.0003, 'calculate')
+            api.REQUESTS_TOTAL.inc('calculate', 'POST', 200)
+    return run, operations
+
+
+@benchmark('api.calculate_batch')
+def _api_calculate_batch():
+    api, client, headers = _api_client()
+    payload = {'operations': [{'operation': 'add', 'a': i, 'b': 1} for i in range(100)]}
+
+    def run():
+        client.post('/api/calculate/batch', json=payload, headers=headers)
+    return run, len(payload['operations'])
+
+
+@benchmark('api.history_heavy')
+def _api_history_heavy():
+    from history_store import HistoryEntry
+    api, client, headers = _api_client()
+    api.calculation_history.extend(
+        HistoryEntry('add', float(i), 1.0, i + 1) for i in range(50000)
+    )
+
+    def run():
+        client.get('/api/history?limit=100', headers=headers)
+    return run, 1
+
+
+@benchmark('api.history_not_modified')
+def _api_history_not_modified():
+    from history_store import HistoryEntry
+    api, client, headers = _api_client()
+    api.calculation_history.extend(
+        HistoryEntry('add', float(i), 1.0, i + 1) for i in range(50000)
+    )
+    etag = client.get('/api/history', headers=headers).headers['ETag']
+    headers = dict(headers, **{'If-None-Match': etag})
+
+    def run():
+        client.get('/api/history', headers=headers)
+    return run, 1
+
+
+@benchmark('api.delete_heavy')
+def _api_delete_heavy():
+    from history_store import HistoryEntry
+    api, client, headers = _api_client()
+    batch = 200
+
+    def run():
+        entries = [HistoryEntry('add', 1.0, 1.0, 2) for _ in range(batch)]
+        api.calculation_history.extend(entries)
+        for entry in entries:
+            client.delete(f"/api/history/{entry['id']}", headers=headers)
+    return run, batch
+
+
+# ========== Telegram-бот ==========
+
+class _StubMessage:
+    """Заглушка сообщения Telegram: ответы не отправляются."""
+
+    def __init__(self, text):
+        self.text = text
+
+    async def reply_text(self, text, **kwargs):
+        return None
+
+
+class _StubUser:
+    id = 1
+
+
+class _StubUpdate:
+    """Заглушка Update для вызова обработчиков без сети."""
+
+    def __init__(self, text):
+        self.message = _StubMessage(text)
+        self.effective_user = _StubUser()
+
+
+@benchmark('bot.handle_message')
+def _bot_handle_message():
+    from telegram_bot import handle_message
+    updates = [_StubUpdate(f'{i} × ({i % 5} + 2)') for i in range(100)]
+    loop = asyncio.new_event_loop()
+
+    async def handle_all():
+        for update in updates:
+            await handle_message(update, None)
+
+    def run():
+        loop.run_until_complete(handle_all())
+    return run, len(updates)
+
+
+# ========== Запуск и сравнение ==========
+
+def run_benchmarks(names, repeat=5, min_time=0.2):
+    """Запускает выбранные бенчмарки и возвращает словарь результатов."""
+    results = {}
+    for name in names:
+        run, operations = BENCHMARKS[name]()
+        results[name] = measure(run, operations, repeat, min_time)
+        print(f"{name:<28} {results[name]['ns_per_op']:>14.1f} нс/оп", file=sys.stderr)
+    return results
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Сравнивает результаты двух запусков.
+
+    Returns:
+        list: регрессии (имя, нс/оп в базовом запуске, нс/оп сейчас, замедление)
+    """
+    regressions = []
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['ns_per_op']
+        after = result['ns_per_op']
+        slowdown = after / before - 1
+        if slowdown > threshold:
+            regressions.append((name, before, after, slowdown))
+    return regressions
+
+
+def main(argv=None):
+    """Точка входа командной строки. Возвращает код завершения."""
+    parser = argparse.ArgumentParser(description='Бенчмарки калькулятора')
+    parser.add_argument('-o', '--output', help='Файл для сохранения результатов (JSON)')
+    parser.add_argument('-b', '--baseline', help='Результаты предыдущего запуска для сравнения')
+    parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Допустимое замедление (доля, по умолчанию {DEFAULT_THRESHOLD})')
+    parser.add_argument('-f', '--filter', default='',
+                        help='Запускать только бенчмарки, имя которых содержит строку')
+    parser.add_argument('-q', '--quick', action='store_true',
+                        help='Быстрый запуск с меньшим количеством повторов')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    repeat, min_time = (3, 0.05) if args.quick else (5, 0.2)
+    results = run_benchmarks(names, repeat, min_time)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.time(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(baseline, results, args.threshold)
+        for name, before, after, slowdown in regressions:
+            print(f'РЕГРЕССИЯ {name}: {before:.1f} -> {after:.1f} нс/оп (+{slowdown:.0%})',
+                  file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,15 @@
 Простой калькулятор с базовыми математическими операциями.
 """
 
+import decimal
+import math
+import os
+import re
+from collections import namedtuple
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+
 
 def add(a, b):
     """Сложение двух чисел."""
@@ -30,6 +39,331 @@ def power(a, b):
     return a ** b
 
 
+# Описание операции калькулятора:
+# name - каноническое имя, symbol - обозначение в выражениях,
+# display - обозначение для вывода пользователю, func - функция,
+# title и description - название и описание для API,
+# aliases - дополнительные обозначения, example - пример операндов
+Operation = namedtuple(
+    'Operation',
+    ['name', 'symbol', 'display', 'func', 'title', 'description', 'aliases', 'example']
+)
+
+OPERATIONS = (
+    Operation('add', '+', '+', add, 'addition',
+              'Сложение двух чисел', (), (10, 5)),
+    Operation('subtract', '-', '-', subtract, 'subtraction',
+              'Вычитание второго числа из первого', (), (10, 5)),
+    Operation('multiply', '*', '×', multiply, 'multiplication',
+              'Умножение двух чисел', ('×',), (10, 5)),
+    Operation('divide', '/', '÷', divide, 'division',
+              'Деление первого числа на второе', ('÷',), (10, 5)),
+    Operation('power', '^', '^', power, 'power',
+              'Возведение первого числа в степень второго', ('**',), (2, 3)),
+)
+
+# Реестр операций: имя, символ или псевдоним -> Operation
+OPERATION_REGISTRY = {
+    key: operation
+    for operation in OPERATIONS
+    for key in (operation.name, operation.symbol) + operation.aliases
+}
+
+OPERATION_NAMES = tuple(operation.name for operation in OPERATIONS)
+
+
+def get_operation(key):
+    """Возвращает операцию по имени, символу или псевдониму (None, если не найдена)."""
+    return OPERATION_REGISTRY.get(key)
+
+
+# ========== Режимы вычислений ==========
+
+# float - числа с плавающей точкой (по умолчанию);
+# exact - точная арифметика целых чисел и дробей (int и Fraction) без ограничения разрядности;
+# decimal - десятичная арифметика (Decimal) с заданной точностью и округлением
+MODES = ('float', 'exact', 'decimal')
+
+# Операнд точного режима в виде строки: целое, десятичная дробь или "p/q".
+# Порядок (1e100) не допускается: "1e100000000" построил бы огромное число при разборе
+_EXACT_RE = re.compile(r'\s*[+-]?(?:\d+(?:\.\d*)?|\.\d+|\d+\s*/\s*\d+)\s*')
+
+
+def to_number(value, mode='float'):
+    """
+    Приводит операнд (число или строку) к типу режима mode.
+    
+    Raises:
+        ValueError, TypeError: если операнд не является числом
+    """
+    if mode == 'decimal':
+        return _decimal_number(value)
+    if mode != 'exact':
+        return float(value)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, Fraction):
+        return _exact_result(value)
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError(f'Точный режим не поддерживает {value}')
+        # Десятичная запись числа ("0.1" из JSON), а не двоичное значение float
+        return _exact_result(Fraction(repr(value)))
+    if isinstance(value, str) and _EXACT_RE.fullmatch(value):
+        return _exact_result(Fraction(value.replace(' ', '')))
+    raise ValueError(f'Не число: {value!r}')
+
+
+def _exact_result(value):
+    """Дробь с единичным знаменателем приводится к int."""
+    return value.numerator if value.denominator == 1 else value
+
+
+def calculate_exact(name, a, b):
+    """
+    Точное вычисление операции над целыми числами и дробями.
+    
+    Returns:
+        int, если результат целый, иначе Fraction
+    
+    Raises:
+        ValueError: при делении на ноль или если результат не рационален
+            (степень с дробным показателем)
+    """
+    operation = get_operation(name)
+    try:
+        result = operation.func(Fraction(a), Fraction(b))
+    except ZeroDivisionError:
+        # 0 ^ -1
+        raise ValueError("Деление на ноль невозможно!") from None
+    if not isinstance(result, Fraction):
+        raise ValueError("Точный результат возможен только для целого показателя степени")
+    return _exact_result(result)
+
+
+# ========== Десятичный режим ==========
+
+# Точность (значащих цифр) и округление по умолчанию
+DECIMAL_PRECISION = int(os.getenv('DECIMAL_PRECISION', 28))
+DECIMAL_ROUNDING = os.getenv('DECIMAL_ROUNDING', 'half_even')
+# Максимальная точность, которую можно запросить
+MAX_DECIMAL_PRECISION = int(os.getenv('DECIMAL_MAX_PRECISION', 1000))
+# Режимы округления: имена констант модуля decimal без префикса ROUND_
+ROUNDING_MODES = ('half_even', 'half_up', 'half_down', 'up', 'down', 'ceiling', 'floor', '05up')
+
+# Операнд десятичного режима в виде строки (без inf и nan)
+_DECIMAL_RE = re.compile(r'\s*[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?\s*')
+# Целые числа до 2^53 точно представимы во float: с ними работает быстрый путь
+_FAST_LIMIT = 2 ** 53
+# Точность, при которой результат быстрого пути (не больше 2^53) не округляется
+_FAST_MIN_PRECISION = 16
+
+
+def decimal_context(precision=None, rounding=None):
+    """
+    Контекст десятичного режима: точность (количество значащих цифр) и округление.
+    None - значение по умолчанию (DECIMAL_PRECISION, DECIMAL_ROUNDING).
+    
+    Raises:
+        ValueError: если точность или режим округления недопустимы
+    """
+    if precision is None:
+        precision = DECIMAL_PRECISION
+    if (isinstance(precision, bool) or not isinstance(precision, int)
+            or not 1 <= precision <= MAX_DECIMAL_PRECISION):
+        raise ValueError(f'Точность должна быть целым числом от 1 до {MAX_DECIMAL_PRECISION}')
+    name = str(DECIMAL_ROUNDING if rounding is None else rounding).lower()
+    if name.startswith('round_'):
+        name = name[len('round_'):]
+    if name not in ROUNDING_MODES:
+        raise ValueError(f'Неизвестный режим округления: {rounding}')
+    return _context(precision, name)
+
+
+@lru_cache(maxsize=256)
+def _context(precision, rounding):
+    # Контексты неизменяемы после создания (кроме флагов), поэтому общие для всех запросов
+    return decimal.Context(prec=precision, rounding='ROUND_' + rounding.upper())
+
+
+def rounding_name(context):
+    """Имя режима округления контекста, например "half_even"."""
+    return context.rounding[len('ROUND_'):].lower()
+
+
+DECIMAL_CONTEXT = decimal_context()
+
+
+def _decimal_number(value):
+    """
+    Операнд десятичного режима. Целые числа, точно представимые во float,
+    остаются int (для быстрого пути), остальные значения - Decimal.
+    Float переводится по десятичной записи: 0.1 из JSON - это Decimal("0.1").
+    """
+    # Проверки типов вместо isinstance: вызывается для каждого операнда каждого запроса
+    kind = type(value)
+    if kind is int:
+        return value if -_FAST_LIMIT <= value <= _FAST_LIMIT else Decimal(value)
+    if kind is float:
+        if value.is_integer():
+            return _decimal_number(int(value))
+        if not math.isfinite(value):
+            raise ValueError(f'Десятичный режим не поддерживает {value}')
+        return Decimal(repr(value))
+    if kind is Decimal and value.is_finite():
+        return value
+    if isinstance(value, str) and _DECIMAL_RE.fullmatch(value):
+        text = value.strip()
+        # Короткая запись целого (до 17 знаков) может попасть на быстрый путь
+        if len(text) <= 17 and text.lstrip('+-').isdigit():
+            return _decimal_number(int(text))
+        try:
+            return Decimal(text)
+        except decimal.InvalidOperation:
+            # Порядок вне допустимого диапазона ("1e99999999999999999999")
+            raise ValueError(f'Не число: {value!r}') from None
+    if isinstance(value, int):
+        # bool и подклассы int
+        return _decimal_number(int(value))
+    raise ValueError(f'Не число: {value!r}')
+
+
+def _fast_add(a, b):
+    result = a + b
+    return result if -_FAST_LIMIT <= result <= _FAST_LIMIT else None
+
+
+def _fast_subtract(a, b):
+    result = a - b
+    return result if -_FAST_LIMIT <= result <= _FAST_LIMIT else None
+
+
+def _fast_multiply(a, b):
+    result = a * b
+    # Нулевой результат - через Decimal: 0 * -5 даёт Decimal("-0")
+    return result if result and -_FAST_LIMIT <= result <= _FAST_LIMIT else None
+
+
+def _fast_divide(a, b):
+    if a and b and a % b == 0:
+        return a // b
+    return None
+
+
+def _fast_power(a, b):
+    if a and b >= 0 and a.bit_length() * b <= 53:
+        return a ** b
+    return None
+
+
+# Быстрый путь для целых операндов: результат вычисляется обычной арифметикой,
+# если он целый и точно представим во float (иначе None)
+_FAST_PATHS = {
+    'add': _fast_add,
+    'subtract': _fast_subtract,
+    'multiply': _fast_multiply,
+    'divide': _fast_divide,
+    'power': _fast_power,
+}
+
+
+def _decimal_power(context, a, b):
+    result = context.power(a, b)
+    if not result.is_finite():
+        # 0 ^ -1: модуль decimal возвращает Infinity без сигнала
+        raise ValueError("Деление на ноль невозможно!")
+    return result
+
+
+_DECIMAL_METHODS = {
+    'add': decimal.Context.add,
+    'subtract': decimal.Context.subtract,
+    'multiply': decimal.Context.multiply,
+    'divide': decimal.Context.divide,
+    'power': _decimal_power,
+}
+
+
+def calculate_decimal(name, a, b, context=None):
+    """
+    Вычисление операции в десятичной арифметике с контекстом context
+    (по умолчанию DECIMAL_CONTEXT).
+    
+    Быстрый путь: если оба операнда - целые числа не больше 2^53 по модулю,
+    а результат целый и тоже точно представим во float, он вычисляется
+    обычной арифметикой и возвращается как int. Такой результат не требует
+    округления и равен результату контекста.
+    
+    Returns:
+        int (быстрый путь) или Decimal
+    
+    Raises:
+        ValueError: при делении на ноль, неопределённом результате
+            или выходе порядка результата за пределы контекста
+    """
+    if context is None:
+        context = DECIMAL_CONTEXT
+    if type(a) is int and type(b) is int and context.prec >= _FAST_MIN_PRECISION:
+        result = _FAST_PATHS[name](a, b)
+        if result is not None:
+            return result
+    try:
+        return _DECIMAL_METHODS[name](context, a, b)
+    except ZeroDivisionError:
+        raise ValueError("Деление на ноль невозможно!") from None
+    except decimal.Overflow:
+        raise ValueError(f'Порядок результата больше {context.Emax}') from None
+    except decimal.InvalidOperation:
+        if name == 'divide' and b == 0:
+            # 0 / 0
+            raise ValueError("Деление на ноль невозможно!") from None
+        # Например, дробная степень отрицательного числа
+        raise ValueError("Результат не определён") from None
+
+
+def calculate(name, a, b, mode='float', context=None):
+    """
+    Выполняет операцию name над операндами режима mode.
+    context - контекст десятичного режима (см. decimal_context).
+    """
+    if mode == 'exact':
+        return calculate_exact(name, a, b)
+    if mode == 'decimal':
+        return calculate_decimal(name, a, b, context)
+    return get_operation(name).func(a, b)
+
+
+def _digits(value):
+    """Примерное количество десятичных цифр целого числа или дроби (числитель и знаменатель)."""
+    if isinstance(value, Fraction):
+        return _digits(value.numerator) + _digits(value.denominator)
+    return int(abs(value).bit_length() * math.log10(2)) + 1
+
+
+def estimate_cost(name, a, b):
+    """
+    Оценка стоимости вычисления: примерное количество десятичных цифр результата.
+    
+    Вычисления с float выполняются за постоянное время (разрядность ограничена),
+    их стоимость - 1. Для целых операндов и дробей результат точный и его размер
+    не ограничен: возведение в степень 10 ** 10000000 строит число из десяти
+    миллионов цифр.
+    """
+    exact = (int, Fraction)
+    if not (isinstance(a, exact) and isinstance(b, exact)):
+        return 1
+    if name == 'power':
+        if isinstance(b, Fraction) or abs(b) <= 1:
+            return 1
+        base = max(abs(Fraction(a).numerator), Fraction(a).denominator)
+        if base <= 1:
+            return 1
+        return int(abs(b) * math.log10(base)) + 1
+    if name in ('multiply', 'divide'):
+        return _digits(a) + _digits(b)
+    return max(_digits(a), _digits(b))
+
+
 def main():
     """Интерактивный режим калькулятора."""
     print("=== Простой калькулятор ===\n")
@@ -56,18 +390,10 @@ def main():
             num1 = float(input("Введите первое число: "))
             num2 = float(input("Введите второе число: "))
             
-            operations = {
-                '1': ('+', add),
-                '2': ('-', subtract),
-                '3': ('*', multiply),
-                '4': ('/', divide),
-                '5': ('^', power)
-            }
-            
-            operator, func = operations[choice]
-            result = func(num1, num2)
+            operation = OPERATIONS[int(choice) - 1]
+            result = operation.func(num1, num2)
             
-            print(f"\nРезультат: {num1} {operator} {num2} = {result}\n")
+            print(f"\nРезультат: {num1} {operation.symbol} {num2} = {result}\n")
             
         except ValueError as e:
             print(f"Ошибка: {e}\n")
@@ -79,4 +405,9 @@ def main():
 
 
 if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        # Потоковый режим: python calculator.py --stream [файл] [--keep-going]
+        from calculator_stream import main as stream_main
+        sys.exit(stream_main(sys.argv[1:]))
     main()
@@ -0,0 +1,103 @@
+"""
+Пакетный (векторизованный) режим калькулятора.
+
+Позволяет выполнить одну операцию сразу над целыми последовательностями
+операндов за один проход NumPy вместо вызова функций калькулятора
+для каждой пары чисел.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from calculator import get_operation
+
+# Результат пакетного вычисления:
+# values - массив результатов (NaN там, где произошла ошибка)
+# errors - булева маска элементов, для которых вычисление невозможно
+BatchResult = namedtuple('BatchResult', ['values', 'errors'])
+
+ERROR_POLICIES = ('mask', 'raise')
+
+
+def _power(a, b):
+    """Векторизованное возведение в степень с маской недопустимых элементов."""
+    values = np.power(a, b)
+    # Python не допускает 0 в отрицательной степени, отрицательное основание
+    # с дробной степенью (комплексный результат) и переполнение
+    errors = ~np.isfinite(values) & np.isfinite(a) & np.isfinite(b)
+    return values, errors
+
+
+def _divide(a, b):
+    """Векторизованное деление с маской деления на ноль."""
+    errors = b == 0
+    values = np.divide(a, b, out=np.full(a.shape, np.nan), where=~errors)
+    return values, errors
+
+
+def _elementwise(ufunc):
+    """Оборачивает ufunc NumPy в функцию без ошибок по элементам."""
+    def operation(a, b):
+        values = ufunc(a, b)
+        return values, np.zeros(values.shape, dtype=bool)
+    return operation
+
+
+# Векторизованные реализации операций по каноническому имени операции
+BATCH_OPERATIONS = {
+    'add': _elementwise(np.add),
+    'subtract': _elementwise(np.subtract),
+    'multiply': _elementwise(np.multiply),
+    'divide': _divide,
+    'power': _power,
+}
+
+
+def batch_calculate(operation, a, b, on_error='mask'):
+    """
+    Выполняет операцию над последовательностями операндов.
+
+    Args:
+        operation: Название операции (add, subtract, multiply, divide, power)
+        a: Последовательность или массив NumPy первых операндов (или число)
+        b: Последовательность или массив NumPy вторых операндов (или число);
+            если оба операнда - числа, результат - массив из одного элемента
+        on_error: Политика ошибок: 'mask' - вернуть маску ошибочных
+            элементов, 'raise' - выбросить ValueError при первой ошибке
+
+    Returns:
+        BatchResult: массив результатов и булева маска ошибок
+    """
+    if on_error not in ERROR_POLICIES:
+        raise ValueError(f'Неизвестная политика ошибок: {on_error}')
+
+    op = get_operation(operation.lower())
+    if op is None:
+        raise ValueError(f'Неизвестная операция: {operation}')
+    vectorized = BATCH_OPERATIONS[op.name]
+
+    try:
+        # Числа приводятся к массивам из одного элемента: у результата
+        # операции над 0-мерными массивами нет индексации по маске
+        a = np.atleast_1d(np.asarray(a, dtype=np.float64))
+        b = np.atleast_1d(np.asarray(b, dtype=np.float64))
+        a, b = np.broadcast_arrays(a, b)
+    except (ValueError, TypeError):
+        raise ValueError('Операнды должны быть числами одинаковой длины') from None
+
+    with np.errstate(all='ignore'):
+        values, errors = vectorized(a, b)
+
+    if errors.any():
+        values[errors] = np.nan
+        if on_error == 'raise':
+            index = int(np.flatnonzero(errors)[0])
+            # Сообщение об ошибке такое же, как у скалярной функции
+            try:
+                op.func(float(a.flat[index]), float(b.flat[index]))
+            except (ValueError, ArithmeticError) as e:
+                raise ValueError(str(e)) from None
+            raise ValueError(f'Недопустимый результат для элемента {index}')
+
+    return BatchResult(values, errors)
@@ -0,0 +1,188 @@
+"""
+Массовое вычисление операций из больших CSV/NDJSON файлов на нескольких ядрах.
+
+Входной файл делится на блоки строк, блоки вычисляются в пуле процессов,
+а результаты записываются в исходном порядке. Записи разбираются и
+вычисляются теми же функциями, что и POST /api/calculate (operation_request),
+поэтому результаты и сообщения об ошибках совпадают с API. Очереди заданий
+здесь нет: размер результата точного режима ограничен EXACT_MAX_DIGITS цифр.
+
+Форматы:
+    CSV:    operation,a,b (строка заголовка необязательна)
+            -> result,error
+    NDJSON: {"operation": "add", "a": 10, "b": 5}
+            -> тело ответа API для каждой записи
+
+Пример:
+    python calculator_bulk.py data.csv results.csv --workers 8 --chunk-size 50000
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from operation_request import evaluate_operation
+from history_store import HistoryEntry
+
+DEFAULT_CHUNK_SIZE = 10000
+CSV_FIELDS = ('operation', 'a', 'b')
+
+
+def _evaluate_csv(lines):
+    """Вычисляет блок CSV-строк и возвращает (текст результата, число записей, число ошибок)."""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    records = 0
+    failed = 0
+    for row in csv.reader(lines):
+        if not row:
+            continue
+        if row[0].strip().lower() == 'operation':
+            # Строка заголовка
+            writer.writerow(('result', 'error'))
+            continue
+        records += 1
+        if len(row) != len(CSV_FIELDS):
+            failed += 1
+            writer.writerow(('', 'Ожидается запись вида "operation,a,b"'))
+            continue
+        body, status, _ = evaluate_operation(dict(zip(CSV_FIELDS, row)))
+        if status == 200:
+            writer.writerow((body['result'], ''))
+        else:
+            failed += 1
+            writer.writerow(('', body['error']))
+    return out.getvalue(), records, failed
+
+
+def _evaluate_ndjson(lines):
+    """Вычисляет блок NDJSON-строк и возвращает (текст результата, число записей, число ошибок)."""
+    out = []
+    records = 0
+    failed = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        records += 1
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        if data is None:
+            body, status = {'error': 'Требуется JSON формат данных'}, 400
+        else:
+            body, status, _ = evaluate_operation(data)
+        if status != 200:
+            failed += 1
+        out.append(json.dumps(body, ensure_ascii=False, sort_keys=True, default=HistoryEntry.to_dict))
+        out.append('\n')
+    return ''.join(out), records, failed
+
+
+EVALUATORS = {
+    'csv': _evaluate_csv,
+    'ndjson': _evaluate_ndjson,
+}
+
+
+def detect_format(path):
+    """Определяет формат файла по расширению."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    return 'csv'
+
+
+def iter_chunks(lines, chunk_size):
+    """Делит поток строк на блоки по chunk_size строк."""
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bulk_evaluate(source, out, file_format='csv', workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Вычисляет все записи из source и пишет результаты в out в исходном порядке.
+
+    Одновременно в обработке находится не более 2 * workers блоков,
+    поэтому память ограничена независимо от размера файла.
+
+    Returns:
+        dict: статистика (records, failed, seconds, records_per_second)
+    """
+    evaluator = EVALUATORS[file_format]
+    workers = workers or os.cpu_count() or 1
+    records = 0
+    failed = 0
+    started = time.perf_counter()
+
+    def collect(future):
+        nonlocal records, failed
+        text, chunk_records, chunk_failed = future.result()
+        out.write(text)
+        records += chunk_records
+        failed += chunk_failed
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in iter_chunks(source, chunk_size):
+            pending.append(executor.submit(evaluator, chunk))
+            if len(pending) >= 2 * workers:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+
+    seconds = time.perf_counter() - started
+    return {
+        'records': records,
+        'failed': failed,
+        'seconds': seconds,
+        'records_per_second': records / seconds if seconds else 0.0,
+    }
+
+
+def main(argv=None):
+    """Точка входа командной строки. Возвращает код завершения."""
+    parser = argparse.ArgumentParser(
+        description='Массовое вычисление операций из CSV/NDJSON файла на нескольких ядрах'
+    )
+    parser.add_argument('input', help='Входной файл (CSV или NDJSON)')
+    parser.add_argument('output', nargs='?', default='-', help='Выходной файл (по умолчанию stdout)')
+    parser.add_argument('-f', '--format', choices=sorted(EVALUATORS),
+                        help='Формат входного файла (по умолчанию по расширению)')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='Количество процессов (по умолчанию число ядер)')
+    parser.add_argument('-c', '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Количество строк в блоке (по умолчанию {DEFAULT_CHUNK_SIZE})')
+    args = parser.parse_args(argv)
+
+    if args.chunk_size <= 0 or (args.workers is not None and args.workers <= 0):
+        parser.error('Размер блока и количество процессов должны быть положительными')
+
+    file_format = args.format or detect_format(args.input)
+    with open(args.input, encoding='utf-8', newline='') as source:
+        if args.output == '-':
+            stats = bulk_evaluate(source, sys.stdout, file_format, args.workers, args.chunk_size)
+        else:
+            with open(args.output, 'w', encoding='utf-8', newline='') as out:
+                stats = bulk_evaluate(source, out, file_format, args.workers, args.chunk_size)
+
+    sys.stderr.write(
+        f"Обработано записей: {stats['records']}, с ошибками: {stats['failed']}, "
+        f"время: {stats['seconds']:.2f} с, скорость: {stats['records_per_second']:.0f} записей/с\n"
+    )
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Потоковый (неинтерактивный) режим калькулятора.
+
+Читает построчно из stdin или файла выражения ("2 * (3 + 4)") или записи
+вида "операция,a,b" ("add,10,5") и сразу пишет результаты в stdout,
+по одному на строку. Память не зависит от размера входных данных.
+
+Примеры:
+    cat data.csv | python calculator.py --stream
+    python calculator_stream.py data.txt --keep-going > results.txt
+"""
+
+import argparse
+import os
+import sys
+
+from calculator import get_operation
+from expression_engine import evaluate
+
+# Размер буфера вывода (байт)
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+
+def format_result(result):
+    """Форматирует результат: целые значения выводятся без дробной части."""
+    if isinstance(result, float) and result.is_integer():
+        return str(int(result))
+    return str(result)
+
+
+def evaluate_line(line):
+    """
+    Вычисляет одну строку: запись "операция,a,b" или выражение.
+
+    Raises:
+        ValueError: если строку не удалось разобрать или вычислить
+    """
+    if ',' in line:
+        parts = line.split(',')
+        if len(parts) != 3:
+            raise ValueError('Ожидается запись вида "операция,a,b"')
+        operation = get_operation(parts[0].strip().lower())
+        if operation is None:
+            raise ValueError(f'Неизвестная операция: {parts[0].strip()}')
+        try:
+            a = float(parts[1])
+            b = float(parts[2])
+        except ValueError:
+            raise ValueError('Поля "a" и "b" должны быть числами') from None
+        return operation.func(a, b)
+    return evaluate(line)
+
+
+def stream(lines, out, keep_going=False, errors=None, flush=False):
+    """
+    Вычисляет строки по мере чтения и пишет результаты в out.
+
+    Пустые строки и строки-комментарии (начинаются с #) пропускаются.
+
+    Args:
+        lines: Итерируемый источник строк (файл, stdin)
+        out: Поток для результатов
+        keep_going: Продолжать после ошибочных строк (иначе остановиться)
+        errors: Поток для сообщений об ошибках (по умолчанию stderr)
+        flush: Сбрасывать буфер вывода после каждой строки
+
+    Returns:
+        tuple: (количество вычисленных строк, количество ошибочных строк)
+    """
+    errors = errors or sys.stderr
+    processed = 0
+    failed = 0
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            result = evaluate_line(line)
+        except (ValueError, ArithmeticError, TypeError) as e:
+            failed += 1
+            errors.write(f'Строка {number}: {e}: {line}\n')
+            if not keep_going:
+                break
+            continue
+        out.write(format_result(result))
+        out.write('\n')
+        if flush:
+            out.flush()
+        processed += 1
+    out.flush()
+    return processed, failed
+
+
+def main(argv=None):
+    """Точка входа потокового режима. Возвращает код завершения."""
+    parser = argparse.ArgumentParser(
+        description='Потоковое вычисление выражений или записей "операция,a,b"'
+    )
+    parser.add_argument('input', nargs='?', default='-',
+                        help='Входной файл (по умолчанию stdin)')
+    parser.add_argument('-k', '--keep-going', action='store_true',
+                        help='Продолжать после ошибочных строк и сообщать о них в stderr')
+    parser.add_argument('-u', '--unbuffered', action='store_true',
+                        help='Выводить каждый результат сразу, без буферизации')
+    parser.add_argument('--stream', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    out = open(sys.stdout.fileno(), 'w', buffering=OUTPUT_BUFFER_SIZE,
+               encoding='utf-8', closefd=False)
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    try:
+        processed, failed = stream(source, out, args.keep_going, flush=args.unbuffered)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # Получатель закрыл канал (например, head) - это не ошибка.
+        # Оставшийся буфер некуда сбрасывать, поэтому stdout перенаправляется в devnull
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    if failed:
+        sys.stderr.write(f'Обработано строк: {processed}, с ошибками: {failed}\n')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
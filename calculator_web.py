@@ -4,7 +4,13 @@
 """
 
 import streamlit as st
-from calculator import add, subtract, multiply, divide, power
+from calculator import (
+    DECIMAL_CONTEXT, MAX_DECIMAL_PRECISION, MODES, ROUNDING_MODES,
+    decimal_context, get_operation, rounding_name, to_number
+)
+from expression_engine import check_exact_cost
+from number_format import format_number
+from result_cache import calculate, shared_cache
 
 # Настройка страницы
 st.set_page_config(
@@ -84,6 +90,13 @@ if 'operation' not in st.session_state:
     st.session_state.operation = None
 if 'waiting_for_number' not in st.session_state:
     st.session_state.waiting_for_number = False
+# Режим вычислений сессии и настройки десятичного режима
+if 'mode' not in st.session_state:
+    st.session_state.mode = 'float'
+if 'precision' not in st.session_state:
+    st.session_state.precision = DECIMAL_CONTEXT.prec
+if 'rounding' not in st.session_state:
+    st.session_state.rounding = rounding_name(DECIMAL_CONTEXT)
 
 def input_number(num):
     """Обработка ввода цифры."""
@@ -140,7 +153,8 @@ def set_operation(op):
         # Выполняем предыдущую операцию перед установкой новой
         calculate_result()
     
-    st.session_state.previous_number = float(st.session_state.current_number)
+    # Число приводится к режиму вычислений при расчёте, поэтому хранится строкой
+    st.session_state.previous_number = st.session_state.current_number
     st.session_state.operation = op
     st.session_state.waiting_for_number = True
 
@@ -150,27 +164,26 @@ def calculate_result():
         return
     
     try:
-        num1 = st.session_state.previous_number
-        num2 = float(st.session_state.current_number)
+        mode = st.session_state.mode
+        num1 = to_number(st.session_state.previous_number, mode)
+        num2 = to_number(st.session_state.current_number, mode)
         
-        if st.session_state.operation == '+':
-            result = add(num1, num2)
-        elif st.session_state.operation == '-':
-            result = subtract(num1, num2)
-        elif st.session_state.operation == '*':
-            result = multiply(num1, num2)
-        elif st.session_state.operation == '/':
-            result = divide(num1, num2)
-        elif st.session_state.operation == '^':
-            result = power(num1, num2)
-        else:
+        operation = get_operation(st.session_state.operation)
+        if operation is None:
             return
+        context = None
+        if mode == 'decimal':
+            context = decimal_context(int(st.session_state.precision), st.session_state.rounding)
+        if mode == 'exact':
+            # Вычисление идёт в процессе Streamlit: слишком большой результат не считается
+            check_exact_cost(operation.name, num1, num2)
+        result = calculate(operation.name, num1, num2, mode, context)
         
         # Форматируем результат
-        if result == int(result):
+        if isinstance(result, float) and result == int(result):
             result_str = str(int(result))
         else:
-            result_str = str(result)
+            result_str = format_number(result)
         
         st.session_state.display = result_str
         st.session_state.current_number = result_str
@@ -187,6 +200,19 @@ def calculate_result():
         st.error(f"❌ Произошла ошибка: {e}")
         clear_all()
 
+# Настройки режима вычислений на боковой панели
+with st.sidebar:
+    st.selectbox("Режим вычислений", MODES, key="mode",
+                 help="float - числа с плавающей точкой, exact - точные целые и дроби, "
+                      "decimal - десятичная арифметика (0.1 + 0.2 = 0.3)")
+    if st.session_state.mode == 'decimal':
+        st.number_input("Точность (значащих цифр)", min_value=1,
+                        max_value=MAX_DECIMAL_PRECISION, step=1, key="precision")
+        st.selectbox("Округление", ROUNDING_MODES, key="rounding")
+    if shared_cache.enabled:
+        cache_stats = shared_cache.stats()
+        st.caption(f"Кэш результатов: попаданий {cache_stats['hits']}, промахов {cache_stats['misses']}")
+
 # Основной интерфейс калькулятора
 st.markdown('<div class="calculator-container">', unsafe_allow_html=True)
 
@@ -309,6 +335,7 @@ with st.expander("ℹ️ Справка"):
     - Нажмите "C" для очистки
     - Нажмите "⌫" для удаления последней цифры
     - Нажмите "±" для изменения знака числа
+    - Режим вычислений (например, десятичный) выбирается на боковой панели
     
     **Доступные операции:**
     - ➕ Сложение
@@ -0,0 +1,296 @@
+"""
+Вычисление арифметических выражений.
+
+Поддерживаются приоритет операций, скобки, унарный минус и обозначения
+операций калькулятора (+, -, *, ×, /, ÷, ^, **, а также add, subtract,
+multiply, divide, power). Выражение разбирается по «форме»: числа заменяются
+позициями, и для каждой формы один раз компилируется функция на основе
+функций модуля calculator. Скомпилированные формы хранятся в LRU-кэше,
+поэтому выражения вида "10 + 5" и "7 + 3" разбираются только один раз.
+
+В точном режиме (mode='exact') числа выражения - int и Fraction, а операции
+выполняются calculator.calculate_exact. Размер промежуточных результатов
+ограничен EXACT_MAX_DIGITS цифрами, чтобы выражение вроде "9 ^ 9 ^ 9"
+не занимало процесс надолго (check_exact_cost; то же ограничение
+действует для отдельных операций бота и веб-интерфейса).
+
+В десятичном режиме (mode='decimal') числа - Decimal (целые, точно
+представимые во float, - int), а операции выполняются
+calculator.calculate_decimal в контексте, переданном в evaluate.
+
+Операции точного и десятичного режимов выполняются через общий кэш
+результатов (result_cache), если он включён.
+"""
+
+import os
+import re
+from decimal import Context, Decimal, getcontext, localcontext
+from fractions import Fraction
+from functools import lru_cache
+
+import result_cache
+from calculator import DECIMAL_CONTEXT, OPERATIONS, OPERATION_REGISTRY, estimate_cost, to_number
+from number_format import format_number
+
+# Максимальное количество скомпилированных форм выражений в кэше
+EXPRESSION_CACHE_SIZE = int(os.getenv('EXPRESSION_CACHE_SIZE', 1024))
+# Максимальная длина выражения
+MAX_EXPRESSION_LENGTH = 1000
+# Точный режим: максимальное количество цифр результата операции
+EXACT_MAX_DIGITS = int(os.getenv('EXACT_EXPRESSION_MAX_DIGITS', 100000))
+
+_TOKEN_RE = re.compile(
+    r'\s*(?:'
+    r'(?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)'
+    r'|(?P<op>\*\*|[-+*/×÷^()])'
+    r'|(?P<word>[A-Za-z]+)'
+    r')'
+)
+
+# Приведение обозначений операций к единому виду (символу операции)
+_OPERATOR_ALIASES = {key: operation.symbol for key, operation in OPERATION_REGISTRY.items()}
+_OPERATOR_ALIASES.update({'(': '(', ')': ')'})
+
+# Функции калькулятора для бинарных операций: символ -> имя в пространстве имён
+_FUNCTIONS = {operation.symbol: operation.name for operation in OPERATIONS}
+
+
+
+def check_exact_cost(name, a, b):
+    """
+    Проверяет размер результата точной операции до вычисления.
+    Используется также ботом и веб-интерфейсом, которые вычисляют в своём потоке.
+
+    Raises:
+        ValueError: результат длиннее EXACT_MAX_DIGITS цифр
+    """
+    cost = estimate_cost(name, a, b)
+    if cost > EXACT_MAX_DIGITS:
+        raise ValueError(
+            f'Результат слишком велик: около {cost} цифр (максимум {EXACT_MAX_DIGITS})'
+        )
+
+
+def _exact_function(name):
+    """Точная операция с ограничением размера результата."""
+    def compute(a, b):
+        check_exact_cost(name, a, b)
+        return result_cache.calculate(name, a, b, 'exact')
+    return compute
+
+
+def _decimal_function(name):
+    """Десятичная операция в текущем контексте модуля decimal (его задаёт evaluate)."""
+    def compute(a, b):
+        return result_cache.calculate(name, a, b, 'decimal', getcontext())
+    return compute
+
+
+# Пространства имён скомпилированных форм по режимам вычислений
+_NAMESPACES = {
+    'float': {operation.name: operation.func for operation in OPERATIONS},
+    'exact': {operation.name: _exact_function(operation.name) for operation in OPERATIONS},
+    'decimal': {operation.name: _decimal_function(operation.name) for operation in OPERATIONS},
+}
+for _namespace in _NAMESPACES.values():
+    _namespace['__builtins__'] = {}
+
+# Маркер позиции числа в форме выражения
+NUMBER = '#'
+
+
+class ExpressionError(ValueError):
+    """Ошибка разбора выражения."""
+
+
+def _exact_number(token):
+    """Число точного режима: int или Fraction (десятичная дробь записывается точно)."""
+    _, _, exponent = token.lower().partition('e')
+    if exponent and abs(int(exponent)) > EXACT_MAX_DIGITS:
+        raise ExpressionError(f'Слишком большой порядок числа: {token}')
+    value = Fraction(token)
+    return value.numerator if value.denominator == 1 else value
+
+
+def _decimal_number(token):
+    """Число десятичного режима: Decimal или int (целое, точно представимое во float)."""
+    try:
+        return to_number(token, 'decimal')
+    except ValueError:
+        raise ExpressionError(f'Слишком большой порядок числа: {token}') from None
+
+
+# Преобразование текста числа по режиму вычислений
+_NUMBER_TYPES = {'float': float, 'exact': _exact_number, 'decimal': _decimal_number}
+
+
+def tokenize(text, mode='float'):
+    """
+    Разбивает выражение на форму и список чисел (типа режима mode).
+
+    Returns:
+        tuple: (форма - кортеж токенов с NUMBER вместо чисел, список чисел)
+    """
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError('Выражение слишком длинное')
+
+    shape = []
+    values = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if not match or match.end() == position:
+            raise ExpressionError(f'Недопустимый символ: {text[position:].strip()[:1]}')
+        position = match.end()
+        if match.group('number'):
+            shape.append(NUMBER)
+            values.append(_NUMBER_TYPES[mode](match.group('number')))
+        else:
+            token = (match.group('op') or match.group('word')).lower()
+            if token not in _OPERATOR_ALIASES:
+                raise ExpressionError(f'Неизвестная операция: {token}')
+            shape.append(_OPERATOR_ALIASES[token])
+
+    if not shape:
+        raise ExpressionError('Пустое выражение')
+    return tuple(shape), values
+
+
+class _Parser:
+    """Рекурсивный спуск по форме выражения с генерацией исходного кода."""
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.position = 0
+        self.slot = 0
+
+    def peek(self):
+        if self.position < len(self.shape):
+            return self.shape[self.position]
+        return None
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        source = self.expression()
+        if self.peek() is not None:
+            raise ExpressionError(f'Неожиданный токен: {self.peek()}')
+        return source
+
+    def expression(self):
+        # expression := term (('+' | '-') term)*
+        source = self.term()
+        while self.peek() in ('+', '-'):
+            operator = self.take()
+            source = f'{_FUNCTIONS[operator]}({source}, {self.term()})'
+        return source
+
+    def term(self):
+        # term := unary (('*' | '/') unary)*
+        source = self.unary()
+        while self.peek() in ('*', '/'):
+            operator = self.take()
+            source = f'{_FUNCTIONS[operator]}({source}, {self.unary()})'
+        return source
+
+    def unary(self):
+        # unary := ('-' | '+') unary | power
+        if self.peek() == '-':
+            self.take()
+            return f'(-{self.unary()})'
+        if self.peek() == '+':
+            self.take()
+            return self.unary()
+        return self.power()
+
+    def power(self):
+        # power := atom ('^' unary)?  - правоассоциативно, как в Python
+        source = self.atom()
+        if self.peek() == '^':
+            self.take()
+            source = f'power({source}, {self.unary()})'
+        return source
+
+    def atom(self):
+        # atom := NUMBER | '(' expression ')'
+        token = self.take()
+        if token == NUMBER:
+            source = f'v[{self.slot}]'
+            self.slot += 1
+            return source
+        if token == '(':
+            source = self.expression()
+            if self.take() != ')':
+                raise ExpressionError('Не закрыта скобка')
+            return source
+        if token is None:
+            raise ExpressionError('Неожиданный конец выражения')
+        raise ExpressionError(f'Неожиданный токен: {token}')
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_shape(shape, mode='float'):
+    """
+    Компилирует форму выражения в функцию от списка чисел.
+    Результат кэшируется, поэтому каждая форма разбирается один раз для каждого режима.
+    """
+    try:
+        source = _Parser(shape).parse()
+        return eval(f'lambda v: {source}', _NAMESPACES[mode])
+    except (RecursionError, SyntaxError, MemoryError):
+        raise ExpressionError('Выражение слишком сложное') from None
+
+
+def evaluate(text, mode='float', context=None):
+    """
+    Вычисляет выражение в режиме mode ('float', 'exact' или 'decimal').
+    context - контекст десятичного режима (по умолчанию DECIMAL_CONTEXT).
+
+    Raises:
+        ExpressionError: если выражение не удалось разобрать
+        ValueError: при ошибке вычисления (например, деление на ноль)
+    """
+    shape, values = tokenize(text, mode)
+    function = compile_shape(shape, mode)
+    if mode == 'decimal':
+        # Контекст задаётся один раз на выражение, а не для каждой операции
+        with localcontext(context or DECIMAL_CONTEXT):
+            return function(values)
+    return function(values)
+
+
+def _format_number(value):
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else str(value)
+    if isinstance(value, Fraction):
+        # Дробь в выражении - десятичная запись числа, поэтому деление конечно
+        # и его цифр не больше, чем символов в выражении
+        return str(Context(prec=MAX_EXPRESSION_LENGTH).divide(Decimal(value.numerator), value.denominator))
+    return format_number(value)
+
+
+def normalize(text, mode='float'):
+    """Возвращает выражение в едином виде, например "2 × (3 + 4)" -> "2 * (3 + 4)"."""
+    shape, values = tokenize(text, mode)
+    numbers = iter(values)
+    parts = []
+    previous = None
+    for token in shape:
+        if token == NUMBER:
+            parts.append(_format_number(next(numbers)))
+        elif token in ('(', ')') or previous not in (NUMBER, ')'):
+            # Скобки и унарные знаки пишутся без пробелов
+            parts.append(token)
+        else:
+            parts.append(f' {token} ')
+        previous = token
+    return ''.join(parts)
+
+
+def cache_info():
+    """Статистика кэша скомпилированных форм."""
+    return compile_shape.cache_info()
@@ -0,0 +1,239 @@
+"""
+Рассылка новых записей истории подписчикам (Server-Sent Events).
+
+Обработчик запроса только кладёт записи во входную очередь рассылки
+(без ожидания, при переполнении записи отбрасываются и учитываются
+в счётчике). Фоновый поток раскладывает их по очередям подписчиков.
+Очередь каждого подписчика ограничена: если подписчик не успевает
+читать и его очередь переполнилась, он отключается и может
+переподключиться с Last-Event-ID, чтобы дочитать пропущенное из истории.
+
+Подписчики ASGI-версии API получают AsyncSubscription: записи
+передаются в их цикл событий через call_soon_threadsafe, и ожидание
+записи не занимает поток.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Сигнал отключения подписки в её очереди
+_CLOSED = object()
+
+
+class SubscriptionClosed(Exception):
+    """Подписка отключена."""
+
+
+class Subscription:
+    """Подписка на новые записи истории с ограниченной очередью."""
+
+    def __init__(self, queue_size):
+        self._queue = queue.Queue(maxsize=queue_size)
+        # Подписчик отключён из-за переполнения очереди
+        self.overflowed = False
+
+    def get(self, timeout=None):
+        """
+        Возвращает следующую запись или None, если за timeout записей не было.
+
+        Raises:
+            SubscriptionClosed: подписка отключена (переполнение или остановка рассылки)
+        """
+        try:
+            entry = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if entry is _CLOSED:
+            raise SubscriptionClosed()
+        return entry
+
+    def _offer(self, entry):
+        """Кладёт запись в очередь без ожидания; False, если очередь переполнена."""
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            return False
+
+    def _close(self):
+        """Отключает подписку: читатель получит SubscriptionClosed после уже полученных записей."""
+        while True:
+            try:
+                self._queue.put_nowait(_CLOSED)
+                return
+            except queue.Full:
+                # Место под сигнал освобождается за счёт самой старой записи:
+                # после переподключения она будет дочитана из истории
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class AsyncSubscription:
+    """
+    Подписка для asyncio: записи доставляются в цикл событий loop.
+
+    asyncio.Queue не потокобезопасна, поэтому поток рассылки только
+    планирует put_nowait в цикле событий, а размер очереди ограничивается
+    собственным счётчиком под блокировкой.
+    """
+
+    def __init__(self, queue_size, loop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._max_size = queue_size
+        self._size = 0
+        self._lock = threading.Lock()
+        self.overflowed = False
+
+    async def get(self, timeout=None):
+        """
+        Возвращает следующую запись или None, если за timeout записей не было.
+
+        Raises:
+            SubscriptionClosed: подписка отключена (переполнение или остановка рассылки)
+        """
+        try:
+            entry = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if entry is _CLOSED:
+            raise SubscriptionClosed()
+        with self._lock:
+            self._size -= 1
+        return entry
+
+    def _offer(self, entry):
+        with self._lock:
+            if self._size >= self._max_size:
+                return False
+            self._size += 1
+        return self._schedule(entry)
+
+    def _close(self):
+        # Очередь asyncio не ограничена, место под сигнал есть всегда
+        self._schedule(_CLOSED)
+
+    def _schedule(self, item):
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+            return True
+        except RuntimeError:
+            # Цикл событий уже закрыт: читать подписку некому
+            return False
+
+
+class HistoryBroadcaster:
+    """Рассылка записей истории подписчикам через фоновый поток."""
+
+    _STOP = object()
+
+    def __init__(self, queue_size=10000, subscriber_queue_size=1000):
+        """
+        Args:
+            queue_size: Размер входной очереди рассылки
+            subscriber_queue_size: Размер очереди каждого подписчика
+        """
+        self.subscriber_queue_size = subscriber_queue_size
+        self._inbox = queue.Queue(maxsize=queue_size)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.published = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    def publish(self, entries):
+        """Ставит записи в очередь рассылки. Не блокирует вызывающего."""
+        if not self._subscribers or not entries:
+            return
+        try:
+            self._inbox.put_nowait(list(entries))
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(entries)
+
+    def subscribe(self, loop=None):
+        """
+        Создаёт подписку и при необходимости запускает поток рассылки.
+
+        Args:
+            loop: Цикл событий asyncio; если задан, возвращается AsyncSubscription
+        """
+        if loop is None:
+            subscription = Subscription(self.subscriber_queue_size)
+        else:
+            subscription = AsyncSubscription(self.subscriber_queue_size, loop)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='history-broadcaster', daemon=True
+                )
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def flush(self):
+        """Ждёт, пока все поставленные в очередь записи будут разосланы."""
+        self._inbox.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'queue_depth': self._inbox.qsize(),
+                'published': self.published,
+                'dropped': self.dropped,
+                'disconnected': self.disconnected,
+            }
+
+    def shutdown(self, timeout=5.0):
+        """Останавливает поток рассылки и отключает подписчиков."""
+        with self._lock:
+            thread = self._thread
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscribers:
+            subscription._close()
+        if thread is not None and thread.is_alive():
+            self._inbox.put(self._STOP)
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            entries = self._inbox.get()
+            try:
+                if entries is self._STOP:
+                    return
+                self._deliver(entries)
+            except Exception as e:
+                logger.error(f"Ошибка рассылки записей истории: {e}")
+            finally:
+                self._inbox.task_done()
+
+    def _deliver(self, entries):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        slow = []
+        for subscription in subscribers:
+            for entry in entries:
+                if not subscription._offer(entry):
+                    slow.append(subscription)
+                    break
+        with self._lock:
+            self.published += len(entries)
+            for subscription in slow:
+                self._subscribers.discard(subscription)
+                self.disconnected += 1
+        for subscription in slow:
+            subscription.overflowed = True
+            subscription._close()
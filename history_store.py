@@ -0,0 +1,809 @@
+"""
+Хранилище истории вычислений.
+
+Записи индексируются по ID (поиск и удаление за O(1)), а размер истории
+ограничен: при переполнении вытесняются самые старые записи (кольцевой буфер).
+
+Хранилище безопасно при многопоточной работе сервера. Блокировка защищает
+только выдачу ID и изменение индекса (операции O(1)), поэтому сами
+вычисления в обработчиках запросов выполняются параллельно и не ждут друг друга.
+
+SQLiteHistoryStore - постоянное хранилище с тем же интерфейсом на SQLite
+(режим WAL) с групповой фиксацией записей в фоновом потоке.
+
+HistoryEntry - компактная запись истории: хранит только данные вычисления,
+а текст выражения формирует при обращении.
+
+Результаты точного и десятичного режимов (большие int, Fraction и Decimal)
+хранятся как есть; в ответы они попадают в виде number_format.display,
+а в SQLite - в двоичном виде (см. _encode_value) с числовой копией
+результата для фильтра по диапазону (см. _numeric_value).
+"""
+
+import logging
+import math
+import queue
+import sqlite3
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from concurrent.futures import Future
+from decimal import Decimal
+from fractions import Fraction
+from itertools import islice
+
+from calculator import OPERATIONS
+from number_format import display, format_number
+
+logger = logging.getLogger(__name__)
+
+# Имя операции -> символ в тексте выражения
+_SYMBOLS = {operation.name: operation.symbol for operation in OPERATIONS}
+
+
+class HistoryEntry:
+    """
+    Запись истории вычислений.
+
+    Поля хранятся в слотах, а не в словаре, и текст выражения не хранится:
+    он формируется при обращении (обычно при сериализации ответа), поэтому
+    запись занимает в несколько раз меньше памяти, чем словарь со строкой.
+    Доступ по ключу (entry['result'], entry.get(...)) работает как у словаря,
+    поэтому хранилища и обработчики принимают и записи-словари.
+    """
+
+    __slots__ = ('operation', 'a', 'b', 'result', 'id', 'timestamp')
+
+    # Поля в порядке сериализации
+    FIELDS = ('operation', 'a', 'b', 'result', 'expression', 'id', 'timestamp')
+
+    def __init__(self, operation, a, b, result, id=None, timestamp=None):
+        self.operation = operation
+        self.a = a
+        self.b = b
+        self.result = result
+        self.id = id
+        self.timestamp = timestamp
+
+    @property
+    def expression(self):
+        """Текст выражения, например "10.0 + 5.0 = 15"."""
+        return _expression(self.operation, self.a, self.b, self.result)
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.FIELDS and self[key] is not None
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def keys(self):
+        return [field for field in self.FIELDS if self[field] is not None]
+
+    def to_dict(self):
+        """Словарь для сериализации в JSON (ID и время - после добавления в историю)."""
+        data = {
+            'operation': self.operation,
+            'a': display(self.a),
+            'b': display(self.b),
+            'result': display(self.result),
+            'expression': _expression(self.operation, self.a, self.b, self.result),
+        }
+        if self.id is not None:
+            data['id'] = self.id
+        if self.timestamp is not None:
+            data['timestamp'] = self.timestamp
+        return data
+
+    def __eq__(self, other):
+        if isinstance(other, (HistoryEntry, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f'HistoryEntry({self.to_dict()!r})'
+
+
+def _expression(operation, a, b, result):
+    return (
+        f'{format_number(a)} {_SYMBOLS[operation]} {format_number(b)} = {format_number(result)}'
+    )
+
+
+def _is_indexable(value):
+    """Проверяет, что результат можно положить в числовой индекс."""
+    return isinstance(value, (int, float, Fraction, Decimal)) and value == value
+
+
+# Диапазон INTEGER в SQLite
+_SQLITE_INT_MIN = -2 ** 63
+_SQLITE_INT_MAX = 2 ** 63 - 1
+# Метка Decimal в BLOB вместо длины числителя (такой длины у числителя не бывает)
+_DECIMAL_TAG = struct.pack('<I', 0xFFFFFFFF)
+
+
+def _int_bytes(number):
+    return number.to_bytes(number.bit_length() // 8 + 1, 'little', signed=True)
+
+
+def _encode_value(value):
+    """
+    Значение для SQLite. Целые вне диапазона INTEGER и дроби хранятся как BLOB:
+    длина числителя (4 байта), числитель и знаменатель в двоичном виде.
+    Двоичная запись строится за линейное время, в отличие от десятичной.
+    Decimal хранится как BLOB с меткой _DECIMAL_TAG и десятичной записью:
+    текст в столбце REAL SQLite привёл бы к float, а запись сохраняет
+    количество знаков ("0.30").
+    """
+    if type(value) is Decimal:
+        return _DECIMAL_TAG + str(value).encode('ascii')
+    if isinstance(value, Fraction) or (
+        type(value) is int and not _SQLITE_INT_MIN <= value <= _SQLITE_INT_MAX
+    ):
+        numerator = _int_bytes(value.numerator)
+        return struct.pack('<I', len(numerator)) + numerator + _int_bytes(value.denominator)
+    return value
+
+
+def _encode_operand(value):
+    """Операнд для столбца REAL: целые (точный режим) хранятся как BLOB, иначе SQLite приведёт их к float."""
+    if type(value) is int:
+        return _encode_value(Fraction(value))
+    return _encode_value(value)
+
+
+def _numeric_value(value):
+    """
+    Числовая копия результата для столбца result_number (REAL) и его индекса:
+    фильтр по диапазону результата работает и для значений, хранящихся как BLOB.
+    Значения вне диапазона float - бесконечность со своим знаком, не числа - NULL.
+    """
+    if not _is_indexable(value):
+        return None
+    try:
+        return float(value)
+    except OverflowError:
+        return math.inf if value > 0 else -math.inf
+
+
+def _decode_value(value):
+    """Обратное преобразование к _encode_value."""
+    if type(value) is not bytes:
+        return value
+    if value.startswith(_DECIMAL_TAG):
+        return Decimal(value[len(_DECIMAL_TAG):].decode('ascii'))
+    (size,) = struct.unpack_from('<I', value)
+    numerator = int.from_bytes(value[4:4 + size], 'little', signed=True)
+    denominator = int.from_bytes(value[4 + size:], 'little', signed=True)
+    return numerator if denominator == 1 else Fraction(numerator, denominator)
+
+
+class _SortedIndex:
+    """
+    Упорядоченный индекс пар (ключ, ID) из блоков ограниченного размера.
+
+    Вставка сдвигает только один блок, а не весь индекс, поэтому остаётся
+    быстрой и на миллионах записей. Выборка диапазона - бинарный поиск
+    по максимумам блоков и внутри блока.
+    """
+
+    BLOCK_SIZE = 1000
+
+    def __init__(self):
+        self._blocks = []
+        self._maxes = []
+
+    def add(self, key, entry_id):
+        item = (key, entry_id)
+        if not self._blocks:
+            self._blocks.append([item])
+            self._maxes.append(item)
+            return
+        index = bisect_left(self._maxes, item)
+        if index == len(self._maxes):
+            index -= 1
+        block = self._blocks[index]
+        insort(block, item)
+        self._maxes[index] = block[-1]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            half = self.BLOCK_SIZE
+            self._blocks[index:index + 1] = [block[:half], block[half:]]
+            self._maxes[index:index + 1] = [block[half - 1], block[-1]]
+
+    def _block_bounds(self, low, high):
+        """Индексы первого и последнего блоков, пересекающих диапазон ключей."""
+        first = 0 if low is None else bisect_left(self._maxes, (low, float('-inf')))
+        last = len(self._maxes) - 1 if high is None else bisect_left(self._maxes, (high, float('inf')))
+        return first, min(last, len(self._maxes) - 1)
+
+    def estimate(self, low=None, high=None):
+        """Оценка сверху количества ID в диапазоне по размерам блоков."""
+        first, last = self._block_bounds(low, high)
+        return sum(len(block) for block in self._blocks[first:last + 1])
+
+    def copy(self, low=None, high=None):
+        """Копия блоков, пересекающих диапазон ключей (для перебора без блокировки)."""
+        first, last = self._block_bounds(low, high)
+        snapshot = _SortedIndex()
+        # Срезы списков копируются на уровне C: блокировка держится недолго
+        snapshot._blocks = [block[:] for block in self._blocks[first:last + 1]]
+        snapshot._maxes = self._maxes[first:last + 1]
+        return snapshot
+
+    def range(self, low=None, high=None):
+        """Перебирает ID записей с low <= ключ <= high (None - без границы)."""
+        if low is None:
+            block_index, position = 0, 0
+        else:
+            start = (low, float('-inf'))
+            block_index = bisect_left(self._maxes, start)
+            position = None
+        for block in self._blocks[block_index:]:
+            if position is None:
+                position = bisect_left(block, start)
+            for key, entry_id in islice(block, position, None):
+                if high is not None and key > high:
+                    return
+                yield entry_id
+            position = 0
+
+
+class HistoryStore:
+    """
+    Ограниченная по размеру история вычислений с индексом по ID.
+
+    Для запросов query() поддерживаются вторичные индексы: по операции,
+    по времени (ID и время записи возрастают вместе, поэтому это
+    бинарный поиск по массивам) и по значению результата. Удалённые
+    и вытесненные записи убираются из вторичных индексов лениво:
+    индексы перестраиваются, когда устаревших ссылок становится больше,
+    чем живых записей.
+
+    query() держит блокировку только для копирования кандидатов из индексов,
+    а проверяет записи без неё, поэтому долгий поиск не задерживает добавление.
+    """
+
+    # Количество ID, копируемых из индекса операции и времени за одну блокировку
+    QUERY_CHUNK = 4096
+
+    def __init__(self, max_size=None):
+        """
+        Args:
+            max_size: Максимальное количество записей (None - без ограничения)
+        """
+        if max_size is not None and max_size <= 0:
+            raise ValueError('Размер истории должен быть положительным')
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._next_id = 1
+        self._last_timestamp = 0.0
+        # Версия истории: увеличивается при каждом изменении
+        self.version = 0
+        self._lock = threading.Lock()
+        self._reset_indexes()
+
+    def _reset_indexes(self):
+        # Все записи: параллельные массивы ID и времени в порядке добавления
+        self._ids = array('q')
+        self._timestamps = array('d')
+        # Операция -> параллельные массивы ID и времени
+        self._by_operation = {}
+        # Результат -> ID
+        self._by_result = _SortedIndex()
+        # Количество устаревших ссылок во вторичных индексах
+        self._stale = 0
+
+    def _index(self, entry):
+        entry_id = entry['id']
+        timestamp = entry['timestamp']
+        self._ids.append(entry_id)
+        self._timestamps.append(timestamp)
+        ids, timestamps = self._by_operation.setdefault(entry['operation'], (array('q'), array('d')))
+        ids.append(entry_id)
+        timestamps.append(timestamp)
+        if _is_indexable(entry['result']):
+            self._by_result.add(entry['result'], entry_id)
+
+    def _forget(self, count=1):
+        """Учитывает устаревшие ссылки и при необходимости перестраивает индексы."""
+        self._stale += count
+        if self._stale > max(len(self._entries), 1024):
+            self._reset_indexes()
+            for entry in self._entries.values():
+                self._index(entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._entries.values()))
+
+    def _insert(self, entry):
+        """Присваивает ID и время и добавляет запись. Вызывается под блокировкой."""
+        entry['id'] = self._next_id
+        self._next_id += 1
+        # Время записи не убывает вместе с ID, даже если системные часы сдвинулись назад
+        self._last_timestamp = max(time.time(), self._last_timestamp)
+        entry['timestamp'] = self._last_timestamp
+        self._entries[entry['id']] = entry
+        self.version += 1
+        self._index(entry)
+        if self.max_size is not None and len(self._entries) > self.max_size:
+            # Вытеснение самой старой записи
+            self._entries.popitem(last=False)
+            self._forget()
+        return entry
+
+    def add(self, entry):
+        """Добавляет запись, присваивая ей ID, и возвращает её."""
+        with self._lock:
+            return self._insert(entry)
+
+    def extend(self, entries):
+        """Добавляет несколько записей подряд под одной блокировкой."""
+        with self._lock:
+            for entry in entries:
+                self._insert(entry)
+
+    def get(self, entry_id):
+        """Возвращает запись по ID или None."""
+        # Чтение одного ключа атомарно и не требует блокировки
+        return self._entries.get(entry_id)
+
+    def delete(self, entry_id):
+        """Удаляет запись по ID и возвращает её (None, если записи нет)."""
+        with self._lock:
+            entry = self._entries.pop(entry_id, None)
+            if entry is not None:
+                self.version += 1
+                self._forget()
+            return entry
+
+    def clear(self):
+        """Очищает историю и возвращает количество удалённых записей."""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._reset_indexes()
+            self.version += 1
+            return count
+
+    def recent(self, limit=None):
+        """
+        Возвращает последние записи в хронологическом порядке.
+
+        Копируются только запрошенные записи, а не вся история.
+        """
+        with self._lock:
+            if not limit or limit <= 0 or limit >= len(self._entries):
+                return list(self._entries.values())
+            tail = list(islice(reversed(self._entries.values()), limit))
+        tail.reverse()
+        return tail
+
+    def page(self, after_id=0, limit=100):
+        """
+        Возвращает до limit записей с ID больше after_id (постраничный вывод по ключу).
+
+        Начальная позиция находится бинарным поиском в упорядоченном
+        индексе ID, поэтому длинные промежутки удалённых записей не
+        перебираются по одному ID; устаревшие ссылки индекса пропускаются.
+        """
+        with self._lock:
+            ids = self._ids
+            result = []
+            for position in range(bisect_right(ids, after_id), len(ids)):
+                if len(result) >= limit:
+                    break
+                entry = self._entries.get(ids[position])
+                if entry is not None:
+                    result.append(entry)
+            return result
+
+    def query(self, operation=None, since=None, until=None,
+              min_result=None, max_result=None, after_id=0, limit=100):
+        """
+        Возвращает до limit записей (по возрастанию ID), подходящих под все фильтры.
+
+        Args:
+            operation: Имя операции
+            since, until: Границы времени записи (Unix time, включительно)
+            min_result, max_result: Границы значения результата (включительно)
+            after_id: Курсор - вернуть только записи с ID больше after_id
+            limit: Максимальное количество записей
+        """
+        by_result = min_result is not None or max_result is not None
+        with self._lock:
+            ids, start, end = self._time_range(operation, since, until, after_id)
+            snapshot = None
+            if by_result:
+                estimate = self._by_result.estimate(min_result, max_result)
+                # Перебор по ID останавливается после limit совпадений: при доле
+                # подходящих результатов estimate / len просматривается около
+                # limit * len / estimate записей. Диапазон результата приходится
+                # прочитать целиком (он упорядочен по значению, а не по ID)
+                scanned = end - start
+                if estimate:
+                    scanned = min(scanned, limit * len(self._entries) // estimate)
+                if estimate < scanned:
+                    snapshot = self._by_result.copy(min_result, max_result)
+
+        filters = (operation, since, until, min_result, max_result, by_result)
+        result = []
+        if snapshot is not None:
+            candidates = sorted(
+                entry_id for entry_id in snapshot.range(min_result, max_result) if entry_id > after_id
+            )
+            self._collect(candidates, filters, limit, result)
+            return result
+
+        # ID по операции и времени копируются частями: курсор - последний просмотренный ID,
+        # поэтому перестройка индексов между частями не влияет на результат
+        last_id = after_id
+        while len(result) < limit:
+            with self._lock:
+                ids, start, end = self._time_range(operation, since, until, last_id)
+                chunk = ids[start:min(end, start + self.QUERY_CHUNK)]
+            if not chunk:
+                break
+            self._collect(chunk, filters, limit, result)
+            last_id = chunk[-1]
+        return result
+
+    def _collect(self, candidates, filters, limit, result):
+        """Добавляет в result записи из candidates, подходящие под фильтры (без блокировки)."""
+        operation, since, until, min_result, max_result, by_result = filters
+        for entry_id in candidates:
+            # Чтение одного ключа атомарно и не требует блокировки
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                continue
+            if operation is not None and entry['operation'] != operation:
+                continue
+            if since is not None and entry['timestamp'] < since:
+                continue
+            if until is not None and entry['timestamp'] > until:
+                continue
+            if by_result:
+                value = entry['result']
+                if not _is_indexable(value):
+                    continue
+                if min_result is not None and value < min_result:
+                    continue
+                if max_result is not None and value > max_result:
+                    continue
+            result.append(entry)
+            if len(result) >= limit:
+                return
+
+    def _time_range(self, operation, since, until, after_id):
+        """
+        Находит бинарным поиском диапазон позиций в индексе операции
+        (или в общем индексе) по времени и курсору.
+
+        Returns:
+            tuple: (массив ID, начальная позиция, конечная позиция)
+        """
+        if operation is None:
+            ids, timestamps = self._ids, self._timestamps
+        else:
+            ids, timestamps = self._by_operation.get(operation, (array('q'), array('d')))
+        start = bisect_right(ids, after_id)
+        if since is not None:
+            start = max(start, bisect_left(timestamps, since))
+        end = len(ids) if until is None else bisect_right(timestamps, until)
+        return ids, start, max(start, end)
+
+
+class SQLiteHistoryStore:
+    """
+    История вычислений в базе SQLite с тем же интерфейсом, что и HistoryStore.
+
+    Добавление записи только ставит её в очередь: фоновый поток записывает
+    все накопившиеся записи одной транзакцией (групповая фиксация), поэтому
+    обработчик запроса не ждёт записи на диск. Чтение сначала дожидается
+    записи уже поставленных в очередь записей, чтобы видеть свои изменения.
+    При запуске история в память не загружается.
+    """
+
+    # Сигнал остановки потока записи
+    _STOP = object()
+
+    # Столбец expression оставлен для совместимости со старыми базами и не
+    # заполняется: текст выражения строится из операции и операндов при чтении
+    _COLUMNS = ('id', 'operation', 'a', 'b', 'result', 'timestamp')
+    _SELECT = f"SELECT {', '.join(_COLUMNS)} FROM history"
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY,
+            operation TEXT NOT NULL,
+            a REAL,
+            b REAL,
+            result,
+            expression TEXT,
+            timestamp REAL,
+            result_number REAL
+        )
+    """
+    # Вторичные индексы для query()
+    _INDEXES = (
+        'CREATE INDEX IF NOT EXISTS history_operation ON history (operation, timestamp)',
+        'CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp)',
+        'CREATE INDEX IF NOT EXISTS history_result_number ON history (result_number)',
+    )
+
+    def __init__(self, path, max_size=None, synchronous='NORMAL'):
+        """
+        Args:
+            path: Путь к файлу базы данных
+            max_size: Максимальное количество записей (None - без ограничения)
+            synchronous: Режим PRAGMA synchronous (NORMAL или FULL)
+        """
+        if max_size is not None and max_size <= 0:
+            raise ValueError('Размер истории должен быть положительным')
+        self.path = path
+        self.max_size = max_size
+        self.synchronous = synchronous
+        self._local = threading.local()
+
+        connection = self._connect()
+        connection.execute(self._SCHEMA)
+        columns = [row[1] for row in connection.execute('PRAGMA table_info(history)')]
+        if 'timestamp' not in columns:
+            # База, созданная до появления времени записи
+            connection.execute('ALTER TABLE history ADD COLUMN timestamp REAL')
+        if 'result_number' not in columns:
+            # База без числовой копии результата: столбец заполняется один раз,
+            # индекс по самому результату заменяется индексом по копии
+            connection.execute('ALTER TABLE history ADD COLUMN result_number REAL')
+            connection.executemany(
+                'UPDATE history SET result_number = ? WHERE id = ?',
+                [
+                    (_numeric_value(_decode_value(result)), entry_id)
+                    for entry_id, result in connection.execute('SELECT id, result FROM history')
+                ]
+            )
+            connection.execute('DROP INDEX IF EXISTS history_result')
+        for statement in self._INDEXES:
+            connection.execute(statement)
+        connection.commit()
+        self._next_id = (connection.execute('SELECT MAX(id) FROM history').fetchone()[0] or 0) + 1
+        self._last_timestamp = connection.execute('SELECT MAX(timestamp) FROM history').fetchone()[0] or 0.0
+        self._count = connection.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+        # Версия истории в этом процессе: увеличивается при каждом изменении
+        self.version = 0
+
+        self._lock = threading.Lock()
+        self._written = threading.Condition(self._lock)
+        self._pending = 0
+        self._queue = queue.Queue()
+        # Соединение, открытое для создания схемы, передаётся потоку записи
+        self._writer = threading.Thread(
+            target=self._write_loop, args=(connection,), name='history-writer', daemon=True
+        )
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(f'PRAGMA synchronous={self.synchronous}')
+        return connection
+
+    def _reader(self):
+        """Соединение для чтения, своё у каждого потока."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _row_to_entry(self, row):
+        entry_id, operation, a, b, result, timestamp = row
+        return HistoryEntry(
+            operation, _decode_value(a), _decode_value(b), _decode_value(result),
+            entry_id, timestamp
+        )
+
+    def _select(self, sql, parameters=()):
+        self.flush()
+        return [self._row_to_entry(row) for row in self._reader().execute(sql, parameters)]
+
+    # ========== Фоновая запись ==========
+
+    def _write_loop(self, connection):
+        while True:
+            items = [self._queue.get()]
+            # Всё, что накопилось за время предыдущей фиксации, пишется одной транзакцией
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            batch = []
+            for item in items:
+                if isinstance(item, list):
+                    batch.extend(item)
+                    continue
+                if item is self._STOP:
+                    self._commit(connection, batch)
+                    connection.close()
+                    return
+                # Синхронная операция (удаление, очистка) выполняется строго
+                # после записей, поставленных в очередь до неё
+                self._commit(connection, batch)
+                batch = []
+                self._run_call(connection, *item)
+            self._commit(connection, batch)
+
+    def _commit(self, connection, entries):
+        """Записывает блок записей одной транзакцией и вытесняет лишние."""
+        if not entries:
+            return
+        inserted = evicted = 0
+        try:
+            connection.executemany(
+                'INSERT INTO history (id, operation, a, b, result, timestamp, result_number) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (entry['id'], entry['operation'], _encode_operand(entry['a']),
+                     _encode_operand(entry['b']), _encode_value(entry['result']),
+                     entry['timestamp'], _numeric_value(entry['result']))
+                    for entry in entries
+                ]
+            )
+            if self.max_size is not None and self._count + len(entries) > self.max_size:
+                evicted = connection.execute(
+                    'DELETE FROM history WHERE id <= '
+                    '(SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                    (self.max_size,)
+                ).rowcount
+            connection.commit()
+            inserted = len(entries)
+        except sqlite3.Error as e:
+            connection.rollback()
+            evicted = 0
+            logger.error(f"Ошибка записи истории в SQLite: {e}")
+
+        with self._lock:
+            self._count += inserted - evicted
+            self._pending -= len(entries)
+            self._written.notify_all()
+
+    def _run_call(self, connection, function, future):
+        try:
+            result, removed = function(connection)
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._count -= removed
+            if removed:
+                self.version += 1
+        future.set_result(result)
+
+    def _call(self, function):
+        """
+        Выполняет function(connection) в потоке записи и возвращает результат.
+        function возвращает пару (результат, количество удалённых записей).
+        """
+        future = Future()
+        self._queue.put((function, future))
+        return future.result()
+
+    # ========== Интерфейс хранилища ==========
+
+    def __len__(self):
+        self.flush()
+        return self._count
+
+    def __iter__(self):
+        return iter(self._select(f'{self._SELECT} ORDER BY id'))
+
+    def close(self):
+        """Записывает очередь, останавливает поток записи и закрывает соединения."""
+        if self._writer.is_alive():
+            self._queue.put(self._STOP)
+            self._writer.join()
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def flush(self):
+        """Ждёт, пока все поставленные в очередь записи будут зафиксированы."""
+        with self._lock:
+            while self._pending:
+                self._written.wait()
+
+    def add(self, entry):
+        """Присваивает записи ID, ставит её в очередь на запись и возвращает её."""
+        self.extend([entry])
+        return entry
+
+    def extend(self, entries):
+        """Присваивает ID нескольким записям и ставит их в очередь одним блоком."""
+        entries = list(entries)
+        if not entries:
+            return
+        with self._lock:
+            self._last_timestamp = max(time.time(), self._last_timestamp)
+            for entry in entries:
+                entry['id'] = self._next_id
+                entry['timestamp'] = self._last_timestamp
+                self._next_id += 1
+            self._pending += len(entries)
+            self.version += 1
+            self._queue.put(entries)
+
+    def get(self, entry_id):
+        """Возвращает запись по ID или None."""
+        rows = self._select(f'{self._SELECT} WHERE id = ?', (entry_id,))
+        return rows[0] if rows else None
+
+    def delete(self, entry_id):
+        """Удаляет запись по ID и возвращает её (None, если записи нет)."""
+        def delete_row(connection):
+            row = connection.execute(f'{self._SELECT} WHERE id = ?', (entry_id,)).fetchone()
+            if row is None:
+                return None, 0
+            connection.execute('DELETE FROM history WHERE id = ?', (entry_id,))
+            return self._row_to_entry(row), 1
+        return self._call(delete_row)
+
+    def clear(self):
+        """Очищает историю и возвращает количество удалённых записей."""
+        def delete_all(connection):
+            count = connection.execute('DELETE FROM history').rowcount
+            return count, count
+        return self._call(delete_all)
+
+    def recent(self, limit=None):
+        """Возвращает последние записи в хронологическом порядке."""
+        if not limit or limit <= 0:
+            return self._select(f'{self._SELECT} ORDER BY id')
+        rows = self._select(f'{self._SELECT} ORDER BY id DESC LIMIT ?', (limit,))
+        rows.reverse()
+        return rows
+
+    def page(self, after_id=0, limit=100):
+        """Возвращает до limit записей с ID больше after_id (по индексу первичного ключа)."""
+        return self._select(
+            f'{self._SELECT} WHERE id > ? ORDER BY id LIMIT ?', (after_id, limit)
+        )
+
+    def query(self, operation=None, since=None, until=None,
+              min_result=None, max_result=None, after_id=0, limit=100):
+        """Возвращает до limit записей (по возрастанию ID), подходящих под все фильтры."""
+        conditions = ['id > ?']
+        parameters = [after_id]
+        for condition, value in (
+            ('operation = ?', operation),
+            ('timestamp >= ?', since),
+            ('timestamp <= ?', until),
+            # По числовой копии: большие целые, дроби и Decimal хранятся как BLOB
+            ('result_number >= ?', min_result),
+            ('result_number <= ?', max_result),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        parameters.append(limit)
+        return self._select(
+            f"{self._SELECT} WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?",
+            parameters
+        )
@@ -0,0 +1,121 @@
+"""
+Кэш ответов по ключам идемпотентности (заголовок Idempotency-Key).
+
+Клиент, повторяющий запрос после тайм-аута, присылает тот же ключ
+и получает сохранённый ответ: вычисление, запись в историю и
+уведомление не выполняются повторно. Кэш ограничен по количеству
+ключей и по времени жизни записи.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class IdempotencyConflict(Exception):
+    """Запрос с тем же ключом ещё выполняется."""
+
+
+class IdempotencyKeyReused(IdempotencyConflict):
+    """Ключ уже использован с другим телом запроса."""
+
+
+class _Pending:
+    """Запрос с ключом, который ещё выполняется."""
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.response = None
+
+
+class IdempotencyCache:
+    """
+    Ограниченный кэш ответов с временем жизни записи.
+
+    Время жизни одинаково для всех записей, поэтому порядок добавления
+    совпадает с порядком истечения, и устаревшие записи убираются
+    с начала OrderedDict.
+    """
+
+    def __init__(self, max_size=10000, ttl=86400.0, wait_timeout=10.0):
+        """
+        Args:
+            max_size: Максимальное количество ключей (старые вытесняются)
+            ttl: Время жизни ответа в секундах
+            wait_timeout: Сколько ждать завершения запроса с тем же ключом
+        """
+        if max_size <= 0:
+            raise ValueError('Размер кэша должен быть положительным')
+        self.max_size = max_size
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        # Ключ -> (время истечения, отпечаток запроса, ответ)
+        self._responses = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._responses)
+
+    def _expire(self, now):
+        while self._responses:
+            key, (expires, _, _) = next(iter(self._responses.items()))
+            if expires > now:
+                break
+            del self._responses[key]
+
+    def begin(self, key, fingerprint):
+        """
+        Начинает запрос с ключом key.
+
+        Returns:
+            Сохранённый ответ, если запрос с этим ключом уже выполнялся,
+            иначе None - тогда вызывающий выполняет запрос и сообщает
+            результат через complete() (или abandon() при сбое).
+
+        Raises:
+            IdempotencyKeyReused: ключ уже использован с другим запросом
+            IdempotencyConflict: запрос с этим ключом не завершился за wait_timeout
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            stored = self._responses.get(key)
+            if stored is not None:
+                return self._check(stored[1], fingerprint, stored[2])
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = _Pending(fingerprint)
+                return None
+        # Тот же ключ выполняется в другом потоке: ждём его ответа
+        if not pending.done.wait(self.wait_timeout) or pending.response is None:
+            raise IdempotencyConflict('Запрос с этим ключом идемпотентности ещё выполняется')
+        return self._check(pending.fingerprint, fingerprint, pending.response)
+
+    @staticmethod
+    def _check(stored_fingerprint, fingerprint, response):
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyKeyReused('Ключ идемпотентности уже использован с другим запросом')
+        return response
+
+    def complete(self, key, response):
+        """Сохраняет ответ на запрос, начатый begin()."""
+        with self._lock:
+            pending = self._pending.pop(key)
+            self._responses[key] = (time.monotonic() + self.ttl, pending.fingerprint, response)
+            self._responses.move_to_end(key)
+            if len(self._responses) > self.max_size:
+                self._responses.popitem(last=False)
+        pending.response = response
+        pending.done.set()
+
+    def abandon(self, key):
+        """Снимает резерв ключа, если запрос завершился сбоем без ответа."""
+        with self._lock:
+            pending = self._pending.pop(key, None)
+        if pending is not None:
+            pending.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._responses.clear()
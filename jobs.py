@@ -0,0 +1,553 @@
+"""
+Очередь заданий для дорогих вычислений в пуле процессов.
+
+Запрос с дорогим вычислением (по оценке calculator.estimate_cost) не
+считается в потоке обработчика: он ставится в очередь и получает номер
+задания, а результат забирается позже. Задания выполняют отдельные
+процессы, поэтому вычисление не держит GIL сервера.
+
+Каждому заданию выделяется лимит процессорного времени: процесс
+устанавливает мягкий RLIMIT_CPU и по сигналу SIGXCPU прерывает задание.
+Долгий вызов C (например, возведение большого целого в степень) сигналом
+не прерывается, поэтому родитель дополнительно следит за сроком
+выполнения и завершает процесс, превысивший его; на его место
+запускается новый. Так же отменяется выполняющееся задание.
+
+Процессы запускаются методом spawn: сервер многопоточный, а fork
+многопоточного процесса небезопасен. Главный модуль (например, api.py,
+запущенный как "python api.py") в процессе-исполнителе не выполняется:
+иначе каждый процесс открывал бы хранилище истории, создавал приложение
+Flask и очередь заданий. Исполнителю нужны только модули функции заданий.
+
+Задания с одинаковым ключом (submit(..., key=...)), поставленные, пока
+первое из них не завершилось, вычисляются один раз: каждое получает свой
+номер и свой вызов on_finish, но процесс выполняет только первое, а
+остальные завершаются с его результатом. Отмена одного из таких заданий
+не прерывает вычисление, пока его ждут остальные.
+"""
+
+import itertools
+import logging
+import math
+import multiprocessing
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from importlib.machinery import ModuleSpec
+from multiprocessing.connection import wait as wait_connections
+
+try:
+    import resource
+except ImportError:  # Windows: лимит соблюдается только по сроку выполнения
+    resource = None
+
+from calculator import calculate
+
+logger = logging.getLogger(__name__)
+
+# Состояния задания
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# Срок выполнения задания: лимит процессорного времени * WALL_FACTOR + WALL_GRACE.
+# Процесс может ждать ядро, поэтому срок с запасом больше лимита
+WALL_FACTOR = 2.0
+WALL_GRACE = 1.0
+
+
+class JobQueueFull(Exception):
+    """В очереди нет места для нового задания."""
+
+
+class CPULimitExceeded(ValueError):
+    """Задание превысило лимит процессорного времени."""
+
+
+class JobCancelled(Exception):
+    """Задание отменено."""
+
+
+def run_operation(name, a, b, mode='float', context=None):
+    """
+    Функция заданий по умолчанию: операция калькулятора по имени в режиме mode
+    (context - контекст десятичного режима).
+    """
+    return calculate(name, a, b, mode, context)
+
+
+# ========== Процесс-исполнитель ==========
+
+# Сигнал SIGXCPU прерывает только выполняющееся задание
+_limit_active = False
+
+
+def _on_cpu_limit(signum, frame):
+    if _limit_active:
+        raise CPULimitExceeded('Превышен лимит процессорного времени на вычисление')
+
+
+def _set_cpu_limit(limit):
+    """Устанавливает мягкий лимит процессорного времени на limit секунд от текущего (None - снять)."""
+    global _limit_active
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if limit is None:
+        _limit_active = False
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime + limit)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    _limit_active = True
+
+
+def _worker_main(connection, function):
+    """Цикл процесса-исполнителя: задания по одному из connection."""
+    # Ctrl+C в терминале обрабатывает родитель
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+        job_id, args, cpu_limit = message
+        connection.send((job_id, RUNNING, None))
+        try:
+            _set_cpu_limit(cpu_limit)
+            reply = (job_id, DONE, function(*args))
+        except Exception as e:
+            reply = (job_id, FAILED, e)
+        finally:
+            _set_cpu_limit(None)
+        try:
+            connection.send(reply)
+        except Exception as e:
+            # Результат или исключение не сериализуются
+            connection.send((job_id, FAILED, RuntimeError(str(e))))
+
+
+# Запуск процессов, которым не передаётся главный модуль (см. _main_module_skipped)
+_start_lock = threading.Lock()
+
+
+@contextmanager
+def _main_module_skipped():
+    """
+    Запуск процесса spawn без выполнения главного модуля в нём.
+
+    multiprocessing выполняет в новом процессе файл главного модуля
+    (как __mp_main__), если у главного модуля нет __spec__, то есть он
+    запущен как скрипт. Модуль с именем "__main__" в новом процессе
+    не импортируется, поэтому на время запуска главный модуль получает
+    такое описание. Функция заданий импортируется по имени своего модуля.
+    """
+    main = sys.modules['__main__']
+    with _start_lock:
+        spec = getattr(main, '__spec__', None)
+        main.__spec__ = ModuleSpec('__main__', None)
+        try:
+            yield
+        finally:
+            main.__spec__ = spec
+
+
+class _Worker:
+    """Процесс-исполнитель и задание, которое он выполняет."""
+
+    def __init__(self, context, function):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child, function),
+            name='calculator-job-worker', daemon=True
+        )
+        with _main_module_skipped():
+            self.process.start()
+        child.close()
+        self.job = None
+        self.deadline = None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+    def stop(self, timeout=1.0):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+# ========== Очередь заданий ==========
+
+class Job:
+    """Задание очереди."""
+
+    def __init__(self, job_id, args, context):
+        self.id = job_id
+        self.args = args
+        # Данные вызывающего кода (очередью не используются)
+        self.context = context
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Ключ одинаковых вычислений и задание, вычисление которого ждёт это задание
+        self.key = None
+        self.primary = None
+        self._done = threading.Event()
+
+    @property
+    def is_finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def wait(self, timeout=None):
+        """Ждёт завершения задания; True, если оно завершилось."""
+        return self._done.wait(timeout)
+
+    def outcome(self):
+        """Возвращает результат задания или возбуждает исключение, с которым оно завершилось."""
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class JobQueue:
+    """
+    Очередь заданий с пулом процессов-исполнителей.
+
+    Процессы запускаются по мере надобности (не больше workers) и
+    переиспользуются между заданиями. Состоянием процессов управляет
+    один поток очереди; остальные потоки только ставят и отменяют задания.
+    """
+
+    def __init__(self, function=run_operation, workers=2, cpu_limit=10.0,
+                 max_pending=100, max_finished=1000, on_finish=None):
+        """
+        Args:
+            function: Функция заданий (должна импортироваться по имени в новом процессе)
+            workers: Максимальное количество процессов-исполнителей
+            cpu_limit: Лимит процессорного времени на задание (секунды)
+            max_pending: Максимальное количество заданий в очереди
+            max_finished: Сколько завершённых заданий хранить для запросов результата
+            on_finish: Вызывается с заданием, когда оно выполнено или завершилось
+                ошибкой, до того как его результат станет виден (не для отменённых)
+        """
+        if workers <= 0:
+            raise ValueError('Количество процессов должно быть положительным')
+        self.function = function
+        self.workers = workers
+        self.cpu_limit = cpu_limit
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.on_finish = on_finish
+        self._context = multiprocessing.get_context('spawn')
+        self._jobs = {}
+        self._pending = deque()
+        self._finished = deque()
+        self._ids = itertools.count(1)
+        # Процессы, выполнявшие отменённые задания: их завершает поток очереди
+        self._cancelled = set()
+        # Задания, результат которых уже получен и обрабатывается on_finish
+        self._completing = set()
+        # Ключ -> задание, вычисление которого выполняется для всех заданий с этим ключом
+        self._keys = {}
+        # ID такого задания -> задания, ждущие его результата
+        self._followers = {}
+        self._pool = []
+        self._lock = threading.Lock()
+        self._wakeup_reader, self._wakeup_writer = self._context.Pipe(duplex=False)
+        self._thread = None
+        self._closed = False
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.limit_exceeded = 0
+        self.coalesced = 0
+
+    def submit(self, *args, context=None, key=None):
+        """
+        Ставит задание function(*args) в очередь.
+
+        Args:
+            key: Ключ вычисления (None - без объединения). Задание с ключом
+                незавершённого вычисления не ставится в очередь, а ждёт его результата
+
+        Raises:
+            JobQueueFull: в очереди уже max_pending заданий
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Очередь заданий остановлена')
+            primary = self._keys.get(key) if key is not None else None
+            if primary is not None:
+                job = Job(next(self._ids), args, context if context is not None else {})
+                job.key = key
+                job.primary = primary
+                job.status = RUNNING if primary.started is not None else QUEUED
+                job.started = primary.started
+                self._jobs[job.id] = job
+                self._followers.setdefault(primary.id, []).append(job)
+                self.coalesced += 1
+                return job
+            if len(self._pending) >= self.max_pending:
+                raise JobQueueFull('Очередь заданий переполнена, повторите запрос позже')
+            job = Job(next(self._ids), args, context if context is not None else {})
+            job.key = key
+            if key is not None:
+                self._keys[key] = job
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='job-queue', daemon=True)
+                self._thread.start()
+        self._wake()
+        return job
+
+    def get(self, job_id):
+        """Возвращает задание по номеру или None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Отменяет задание в очереди или выполняющееся (процесс завершается).
+
+        Returns:
+            Задание (его состояние не меняется, если оно уже завершилось
+            или его результат уже получен) или None
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.is_finished or job.id in self._completing:
+                return job
+            primary = job.primary or job
+            if job.primary is not None:
+                self._followers[primary.id].remove(job)
+            # Вычисление прерывается, только если его результата больше никто не ждёт
+            if primary.is_finished or job is primary:
+                if not self._followers.get(primary.id):
+                    self._abandon(primary)
+            self.cancelled += 1
+            self._finish(job, CANCELLED, error=JobCancelled('Задание отменено'))
+        self._wake()
+        return job
+
+    def _abandon(self, job):
+        """Прерывает вычисление задания в очереди или выполняющегося (под self._lock)."""
+        if job in self._pending:
+            self._pending.remove(job)
+        else:
+            self._cancelled.add(job.id)
+        self._followers.pop(job.id, None)
+        self._release_key(job)
+
+    def _release_key(self, job):
+        """Новые задания с ключом job больше не ждут его вычисления (под self._lock)."""
+        if job.key is not None and self._keys.get(job.key) is job:
+            del self._keys[job.key]
+
+    def _group(self, job):
+        """Задание и задания, ждущие его результата (под self._lock)."""
+        return [job] + self._followers.get(job.id, [])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': len(self._pending),
+                'running': sum(1 for worker in self._pool if worker.job is not None),
+                'workers': len(self._pool),
+                'completed': self.completed,
+                'failed': self.failed,
+                'cancelled': self.cancelled,
+                'limit_exceeded': self.limit_exceeded,
+                'coalesced': self.coalesced,
+            }
+
+    def shutdown(self, timeout=5.0):
+        """Отменяет задания в очереди и останавливает процессы."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+            while self._pending:
+                self._cancel_group(self._pending.popleft())
+        self._wake()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _wake(self):
+        try:
+            self._wakeup_writer.send_bytes(b'')
+        except OSError:
+            pass
+
+    def _cancel_group(self, job):
+        """Отменяет незавершённые задания вычисления job при остановке (под self._lock)."""
+        for member in self._group(job):
+            if not member.is_finished:
+                self._finish(member, CANCELLED, error=JobCancelled('Задание отменено'))
+        self._followers.pop(job.id, None)
+        self._release_key(job)
+
+    def _finish(self, job, status, result=None, error=None):
+        """Завершает задание (вызывается под self._lock)."""
+        job.result = result
+        job.error = error
+        job.finished = time.time()
+        job.status = status
+        job._done.set()
+        self._finished.append(job.id)
+        while len(self._finished) > self.max_finished:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    def _complete(self, job, status, result=None, error=None):
+        """
+        Завершает выполненное задание и задания, ждущие его результата:
+        сначала on_finish каждого, затем публикация результата.
+        """
+        with self._lock:
+            group = self._group(job)
+            self._followers.pop(job.id, None)
+            self._release_key(job)
+            # Отменённые задания отбрасывают результат; остальные с этого момента
+            # не отменяются: on_finish обрабатывает их результат
+            group = [member for member in group if not member.is_finished]
+            self._completing.update(member.id for member in group)
+        for member in group:
+            member.result = result
+            member.error = error
+            if self.on_finish is not None:
+                try:
+                    self.on_finish(member)
+                except Exception as e:
+                    logger.error(f"Ошибка обработки результата задания {member.id}: {e}")
+        with self._lock:
+            for member in group:
+                self._completing.discard(member.id)
+                if status == DONE:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                    if isinstance(error, CPULimitExceeded):
+                        self.limit_exceeded += 1
+                self._finish(member, status, result, error)
+
+    # ---------- Поток очереди ----------
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    if self._closed:
+                        break
+                    cancelled = [worker for worker in self._pool
+                                 if worker.job is not None and worker.job.id in self._cancelled]
+                    self._cancelled.clear()
+                for worker in cancelled:
+                    self._replace(worker)
+                self._dispatch()
+                self._poll()
+        except Exception as e:
+            logger.error(f"Ошибка потока очереди заданий: {e}")
+        finally:
+            for worker in self._pool:
+                worker.stop()
+                with self._lock:
+                    if worker.job is not None:
+                        self._cancel_group(worker.job)
+            self._pool = []
+
+    def _replace(self, worker):
+        """Завершает процесс (его задание уже завершено или будет завершено ошибкой)."""
+        worker.kill()
+        with self._lock:
+            self._pool.remove(worker)
+
+    def _dispatch(self):
+        """Раздаёт задания свободным процессам, при необходимости запуская новые."""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                idle = next((worker for worker in self._pool if worker.job is None), None)
+                if idle is None and len(self._pool) >= self.workers:
+                    return
+            if idle is None:
+                idle = _Worker(self._context, self.function)
+                with self._lock:
+                    self._pool.append(idle)
+            with self._lock:
+                if not self._pending:
+                    return
+                job = self._pending.popleft()
+                for member in self._group(job):
+                    if not member.is_finished:
+                        member.status = RUNNING
+                idle.job = job
+                idle.deadline = None
+            idle.connection.send((job.id, job.args, self.cpu_limit))
+
+    def _poll(self):
+        """Ждёт сообщений от процессов или ближайшего срока выполнения."""
+        busy = [worker for worker in self._pool if worker.job is not None]
+        deadlines = [worker.deadline for worker in busy if worker.deadline is not None]
+        timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+        ready = wait_connections([self._wakeup_reader] + [worker.connection for worker in busy], timeout)
+        if self._wakeup_reader in ready:
+            while self._wakeup_reader.poll():
+                self._wakeup_reader.recv_bytes()
+        for worker in busy:
+            if worker.connection in ready:
+                self._receive(worker)
+        now = time.monotonic()
+        for worker in busy:
+            if worker.job is not None and worker.deadline is not None and worker.deadline <= now:
+                job = worker.job
+                self._replace(worker)
+                self._complete(job, FAILED, error=CPULimitExceeded(
+                    f'Превышен лимит времени на вычисление ({self.cpu_limit:g} с)'
+                ))
+
+    def _receive(self, worker):
+        try:
+            job_id, status, value = worker.connection.recv()
+        except (EOFError, OSError):
+            job = worker.job
+            self._replace(worker)
+            self._complete(job, FAILED, error=RuntimeError('Процесс вычисления завершился аварийно'))
+            return
+        job = worker.job
+        if job is None or job.id != job_id:
+            return
+        if status == RUNNING:
+            started = time.time()
+            with self._lock:
+                for member in self._group(job):
+                    member.started = started
+            worker.deadline = time.monotonic() + self.cpu_limit * WALL_FACTOR + WALL_GRACE
+            return
+        worker.job = None
+        if status == DONE:
+            self._complete(job, DONE, result=value)
+        else:
+            self._complete(job, FAILED, error=value)
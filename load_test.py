@@ -0,0 +1,248 @@
+"""
+Нагрузочное сравнение версий API: Flask (api.py) и ASGI (api_async.py).
+
+Скрипт запускает выбранные серверы в отдельных процессах на свободных
+портах и нагружает их из одного процесса asyncio: concurrency соединений
+keep-alive, каждое отправляет следующий запрос сразу после ответа
+на предыдущий. По каждому серверу выводится пропускная способность
+и задержки (p50/p95/p99/max).
+
+Запуск:
+    python load_test.py --target both --concurrency 50 --duration 10
+    python load_test.py --target asgi --scenario history --json results.json
+
+Клиент однопоточный, поэтому на многоядерной машине абсолютные числа
+ограничены и самим клиентом - сравнивать стоит серверы между собой
+при одинаковых параметрах.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from calculator import OPERATION_NAMES
+
+HOST = '127.0.0.1'
+
+# Ключ API запускаемых серверов (то же значение по умолчанию, что и в api.py)
+API_KEY = os.getenv('CALCULATOR_API_KEY', 'secret_key_12345')
+
+# Команды запуска серверов ({port} подставляется при запуске)
+SERVERS = {
+    'flask': [sys.executable, '-c',
+              "import api; api.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'api_async:app',
+             '--host', HOST, '--port', '{port}', '--log-level', 'warning'],
+}
+
+
+def _calculate_request():
+    body = json.dumps({
+        'operation': random.choice(OPERATION_NAMES),
+        'a': random.randint(1, 1000),
+        'b': random.randint(1, 9),
+    }).encode('utf-8')
+    return _request('POST', '/api/calculate', body)
+
+
+# Сценарии нагрузки: функция, возвращающая байты следующего запроса
+SCENARIOS = {
+    'calculate': _calculate_request,
+    'history': lambda: _request('GET', '/api/history?limit=20'),
+    'operations': lambda: _request('GET', '/api/operations'),
+    'health': lambda: _request('GET', '/api/health'),
+}
+
+
+def _request(method, path, body=b''):
+    head = (
+        f'{method} {path} HTTP/1.1\r\n'
+        f'Host: {HOST}\r\n'
+        f'X-API-Key: {API_KEY}\r\n'
+        f'Content-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\n'
+        '\r\n'
+    )
+    return head.encode('ascii') + body
+
+
+async def _read_response(reader):
+    """Читает ответ HTTP/1.1 и возвращает (код, закрыл ли сервер соединение)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Сервер закрыл соединение')
+    status = int(status_line.split()[1])
+    length = None
+    chunked = False
+    close = status_line.startswith(b'HTTP/1.0')
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        value = value.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding':
+            chunked = 'chunked' in value
+        elif name == 'connection':
+            close = value == 'close'
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length is not None:
+        await reader.readexactly(length)
+    else:
+        await reader.read()
+        close = True
+    return status, close
+
+
+async def _worker(port, scenario, started, deadline, latencies, counters):
+    """Одно соединение: запросы подряд до deadline; задержки после started учитываются."""
+    make_request = SCENARIOS[scenario]
+    reader = writer = None
+    try:
+        while time.perf_counter() < deadline:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            request = make_request()
+            sent = time.perf_counter()
+            try:
+                writer.write(request)
+                status, close = await _read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                counters['errors'] += 1
+                writer.close()
+                writer = None
+                continue
+            if sent >= started:
+                latencies.append(time.perf_counter() - sent)
+                if status >= 400:
+                    counters['errors'] += 1
+            if close:
+                writer.close()
+                writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run_load(port, scenario, concurrency, duration, warmup):
+    """Нагружает сервер и возвращает сводку: запросы, ошибки, RPS и задержки в мс."""
+    latencies = []
+    counters = {'errors': 0}
+    started = time.perf_counter() + warmup
+    deadline = started + duration
+    await asyncio.gather(*(
+        _worker(port, scenario, started, deadline, latencies, counters)
+        for _ in range(concurrency)
+    ))
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': counters['errors'],
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(target, timeout=15.0):
+    """Запускает сервер target в отдельном процессе и ждёт /api/health."""
+    port = _free_port()
+    command = [part.replace('{port}', str(port)) for part in SERVERS[target]]
+    env = dict(os.environ, TELEGRAM_ENABLED='false')
+    process = subprocess.Popen(
+        command, cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Сервер {target} завершился с кодом {process.returncode}')
+        try:
+            with socket.create_connection((HOST, port), timeout=0.5) as sock:
+                sock.sendall(_request('GET', '/api/health'))
+                if sock.recv(12).startswith(b'HTTP/1.'):
+                    return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f'Сервер {target} не запустился за {timeout} с')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочное сравнение Flask и ASGI версий API')
+    parser.add_argument('--target', choices=['flask', 'asgi', 'both'], default='both')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='calculate')
+    parser.add_argument('--concurrency', type=int, default=50,
+                        help='Количество одновременных соединений')
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help='Длительность замера в секундах')
+    parser.add_argument('--warmup', type=float, default=1.0,
+                        help='Прогрев перед замером в секундах')
+    parser.add_argument('--json', metavar='FILE', help='Сохранить результаты в JSON')
+    args = parser.parse_args()
+
+    targets = ['flask', 'asgi'] if args.target == 'both' else [args.target]
+    results = {}
+    for target in targets:
+        process, port = start_server(target)
+        try:
+            results[target] = asyncio.run(run_load(
+                port, args.scenario, args.concurrency, args.duration, args.warmup
+            ))
+        finally:
+            stop_server(process)
+
+    print(f'Сценарий: {args.scenario}, соединений: {args.concurrency}, '
+          f'длительность: {args.duration} с')
+    print(f"{'сервер':<8}{'запросов':>10}{'ошибок':>8}{'RPS':>10}"
+          f"{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'max, мс':>10}")
+    for target, result in results.items():
+        print(f"{target:<8}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+              f"{result['max_ms']:>10}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'scenario': args.scenario, 'concurrency': args.concurrency,
+                       'duration': args.duration, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Вывод точных результатов (целых чисел и дробей) любого размера.
+
+Стандартное преобразование int в строку в CPython квадратично по числу
+цифр и ограничено sys.set_int_max_str_digits (по умолчанию 4300 цифр),
+поэтому str() и json.dumps() для результата вроде 3 ^ 2000000 либо
+падают, либо надолго занимают процесс. Здесь:
+
+- display и format_number - значение для ответа: небольшие числа как есть,
+  большие - кратко (научная запись или первые и последние цифры).
+  Краткая запись строится по старшим битам и остатку от деления на
+  степень 10 без полного преобразования числа;
+- to_decimal_string - полная десятичная запись за субквадратичное время
+  (для выгрузки всех цифр). Число делится пополам по битам, половины
+  переводятся в Decimal рекурсивно и собираются умножением на степень
+  двойки: libmpdec умножает большие числа теоретико-числовым
+  преобразованием, а Decimal переводится в строку за линейное время.
+"""
+
+import decimal
+import math
+import os
+from fractions import Fraction
+
+# Целые числа длиннее DISPLAY_DIGITS цифр (и дроби длиннее в сумме) выводятся кратко
+DISPLAY_DIGITS = int(os.getenv('EXACT_DISPLAY_DIGITS', 1000))
+# Краткая запись: scientific - "1.2345678901234567890e+954242",
+# truncated - "12345678901234567890...09876543210987654321"
+DISPLAY_STYLE = os.getenv('EXACT_DISPLAY_STYLE', 'scientific')
+DISPLAY_STYLES = ('scientific', 'truncated')
+# Количество значащих цифр в научной записи и цифр с каждой стороны в сокращённой
+SIGNIFICANT_DIGITS = 20
+
+# Числа до _DIRECT_BITS бит переводятся в строку стандартным str()
+_DIRECT_BITS = 4096
+# Базовый случай рекурсии to_decimal_string
+_LEAF_BITS = 1024
+# Старшие биты числа, по которым строится приближение (относительная ошибка ~2^-160)
+_APPROX_BITS = 160
+_LOG10_2 = math.log10(2)
+_DISPLAY_BITS = int(DISPLAY_DIGITS / _LOG10_2)
+
+# Контекст без округления для сборки полной записи числа
+_EXACT_CONTEXT = decimal.Context(
+    prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN,
+    traps=[decimal.Inexact, decimal.InvalidOperation]
+)
+# Контекст приближений: точность с запасом относительно SIGNIFICANT_DIGITS
+_APPROX_CONTEXT = decimal.Context(prec=50, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+
+
+def is_large(value):
+    """Выводится ли значение кратко (длиннее примерно DISPLAY_DIGITS цифр)."""
+    if type(value) is int:
+        return value.bit_length() > _DISPLAY_BITS
+    if isinstance(value, Fraction):
+        return value.numerator.bit_length() + value.denominator.bit_length() > _DISPLAY_BITS
+    return False
+
+
+def display(value, style=None):
+    """
+    Значение для ответа JSON: float и небольшие целые - как есть,
+    дробь - строка "p/q", Decimal - строка (без потери знаков, например "0.30"),
+    большое число - строка в краткой записи (style).
+    """
+    # Проверки типов вместо isinstance: вызывается для каждого поля каждой записи ответа
+    kind = type(value)
+    if kind is float or (kind is int and value.bit_length() <= _DISPLAY_BITS):
+        return value
+    if kind is decimal.Decimal:
+        return str(value)
+    if is_large(value):
+        return _short(value, style or DISPLAY_STYLE)
+    if isinstance(value, Fraction):
+        return f'{value.numerator}/{value.denominator}'
+    return value
+
+
+def format_number(value, style=None):
+    """Текст числа для выражений и сообщений (как str() для float и небольших целых)."""
+    kind = type(value)
+    if kind is float or (kind is int and value.bit_length() <= _DISPLAY_BITS):
+        return str(value)
+    return str(display(value, style))
+
+
+def digit_count(value):
+    """Количество десятичных цифр целого числа (без знака)."""
+    value = abs(value)
+    if value.bit_length() <= _DIRECT_BITS:
+        return len(str(value))
+    mantissa, exponent = _approximate(value)
+    # Приближение ошибается не больше чем в 40-й значащей цифре: порядок
+    # уточняется точным сравнением, только если значение близко к степени 10
+    if mantissa.startswith('9' * 30):
+        return exponent + 1 if value < 10 ** (exponent + 1) else exponent + 2
+    if mantissa.startswith('1' + '0' * 29):
+        return exponent if value < 10 ** exponent else exponent + 1
+    return exponent + 1
+
+
+def to_decimal_string(value):
+    """
+    Полная десятичная запись целого числа или дроби ("p/q") за субквадратичное время.
+    Decimal записывается как есть (его цифры ограничены точностью контекста).
+    """
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, Fraction):
+        if value.denominator == 1:
+            return to_decimal_string(value.numerator)
+        return f'{to_decimal_string(value.numerator)}/{to_decimal_string(value.denominator)}'
+    if value.bit_length() <= _DIRECT_BITS:
+        return str(value)
+    powers = {}
+
+    def power_of_two(bits):
+        result = powers.get(bits)
+        if result is None:
+            if bits <= _LEAF_BITS:
+                result = decimal.Decimal(1 << bits)
+            else:
+                half = bits >> 1
+                result = power_of_two(half) * power_of_two(bits - half)
+            powers[bits] = result
+        return result
+
+    def convert(number, bits):
+        if bits <= _LEAF_BITS:
+            return decimal.Decimal(number)
+        half = bits >> 1
+        high = number >> half
+        low = number - (high << half)
+        return convert(high, bits - half) * power_of_two(half) + convert(low, half)
+
+    with decimal.localcontext(_EXACT_CONTEXT):
+        digits = str(convert(abs(value), value.bit_length()))
+    return '-' + digits if value < 0 else digits
+
+
+def _approximate(value):
+    """
+    Старшие цифры положительного целого числа: (строка из 50 цифр, десятичный порядок).
+    Используются только старшие _APPROX_BITS бит, поэтому время не зависит от размера числа.
+    """
+    shift = max(value.bit_length() - _APPROX_BITS, 0)
+    with decimal.localcontext(_APPROX_CONTEXT) as context:
+        approximation = context.multiply(
+            decimal.Decimal(value >> shift), context.power(2, shift)
+        )
+    _, digits, _ = approximation.as_tuple()
+    mantissa = ''.join(map(str, digits)).ljust(_APPROX_CONTEXT.prec, '0')
+    return mantissa, approximation.adjusted()
+
+
+def _scientific(value):
+    """Научная запись ненулевого числа (int или Fraction) с SIGNIFICANT_DIGITS значащими цифрами."""
+    with decimal.localcontext(_APPROX_CONTEXT) as context:
+        numerator = _as_decimal(abs(value.numerator))
+        approximation = numerator / _as_decimal(value.denominator) if value.denominator != 1 else numerator
+        text = format(+approximation, f'.{SIGNIFICANT_DIGITS - 1}e')
+    return '-' + text if value < 0 else text
+
+
+def _as_decimal(value):
+    mantissa, exponent = _approximate(value)
+    return decimal.Decimal(f'{mantissa[0]}.{mantissa[1:]}e{exponent}')
+
+
+def _truncated(value):
+    """Первые и последние SIGNIFICANT_DIGITS цифр целого числа."""
+    number = abs(value)
+    mantissa, _ = _approximate(number)
+    head = mantissa[:SIGNIFICANT_DIGITS]
+    guard = mantissa[SIGNIFICANT_DIGITS:SIGNIFICANT_DIGITS + 25]
+    if guard in ('9' * 25, '0' * 25):
+        # Приближение на границе разряда (например, 10^n): первые цифры считаются точно
+        head = str(number // 10 ** (digit_count(number) - SIGNIFICANT_DIGITS))
+    # Остаток от деления на небольшую степень 10 вычисляется за линейное время
+    tail = str(number % 10 ** SIGNIFICANT_DIGITS).zfill(SIGNIFICANT_DIGITS)
+    text = f'{head}...{tail}'
+    return '-' + text if value < 0 else text
+
+
+def _short(value, style):
+    if style == 'truncated':
+        if isinstance(value, Fraction):
+            return f'{_truncated(value.numerator)}/{_truncated(value.denominator)}'
+        return _truncated(value)
+    return _scientific(value)
@@ -0,0 +1,179 @@
+"""
+Разбор и вычисление запроса на операцию калькулятора.
+
+Функции не зависят от Flask и используются REST API (api, api_async)
+и пакетной обработкой файлов (calculator_bulk): процессы пакетной
+обработки не загружают веб-приложение.
+"""
+
+from functools import partial
+
+import result_cache
+from calculator import (
+    MODES, OPERATION_NAMES, ROUNDING_MODES, decimal_context, get_operation, to_number
+)
+from expression_engine import check_exact_cost
+from history_store import HistoryEntry
+from number_format import display
+
+
+def evaluate_operation(data):
+    """
+    Выполняет одну операцию из данных запроса без очереди заданий
+    (пакетная обработка файлов). Размер результата точного режима
+    ограничен EXACT_MAX_DIGITS цифр, как в боте и веб-интерфейсе.
+    
+    Returns:
+        tuple: (тело ответа, HTTP-код, запись для истории или None)
+    """
+    parsed, error = parse_operation(data)
+    if error is not None:
+        return error[0], error[1], None
+    op, a, b, mode, context = parsed
+    compute = compute_function(op, mode, context)
+    if mode == 'exact':
+        compute = _exact_limited(op.name, compute)
+    return operation_outcome(op, a, b, compute)
+
+
+def compute_function(op, mode, context=None):
+    """
+    Функция вычисления операции op в режиме mode (context - контекст десятичного режима).
+    Точный и десятичный режимы вычисляются через общий кэш результатов;
+    float - напрямую: поиск в кэше дороже вычисления.
+    """
+    if mode == 'float':
+        return op.func
+    return partial(result_cache.calculate, op.name, mode=mode, context=context)
+
+
+def _exact_limited(name, compute):
+    """Точное вычисление с проверкой размера результата."""
+    def limited(a, b):
+        check_exact_cost(name, a, b)
+        return compute(a, b)
+    return limited
+
+
+def parse_mode(data):
+    """
+    Проверяет режим вычислений запроса: поле "mode", а для десятичного
+    режима - необязательные поля "precision" (количество значащих цифр)
+    и "rounding" (режим округления).
+    
+    Returns:
+        tuple: ((режим, контекст десятичного режима или None), None)
+            или (None, (тело ошибки, HTTP-код))
+    """
+    mode = data.get('mode', 'float')
+    if mode not in MODES:
+        return None, ({
+            'error': f'Неизвестный режим вычислений: {mode}',
+            'available_modes': list(MODES)
+        }, 400)
+    if mode != 'decimal':
+        return (mode, None), None
+    try:
+        context = decimal_context(data.get('precision'), data.get('rounding'))
+    except ValueError as e:
+        return None, ({
+            'error': str(e),
+            'available_roundings': list(ROUNDING_MODES)
+        }, 400)
+    return (mode, context), None
+
+
+def parse_operation(data):
+    """
+    Проверяет данные запроса на вычисление.
+    
+    Необязательное поле "mode" задаёт режим вычислений: "float" (по умолчанию),
+    "exact" - точная арифметика целых чисел и дробей (операнды - числа
+    или строки вида "123456789012345678901234567890", "1/3", "0.1")
+    или "decimal" - десятичная арифметика с точностью "precision"
+    и округлением "rounding" (операнды - числа или строки вида "19.99").
+    
+    Returns:
+        tuple: ((операция, a, b, режим, контекст), None) или (None, (тело ошибки, HTTP-код))
+    """
+    if not isinstance(data, dict):
+        return None, ({'error': 'Требуется JSON формат данных'}, 400)
+    
+    # Валидация входных данных
+    required_fields = ['operation', 'a', 'b']
+    for field in required_fields:
+        if field not in data:
+            return None, ({
+                'error': f'Отсутствует обязательное поле: {field}'
+            }, 400)
+    
+    parsed_mode, error = parse_mode(data)
+    if error is not None:
+        return None, error
+    mode, context = parsed_mode
+    
+    operation = str(data['operation']).lower()
+    try:
+        a = to_number(data['a'], mode)
+        b = to_number(data['b'], mode)
+    except (ValueError, TypeError):
+        return None, ({
+            'error': 'Поля "a" и "b" должны быть числами'
+        }, 400)
+    
+    op = get_operation(operation)
+    if op is None:
+        return None, ({
+            'error': f'Неизвестная операция: {operation}',
+            'available_operations': list(OPERATION_NAMES)
+        }, 400)
+    return (op, a, b, mode, context), None
+
+
+# Ошибка переполнения float с подсказкой точного режима
+FLOAT_OVERFLOW_ERROR = (
+    'Результат слишком велик для чисел с плавающей точкой, '
+    'используйте точный режим ("mode": "exact")'
+)
+# Ошибка для комплексного результата (его нельзя записать в историю и в JSON)
+NOT_REAL_ERROR = 'Результат не является действительным числом'
+
+
+def operation_outcome(op, a, b, compute):
+    """
+    Вычисляет compute(a, b) и формирует ответ.
+    
+    Returns:
+        tuple: (тело ответа, HTTP-код, запись для истории или None)
+    """
+    try:
+        result = compute(a, b)
+        if isinstance(result, complex):
+            # float: отрицательное число в дробной степени
+            raise ValueError(NOT_REAL_ERROR)
+        
+        # Форматирование результата (точный режим возвращает int или Fraction)
+        if isinstance(result, float) and result == int(result):
+            result = int(result)
+    except ValueError as e:
+        return {
+            'error': str(e),
+            'operation': op.name,
+            'a': display(a),
+            'b': display(b)
+        }, 400, None
+    except OverflowError:
+        return {
+            'error': FLOAT_OVERFLOW_ERROR,
+            'operation': op.name,
+            'a': a,
+            'b': b
+        }, 400, None
+    except Exception as e:
+        return {
+            'error': f'Произошла ошибка при вычислении: {str(e)}'
+        }, 500, None
+    
+    # Текст выражения не форматируется заранее: его строит HistoryEntry при сериализации
+    history_entry = HistoryEntry(op.name, a, b, result)
+    return history_entry, 200, history_entry
@@ -0,0 +1,188 @@
+"""
+Профилирование отдельных запросов API по требованию.
+
+ProfilingMiddleware оборачивает WSGI-приложение. Запрос профилируется
+через cProfile, если он прислал заголовок X-Profile вместе с верным
+ключом администратора или попал в случайную выборку с заданной долей.
+Остальные запросы передаются приложению напрямую: проверка стоит
+одного чтения заголовка (и одного random(), если выборка включена).
+
+Профили хранятся в памяти (не больше max_size, старые вытесняются)
+в формате pstats и открываются стандартными средствами:
+
+    python -m pstats profile-1.pstats
+"""
+
+import cProfile
+import marshal
+import pstats
+import random
+import threading
+import time
+from collections import OrderedDict
+from io import StringIO
+
+
+class ProfileStore:
+    """Ограниченное хранилище профилей запросов."""
+
+    def __init__(self, max_size=50):
+        if max_size <= 0:
+            raise ValueError('Размер хранилища профилей должен быть положительным')
+        self.max_size = max_size
+        self._profiles = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def add(self, info, stats):
+        """
+        Сохраняет профиль и возвращает его описание.
+
+        Args:
+            info: Описание запроса (метод, путь, код ответа, длительность)
+            stats: Словарь статистики cProfile (Profile.stats)
+        """
+        data = marshal.dumps(stats)
+        with self._lock:
+            info = dict(info, id=self._next_id, size=len(data))
+            self._next_id += 1
+            self._profiles[info['id']] = (info, data)
+            if len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+        return info
+
+    def list(self):
+        """Описания сохранённых профилей, от новых к старым."""
+        with self._lock:
+            return [info for info, _ in reversed(self._profiles.values())]
+
+    def get(self, profile_id):
+        """Возвращает пару (описание, данные pstats) или None."""
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def clear(self):
+        with self._lock:
+            count = len(self._profiles)
+            self._profiles.clear()
+            return count
+
+
+def load_stats(data):
+    """Загружает данные pstats в объект pstats.Stats."""
+    return pstats.Stats(_StatsSource(marshal.loads(data)))
+
+
+class _StatsSource:
+    """Источник для pstats.Stats: объект с готовым словарём статистики."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def format_stats(data, limit=30, sort='cumulative'):
+    """Текстовая сводка профиля: limit самых дорогих функций."""
+    out = StringIO()
+    stats = load_stats(data)
+    stats.stream = out
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    WSGI-обёртка, профилирующая выбранные запросы.
+
+    Профиль снимается с вызова приложения, то есть с обработки запроса
+    целиком (маршрутизация, обработчик, сериализация ответа). Одновременно
+    профилируется не больше одного запроса: cProfile в Python 3.12+
+    не допускает двух активных профилировщиков, поэтому запрос,
+    выбранный, пока идёт другое профилирование, выполняется как обычно.
+
+    Потоковые ответы (text/event-stream, NDJSON, генераторы без Content-Length)
+    не профилируются: их тело формируется, пока клиент читает ответ,
+    а поток событий не заканчивается вовсе. Такой ответ возвращается
+    без буферизации, профиль отбрасывается.
+    """
+
+    STREAMING_TYPES = ('text/event-stream', 'application/x-ndjson')
+
+    HEADER = 'HTTP_X_PROFILE'
+    ADMIN_HEADER = 'HTTP_X_ADMIN_KEY'
+
+    def __init__(self, app, store, sample_rate=0.0, admin_key=''):
+        """
+        Args:
+            app: WSGI-приложение
+            store: ProfileStore для сохранения профилей
+            sample_rate: Доля случайно профилируемых запросов (0 - выключено)
+            admin_key: Ключ администратора для заголовка X-Profile (пустой - выключено)
+        """
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.admin_key = admin_key
+        self._active = threading.Lock()
+
+    def _selected(self, environ):
+        if self.HEADER in environ and self.admin_key \
+                and environ.get(self.ADMIN_HEADER) == self.admin_key:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self._selected(environ) or not self._active.acquire(blocking=False):
+            return self.app(environ, start_response)
+        try:
+            return self._profile(environ, start_response)
+        finally:
+            self._active.release()
+
+    def _profile(self, environ, start_response):
+        status = []
+        response_headers = {}
+
+        def capture_status(status_line, headers, exc_info=None):
+            status.append(int(status_line.split(' ', 1)[0]))
+            response_headers.update((name.lower(), value) for name, value in headers)
+            return start_response(status_line, headers, exc_info)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            iterable = self.app(environ, capture_status)
+            if self._streaming(iterable, response_headers):
+                return iterable
+            # Тело ответа собирается внутри профиля, чтобы учесть и его формирование
+            try:
+                body = list(iterable)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - started
+        profiler.create_stats()
+        self.store.add({
+            'method': environ.get('REQUEST_METHOD'),
+            'path': environ.get('PATH_INFO'),
+            'status': status[0] if status else None,
+            'duration_ms': round(duration * 1000, 3),
+            'timestamp': time.time(),
+        }, profiler.stats)
+        return body
+
+    def _streaming(self, iterable, headers):
+        """Потоковый ли ответ (по заголовкам, переданным в start_response, и телу)."""
+        content_type = headers.get('content-type', '').split(';', 1)[0].strip()
+        if content_type in self.STREAMING_TYPES:
+            return True
+        # Flask указывает Content-Length для всех ответов, кроме генераторов
+        return 'content-length' not in headers and not isinstance(iterable, (list, tuple))
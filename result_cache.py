@@ -0,0 +1,191 @@
+"""
+Общий кэш результатов операций калькулятора.
+
+Операции калькулятора - чистые функции, а запросы к API, боту и
+веб-интерфейсу часто повторяют одни и те же пары операндов. Кэш хранит
+результаты по ключу (операция, режим, a, b, контекст десятичного режима)
+с вытеснением давно не использованных записей (LRU) и ограничением
+занимаемой памяти.
+
+Кэш включается явно (RESULT_CACHE_ENABLED=true). Кэшируются только
+вычисления, которые дороже поиска в кэше (около 1 мкс):
+
+- операции из RESULT_CACHE_OPERATIONS (по умолчанию power): точная степень
+  стоит от нескольких микросекунд, десятичная с дробным показателем - сотни;
+- в точном режиме - любая операция с оценкой стоимости (calculator.estimate_cost,
+  цифр результата) не меньше RESULT_CACHE_MIN_COST.
+
+Вычисления с float (меньше 0.5 мкс) в кэш не попадают никогда: поиск
+обошёлся бы дороже повторного вычисления. Ошибки вычисления не кэшируются.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+from fractions import Fraction
+
+from calculator import DECIMAL_CONTEXT, calculate as _calculate, estimate_cost
+
+# Кэш выключен по умолчанию
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'false').lower() == 'true'
+# Максимальный объём кэша (байты, оценка sys.getsizeof операндов и результатов)
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+# Операции, результаты которых кэшируются всегда (кроме float)
+RESULT_CACHE_OPERATIONS = tuple(
+    name.strip() for name in os.getenv('RESULT_CACHE_OPERATIONS', 'power').split(',') if name.strip()
+)
+# Точный режим: минимальная оценка стоимости остальных операций для кэширования
+RESULT_CACHE_MIN_COST = int(os.getenv('RESULT_CACHE_MIN_COST', 1000))
+
+# Накладные расходы записи кэша: ключ-кортеж, узел OrderedDict, размер записи
+_ENTRY_OVERHEAD = 200
+
+
+def _size(value):
+    """Оценка памяти числа в байтах."""
+    if type(value) is Fraction:
+        return sys.getsizeof(value) + sys.getsizeof(value.numerator) + sys.getsizeof(value.denominator)
+    return sys.getsizeof(value)
+
+
+def _operand_key(value):
+    # Decimal("2.0") == Decimal("2") == 2, но результаты с ними отличаются
+    # количеством знаков: Decimal входит в ключ своей записью
+    if type(value) is Decimal:
+        return str(value)
+    return value
+
+
+class ResultCache:
+    """
+    LRU-кэш результатов операций с ограничением по памяти.
+    Безопасен при многопоточной работе; вычисление при промахе
+    выполняется без блокировки.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES, operations=RESULT_CACHE_OPERATIONS,
+                 min_cost=RESULT_CACHE_MIN_COST, enabled=True):
+        """
+        Args:
+            max_bytes: Максимальный объём кэша в байтах (старые записи вытесняются)
+            operations: Операции, которые кэшируются всегда (кроме режима float)
+            min_cost: Точный режим: минимальная стоимость остальных операций
+            enabled: False - все вычисления выполняются без кэша
+        """
+        if max_bytes <= 0:
+            raise ValueError('Размер кэша должен быть положительным')
+        self.max_bytes = max_bytes
+        self.operations = frozenset(operations)
+        self.min_cost = min_cost
+        self.enabled = enabled
+        # Ключ -> (результат, размер записи)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, name, a, b, mode, context):
+        """Ключ записи или None, если вычисление не кэшируется."""
+        if not self.enabled or mode == 'float':
+            return None
+        if name not in self.operations and not (
+                mode == 'exact' and estimate_cost(name, a, b) >= self.min_cost):
+            return None
+        if mode == 'decimal':
+            context = context or DECIMAL_CONTEXT
+            return name, mode, _operand_key(a), _operand_key(b), context.prec, context.rounding
+        return name, mode, a, b
+
+    def get(self, name, a, b, mode='float', context=None):
+        """Результат из кэша или None."""
+        key = self._key(name, a, b, mode, context)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def calculate(self, name, a, b, mode='float', context=None):
+        """
+        calculator.calculate с использованием кэша.
+
+        Raises:
+            ValueError: при ошибке вычисления (ошибки не кэшируются)
+        """
+        key = self._key(name, a, b, mode, context)
+        if key is None:
+            if self.enabled:
+                with self._lock:
+                    self.bypassed += 1
+            return _calculate(name, a, b, mode, context)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        result = _calculate(name, a, b, mode, context)
+        self._store(key, a, b, result)
+        return result
+
+    def put(self, name, a, b, result, mode='float', context=None):
+        """Сохраняет результат, вычисленный без кэша (например, в задании)."""
+        key = self._key(name, a, b, mode, context)
+        if key is not None:
+            self._store(key, a, b, result)
+
+    def _store(self, key, a, b, result):
+        size = _size(a) + _size(b) + _size(result) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            # Результат больше всего кэша: сохранение вытеснило бы всё остальное
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# Общий кэш процесса для API, Telegram-бота и веб-интерфейса
+shared_cache = ResultCache(enabled=RESULT_CACHE_ENABLED)
+
+
+def calculate(name, a, b, mode='float', context=None):
+    """calculator.calculate через общий кэш (без кэша, если он выключен)."""
+    return shared_cache.calculate(name, a, b, mode, context)
@@ -0,0 +1,79 @@
+"""
+Объединение одинаковых одновременных вычислений (single flight).
+
+Клиент, отправляющий один и тот же запрос из многих потоков сразу,
+заставил бы каждый поток вычислять его заново. Первый запрос с ключом
+выполняет вычисление, остальные запросы с тем же ключом, пришедшие до
+его завершения, ждут и получают тот же результат (или то же исключение).
+После завершения ключ освобождается: результаты здесь не хранятся,
+для этого есть кэш результатов (result_cache).
+"""
+
+import threading
+
+
+class _Call:
+    """Выполняющееся вычисление."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Группа одновременных вычислений по ключам.
+    Безопасна при многопоточной работе.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, function):
+        """
+        Выполняет function() или ждёт уже выполняющееся вычисление с ключом key.
+
+        Returns:
+            Результат function() (общий для всех объединённых вызовов)
+
+        Raises:
+            Исключение function() - в каждом объединённом вызове
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.executed += 1
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+            }
@@ -3,11 +3,15 @@ Telegram-бот для калькулятора.
 Интеграция с внешним сервисом Telegram для отправки уведомлений о вычислениях.
 """
 
+import io
 import os
 import logging
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from calculator import add, subtract, multiply, divide, power
+from calculator import MODES, ROUNDING_MODES, decimal_context, get_operation, rounding_name
+from result_cache import calculate
+from expression_engine import check_exact_cost, evaluate, normalize, ExpressionError
+from number_format import format_number, is_large, to_decimal_string
 
 # Настройка логирования
 logging.basicConfig(
@@ -22,29 +26,24 @@ TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
 # Словарь для хранения последних результатов пользователей
 user_results = {}
 
+# Режим вычислений пользователей (/mode): float, exact или decimal
+user_modes = {}
 
-def calculate_operation(operation, a, b):
-    """Выполняет математическую операцию."""
+# Контекст десятичного режима пользователей (/mode decimal <точность> <округление>)
+user_decimal_contexts = {}
+
+
+def calculate_operation(operation, a, b, mode='float', context=None):
+    """Выполняет математическую операцию в режиме mode (context - контекст десятичного режима)."""
+    op = get_operation(operation)
+    if op is None:
+        return None, None, "Неизвестная операция"
+    
     try:
-        if operation == 'add' or operation == '+':
-            result = add(a, b)
-            symbol = '+'
-        elif operation == 'subtract' or operation == '-':
-            result = subtract(a, b)
-            symbol = '-'
-        elif operation == 'multiply' or operation == '*' or operation == '×':
-            result = multiply(a, b)
-            symbol = '×'
-        elif operation == 'divide' or operation == '/' or operation == '÷':
-            result = divide(a, b)
-            symbol = '÷'
-        elif operation == 'power' or operation == '^' or operation == '**':
-            result = power(a, b)
-            symbol = '^'
-        else:
-            return None, None, "Неизвестная операция"
-        
-        return result, symbol, None
+        if mode == 'exact':
+            # Вычисление идёт в потоке бота: слишком большой результат не считается
+            check_exact_cost(op.name, a, b)
+        return calculate(op.name, a, b, mode, context), op.display, None
     except ValueError as e:
         return None, None, str(e)
     except Exception as e:
@@ -63,6 +62,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /help - Справка по использованию
 /calculate - Выполнить вычисление
 /history - Показать последний результат
+/mode - Режим вычислений (exact - точные целые и дроби, decimal - десятичные)
 
 *Примеры использования:*
 • Отправьте: `10 + 5`
@@ -88,7 +88,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 *Способы использования:*
 
 1. *Простой ввод:*
-   Отправьте сообщение в формате: `число операция число`
+   Отправьте выражение, например: `число операция число`
    Пример: `10 + 5`
 
 2. *Команда /calculate:*
@@ -101,6 +101,20 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 4. *Отрицательные числа:*
    `-5 + 3`
 
+5. *Выражения со скобками:*
+   `2 × (3 + 4) ^ 2`
+
+6. *Точный режим:*
+   `/mode exact` - целые числа любой длины и дроби без округления
+   (`0.1 + 0.2` → 3/10, `2 ^ 1000` - все цифры).
+   Длинный результат показывается кратко, /digits пришлёт все цифры файлом.
+   `/mode float` - обратно к числам с плавающей точкой.
+
+7. *Десятичный режим:*
+   `/mode decimal` - десятичные дроби без ошибок двоичного представления
+   (`0.1 + 0.2` → 0.3).
+   `/mode decimal 10 half_up` - 10 значащих цифр, половина округляется вверх.
+
 *Примеры:*
 • `15 + 27` → 42
 • `100 / 4` → 25
@@ -110,46 +124,52 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(help_text, parse_mode='Markdown')
 
 
+async def reply_with_result(update: Update, text: str):
+    """
+    Вычисляет выражение, сохраняет результат пользователя и отправляет ответ.
+    Ошибки разбора (ExpressionError) передаются вызывающему обработчику.
+    """
+    user_id = update.effective_user.id
+    mode = user_modes.get(user_id, 'float')
+    expression = normalize(text, mode)
+    try:
+        result = evaluate(text, mode, user_decimal_contexts.get(user_id))
+    except ExpressionError:
+        raise
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    except Exception as e:
+        await update.message.reply_text(f"❌ Ошибка: {str(e)}")
+        return
+    
+    expression = f"{expression} = {format_number(result)}"
+    message = f"✅ *Результат:*\n`{expression}`"
+    if is_large(result):
+        message += "\nВсе цифры: /digits"
+    
+    # Сохранение результата
+    user_results[user_id] = {
+        'expression': expression,
+        'result': result
+    }
+    
+    await update.message.reply_text(message, parse_mode='Markdown')
+
+
 async def calculate_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /calculate."""
     if not context.args:
         await update.message.reply_text(
-            "❌ Использование: /calculate <число1> <операция> <число2>\n"
+            "❌ Использование: /calculate <выражение>\n"
             "Пример: /calculate 10 + 5"
         )
         return
     
     try:
-        # Парсинг аргументов
-        if len(context.args) < 3:
-            raise ValueError("Недостаточно аргументов")
-        
-        a = float(context.args[0])
-        operation = context.args[1].lower()
-        b = float(context.args[2])
-        
-        result, symbol, error = calculate_operation(operation, a, b)
-        
-        if error:
-            await update.message.reply_text(f"❌ {error}")
-        else:
-            expression = f"{a} {symbol} {b} = {result}"
-            message = f"✅ *Результат:*\n`{expression}`"
-            
-            # Сохранение результата
-            user_id = update.effective_user.id
-            user_results[user_id] = {
-                'expression': expression,
-                'result': result,
-                'a': a,
-                'b': b,
-                'operation': operation
-            }
-            
-            await update.message.reply_text(message, parse_mode='Markdown')
-            
-    except ValueError as e:
-        await update.message.reply_text(f"❌ Ошибка: {str(e)}\nИспользование: /calculate <число1> <операция> <число2>")
+        await reply_with_result(update, ' '.join(context.args))
+    except ExpressionError as e:
+        await update.message.reply_text(f"❌ Ошибка: {str(e)}\nИспользование: /calculate <выражение>")
 
 
 async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -164,55 +184,74 @@ async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("ℹ️ У вас пока нет истории вычислений.")
 
 
+async def mode_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /mode - показывает или меняет режим вычислений."""
+    user_id = update.effective_user.id
+    if not context.args:
+        await update.message.reply_text(
+            f"ℹ️ Режим вычислений: {describe_mode(user_id)}\n"
+            f"Изменить: /mode {' | '.join(MODES)}\n"
+            f"Десятичный режим: /mode decimal <точность> <округление: {', '.join(ROUNDING_MODES)}>"
+        )
+        return
+    
+    mode = context.args[0].lower()
+    if mode not in MODES:
+        await update.message.reply_text(f"❌ Неизвестный режим. Доступные: {', '.join(MODES)}")
+        return
+    
+    decimal_settings = None
+    if mode == 'decimal':
+        try:
+            precision = int(context.args[1]) if len(context.args) > 1 else None
+            rounding = context.args[2] if len(context.args) > 2 else None
+            decimal_settings = decimal_context(precision, rounding)
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}")
+            return
+    
+    user_modes[user_id] = mode
+    if decimal_settings is None:
+        user_decimal_contexts.pop(user_id, None)
+    else:
+        user_decimal_contexts[user_id] = decimal_settings
+    await update.message.reply_text(f"✅ Режим вычислений: {describe_mode(user_id)}")
+
+
+def describe_mode(user_id):
+    """Описание режима вычислений пользователя, например "decimal (точность 28, округление half_even)"."""
+    mode = user_modes.get(user_id, 'float')
+    if mode != 'decimal':
+        return mode
+    context = user_decimal_contexts.get(user_id) or decimal_context()
+    return f"{mode} (точность {context.prec}, округление {rounding_name(context)})"
+
+
+async def digits_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /digits - отправляет все цифры последнего результата файлом."""
+    user_id = update.effective_user.id
+    if user_id not in user_results:
+        await update.message.reply_text("ℹ️ У вас пока нет истории вычислений.")
+        return
+    
+    result = user_results[user_id]['result']
+    text = repr(result) if isinstance(result, float) else to_decimal_string(result)
+    await update.message.reply_document(
+        document=io.BytesIO(text.encode('ascii')), filename='result.txt'
+    )
+
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик текстовых сообщений для автоматического вычисления."""
     text = update.message.text.strip()
     
-    # Попытка распарсить выражение вида "10 + 5" или "15/3"
+    # Попытка вычислить выражение вида "10 + 5", "15/3" или "2 × (3 + 4)"
     try:
-        # Поддержка различных форматов
-        text = text.replace('×', '*').replace('÷', '/').replace('^', '**')
-        
-        # Простой парсинг для формата "число операция число"
-        parts = text.split()
-        if len(parts) == 3:
-            a = float(parts[0])
-            operation = parts[1].lower()
-            b = float(parts[2])
-            
-            result, symbol, error = calculate_operation(operation, a, b)
-            
-            if error:
-                await update.message.reply_text(f"❌ {error}")
-            else:
-                expression = f"{a} {symbol} {b} = {result}"
-                message = f"✅ *Результат:*\n`{expression}`"
-                
-                # Сохранение результата
-                user_id = update.effective_user.id
-                user_results[user_id] = {
-                    'expression': expression,
-                    'result': result,
-                    'a': a,
-                    'b': b,
-                    'operation': operation
-                }
-                
-                await update.message.reply_text(message, parse_mode='Markdown')
-        else:
-            # Если не удалось распарсить, предлагаем помощь
-            await update.message.reply_text(
-                "❓ Не понял ваш запрос.\n\n"
-                "Отправьте выражение в формате: `число операция число`\n"
-                "Пример: `10 + 5`\n\n"
-                "Или используйте команду /help для справки.",
-                parse_mode='Markdown'
-            )
-    except (ValueError, IndexError):
+        await reply_with_result(update, text)
+    except ExpressionError:
         await update.message.reply_text(
             "❓ Не удалось распознать выражение.\n\n"
-            "Используйте формат: `число операция число`\n"
-            "Пример: `10 + 5`\n\n"
+            "Отправьте выражение, например: `10 + 5` или `2 × (3 + 4)`\n\n"
             "Команда /help покажет все возможности.",
             parse_mode='Markdown'
         )
@@ -275,6 +314,8 @@ def main():
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("calculate", calculate_command))
     application.add_handler(CommandHandler("history", history_command))
+    application.add_handler(CommandHandler("mode", mode_command))
+    application.add_handler(CommandHandler("digits", digits_command))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     
     # Запуск бота
@@ -4,8 +4,11 @@
 """
 
 import os
+import queue
+import atexit
 import asyncio
 import logging
+import threading
 from telegram import Bot
 
 logger = logging.getLogger(__name__)
@@ -14,6 +17,19 @@ logger = logging.getLogger(__name__)
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
 # ID чата для отправки уведомлений (можно получить через @userinfobot)
 DEFAULT_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', '')
+# Максимальный размер очереди фоновых уведомлений
+NOTIFICATION_QUEUE_SIZE = int(os.getenv('TELEGRAM_QUEUE_SIZE', 1000))
+
+
+def format_notification(expression: str, result: float) -> str:
+    """Формирует текст уведомления о выполненном вычислении."""
+    return f"""
+🧮 *Новое вычисление выполнено*
+
+`{expression}`
+
+*Результат:* `{result}`
+"""
 
 
 async def send_calculation_notification(expression: str, result: float, chat_id: str = None):
@@ -39,16 +55,9 @@ async def send_calculation_notification(expression: str, result: float, chat_id:
     
     try:
         bot = Bot(token=TELEGRAM_BOT_TOKEN)
-        message = f"""
-🧮 *Новое вычисление выполнено*
-
-`{expression}`
-
-*Результат:* `{result}`
-"""
         await bot.send_message(
             chat_id=target_chat_id,
-            text=message,
+            text=format_notification(expression, result),
             parse_mode='Markdown'
         )
         logger.info(f"Уведомление отправлено в чат {target_chat_id}: {expression}")
@@ -74,6 +83,254 @@ def send_notification_sync(expression: str, result: float, chat_id: str = None):
     )
 
 
+class NotificationDispatcher:
+    """
+    Фоновая отправка уведомлений в Telegram.
+    
+    Вызывающий код только кладёт сообщение в ограниченную очередь и сразу
+    продолжает работу. Отправкой занимается отдельный поток с собственным
+    долгоживущим циклом событий и одним экземпляром Bot (HTTP-сессия
+    переиспользуется между сообщениями). При переполнении очереди новые
+    сообщения отбрасываются и учитываются в счётчике dropped.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, bot_token: str = None, max_queue_size: int = NOTIFICATION_QUEUE_SIZE):
+        self.bot_token = bot_token if bot_token is not None else TELEGRAM_BOT_TOKEN
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+    
+    def start(self):
+        """Запускает поток отправки (повторный вызов ничего не делает)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='telegram-notifications', daemon=True
+                )
+                self._thread.start()
+        return self
+    
+    def enqueue(self, expression: str, result: float, chat_id: str = None) -> bool:
+        """
+        Ставит уведомление в очередь без ожидания отправки.
+        
+        Returns:
+            bool: True если сообщение принято, False если очередь переполнена
+        """
+        target_chat_id = chat_id or DEFAULT_CHAT_ID
+        if not self.bot_token or not target_chat_id:
+            logger.warning("TELEGRAM_BOT_TOKEN или TELEGRAM_CHAT_ID не установлен. Уведомление не отправлено.")
+            return False
+        try:
+            self._queue.put_nowait((expression, result, target_chat_id))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+    
+    def stats(self) -> dict:
+        """Возвращает глубину очереди и счётчики отправки."""
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'enqueued': self.enqueued,
+                'sent': self.sent,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'running': self._thread is not None and self._thread.is_alive()
+            }
+    
+    def shutdown(self, timeout: float = 5.0):
+        """Отправляет оставшиеся в очереди сообщения и останавливает поток."""
+        with self._lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Очередь уведомлений не освободилась до остановки.")
+            return
+        thread.join(timeout)
+    
+    def _run(self):
+        """Основной цикл потока отправки."""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        bot = Bot(token=self.bot_token)
+        try:
+            loop.run_until_complete(bot.initialize())
+        except Exception as e:
+            logger.error(f"Ошибка инициализации Telegram-бота: {e}")
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._STOP:
+                    break
+                expression, result, chat_id = item
+                try:
+                    loop.run_until_complete(bot.send_message(
+                        chat_id=chat_id,
+                        text=format_notification(expression, result),
+                        parse_mode='Markdown'
+                    ))
+                    with self._lock:
+                        self.sent += 1
+                except Exception as e:
+                    with self._lock:
+                        self.failed += 1
+                    logger.error(f"Ошибка при отправке уведомления в Telegram: {e}")
+        finally:
+            try:
+                loop.run_until_complete(bot.shutdown())
+            except Exception as e:
+                logger.error(f"Ошибка при закрытии Telegram-бота: {e}")
+            loop.close()
+
+
+class AsyncNotificationDispatcher:
+    """
+    Отправка уведомлений в Telegram внутри цикла событий ASGI-приложения.
+    
+    Интерфейс тот же, что у NotificationDispatcher, но вместо отдельного
+    потока с собственным циклом событий отправкой занимается задача asyncio
+    в цикле событий сервера. enqueue() из других потоков (например, по
+    завершении задания из очереди заданий) передаёт сообщение в этот цикл.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, bot_token: str = None, max_queue_size: int = NOTIFICATION_QUEUE_SIZE):
+        self.bot_token = bot_token if bot_token is not None else TELEGRAM_BOT_TOKEN
+        self._queue = asyncio.Queue(maxsize=max_queue_size)
+        self._loop = None
+        self._task = None
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+    
+    def start(self):
+        """Запускает задачу отправки в текущем цикле событий."""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = self._loop.create_task(self._run())
+        return self
+    
+    def enqueue(self, expression: str, result: float, chat_id: str = None) -> bool:
+        """
+        Ставит уведомление в очередь без ожидания отправки.
+        
+        Returns:
+            bool: True если сообщение принято, False если очередь переполнена
+        """
+        target_chat_id = chat_id or DEFAULT_CHAT_ID
+        if not self.bot_token or not target_chat_id:
+            logger.warning("TELEGRAM_BOT_TOKEN или TELEGRAM_CHAT_ID не установлен. Уведомление не отправлено.")
+            return False
+        item = (expression, result, target_chat_id)
+        if self._loop is not None and not self._in_loop():
+            # asyncio.Queue не потокобезопасна: сообщение кладётся из цикла событий
+            self._loop.call_soon_threadsafe(self._put, item)
+            return True
+        return self._put(item)
+    
+    def _in_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+    
+    def _put(self, item) -> bool:
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+    
+    def stats(self) -> dict:
+        """Возвращает глубину очереди и счётчики отправки."""
+        return {
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'enqueued': self.enqueued,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'running': self._task is not None and not self._task.done()
+        }
+    
+    async def shutdown(self, timeout: float = 5.0):
+        """Отправляет оставшиеся в очереди сообщения и останавливает задачу."""
+        task = self._task
+        if task is None or task.done():
+            return
+        try:
+            await asyncio.wait_for(self._queue.put(self._STOP), timeout)
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Очередь уведомлений не отправлена до остановки.")
+            task.cancel()
+    
+    async def _run(self):
+        """Основной цикл задачи отправки."""
+        bot = Bot(token=self.bot_token)
+        try:
+            await bot.initialize()
+        except Exception as e:
+            logger.error(f"Ошибка инициализации Telegram-бота: {e}")
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is self._STOP:
+                    break
+                expression, result, chat_id = item
+                try:
+                    await bot.send_message(
+                        chat_id=chat_id,
+                        text=format_notification(expression, result),
+                        parse_mode='Markdown'
+                    )
+                    self.sent += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Ошибка при отправке уведомления в Telegram: {e}")
+        finally:
+            try:
+                await bot.shutdown()
+            except Exception as e:
+                logger.error(f"Ошибка при закрытии Telegram-бота: {e}")
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    """
+    Возвращает общий запущенный диспетчер уведомлений.
+    При завершении процесса очередь отправляется до конца.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher().start()
+            atexit.register(_dispatcher.shutdown)
+        return _dispatcher
+
+
 def get_chat_id_from_bot():
     """
     Вспомогательная функция для получения chat_id.
@@ -0,0 +1,256 @@
+"""
+Модульные тесты для ASGI-версии REST API калькулятора.
+Сравнивают ответы с версией Flask; используют тестовые клиенты
+Starlette и Flask и не требуют запущенного сервера.
+"""
+
+import asyncio
+import re
+import unittest
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+import api
+import api_async
+
+
+def without_ids(body):
+    """Убирает из тела ответа значения id и timestamp, которые отличаются между запросами."""
+    return re.sub(rb'"(id|timestamp|next_after_id)":[0-9.]+', b'', body)
+
+
+class AsyncApiTestCase(unittest.TestCase):
+    """Базовый класс с тестовыми клиентами обеих версий и очисткой истории."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.client = TestClient(api_async.app)
+        self.flask_client = api.app.test_client()
+        self.headers = {'X-API-Key': api.API_KEY}
+        self.client.delete('/api/history', headers=self.headers)
+
+
+class TestParity(AsyncApiTestCase):
+    """Тесты: ASGI-версия отвечает так же, как версия Flask."""
+
+    REQUESTS = [
+        ('get', '/api/health', None),
+        ('get', '/api/operations', None),
+        ('post', '/api/calculate', {'operation': 'add', 'a': 10, 'b': 5}),
+        ('post', '/api/calculate', {'operation': 'divide', 'a': 1, 'b': 0}),
+        ('post', '/api/calculate', {'operation': 'modulo', 'a': 1, 'b': 2}),
+        ('post', '/api/calculate', {'operation': 'divide', 'a': '1/3', 'b': 7, 'mode': 'exact'}),
+        ('post', '/api/calculate', {'operation': 'divide', 'a': '1.5', 'b': 7, 'mode': 'decimal', 'precision': 8}),
+        ('post', '/api/calculate', {'operation': 'add', 'a': 1, 'b': 2, 'mode': 'decimal', 'rounding': 'x'}),
+        ('post', '/api/calculate', {'a': 1}),
+        ('post', '/api/calculate/batch', {'operations': [
+            {'operation': 'power', 'a': 2, 'b': 8},
+            {'operation': 'divide', 'a': 1, 'b': 0},
+        ]}),
+        ('post', '/api/calculate/batch', {'operations': 'add'}),
+        ('post', '/api/evaluate', {'expression': '2 × (3 + 4) ^ 2'}),
+        ('post', '/api/evaluate', {'expression': '1 / 0'}),
+        ('post', '/api/evaluate', {'expression': '2 ^ 200', 'mode': 'exact'}),
+        ('post', '/api/evaluate', {'expression': '0.1 + 0.2', 'mode': 'decimal'}),
+        ('get', '/api/history?limit=2', None),
+        ('get', '/api/history/query?operation=power', None),
+        ('get', '/api/history/query?min_result=abc', None),
+        ('delete', '/api/history/999999', None),
+        ('get', '/api/notifications/stats', None),
+    ]
+
+    def test_same_responses(self):
+        """Тест: коды ответа и тела совпадают побайтно (кроме ID и времени)."""
+        for method, url, payload in self.REQUESTS:
+            with self.subTest(method=method, url=url):
+                kwargs = {'headers': self.headers}
+                if payload is not None:
+                    kwargs['json'] = payload
+                flask_response = getattr(self.flask_client, method)(url, **kwargs)
+                response = getattr(self.client, method)(url, **kwargs)
+                self.assertEqual(response.status_code, flask_response.status_code)
+                self.assertEqual(response.headers['Content-Type'], flask_response.content_type)
+                self.assertEqual(without_ids(response.content), without_ids(flask_response.get_data()))
+
+    def test_requires_api_key(self):
+        """Тест: запросы без API-ключа отклоняются с тем же ответом."""
+        response = self.client.post('/api/calculate', json={'operation': 'add', 'a': 1, 'b': 2})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'Неверный или отсутствующий API-ключ'})
+
+    def test_requires_json(self):
+        """Тест: тело не в формате JSON отклоняется."""
+        response = self.client.post('/api/calculate', content=b'a=1', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Требуется JSON формат данных'})
+
+    def test_unknown_endpoint(self):
+        """Тест: 404 со списком эндпоинтов без административных маршрутов."""
+        response = self.client.get('/api/unknown')
+        self.assertEqual(response.status_code, 404)
+        endpoints = response.json()['available_endpoints']
+        self.assertIn('POST /api/calculate', endpoints)
+        self.assertFalse([endpoint for endpoint in endpoints if '/api/admin/' in endpoint])
+
+
+class TestSharedState(AsyncApiTestCase):
+    """Тесты общей истории и кэша идемпотентности."""
+
+    def test_history_shared_with_flask(self):
+        """Тест: вычисление через ASGI видно в истории версии Flask, и наоборот."""
+        entry_id = self.client.post(
+            '/api/calculate', json={'operation': 'add', 'a': 1, 'b': 2}, headers=self.headers
+        ).json()['id']
+        self.flask_client.post(
+            '/api/calculate', json={'operation': 'add', 'a': 3, 'b': 4}, headers=self.headers
+        )
+        history = self.client.get('/api/history', headers=self.headers).json()['history']
+        self.assertEqual([entry['result'] for entry in history], [3, 7])
+        flask_history = self.flask_client.get('/api/history', headers=self.headers).get_json()
+        self.assertEqual(flask_history['history'][0]['id'], entry_id)
+
+        response = self.client.delete(f'/api/history/{entry_id}', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(api.calculation_history), 1)
+
+    def test_history_etag(self):
+        """Тест: If-None-Match с текущим ETag возвращает 304, после вычисления - 200."""
+        etag = self.client.get('/api/history', headers=self.headers).headers['ETag']
+        headers = dict(self.headers, **{'If-None-Match': etag})
+        self.assertEqual(self.client.get('/api/history', headers=headers).status_code, 304)
+        self.client.post('/api/calculate', json={'operation': 'add', 'a': 1, 'b': 2}, headers=self.headers)
+        self.assertEqual(self.client.get('/api/history', headers=headers).status_code, 200)
+
+    def test_idempotent_replay(self):
+        """Тест: повтор с тем же Idempotency-Key возвращает исходный ответ."""
+        api.idempotency_cache.clear()
+        headers = dict(self.headers, **{'Idempotency-Key': 'async-replay'})
+        payload = {'operation': 'multiply', 'a': 6, 'b': 7}
+        first = self.client.post('/api/calculate', json=payload, headers=headers)
+        second = self.client.post('/api/calculate', json=payload, headers=headers)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(len(api.calculation_history), 1)
+
+        other = self.client.post('/api/calculate', json={'operation': 'add', 'a': 1, 'b': 1}, headers=headers)
+        self.assertEqual(other.status_code, 422)
+
+    def test_expensive_calculation_job(self):
+        """Тест: дорогое вычисление ставится в общую очередь заданий."""
+        with patch.object(api, 'JOB_COST_THRESHOLD', 0):
+            response = self.client.post(
+                '/api/calculate', json={'operation': 'multiply', 'a': 6, 'b': 7}, headers=self.headers
+            )
+        self.assertEqual(response.status_code, 202)
+        job = self.client.get(f"{response.json()['url']}?wait=30", headers=self.headers).json()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result']['result'], 42)
+        self.assertEqual(len(api.calculation_history), 1)
+
+
+class TestEventLoop(AsyncApiTestCase):
+    """Тесты: точные и десятичные вычисления не блокируют цикл событий."""
+
+    def record_threads(self, name):
+        """Подменяет api.<name>, запоминая, выполнялся ли вызов в цикле событий."""
+        function = getattr(api, name)
+        calls = []
+
+        def wrapper(*args):
+            try:
+                asyncio.get_running_loop()
+                calls.append(True)
+            except RuntimeError:
+                calls.append(False)
+            return function(*args)
+
+        patcher = patch.object(api, name, wrapper)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return calls
+
+    def test_exact_and_decimal_run_in_threadpool(self):
+        """Тест: float вычисляется в цикле событий, точный и десятичный режимы - в пуле потоков."""
+        calls = self.record_threads('calculate_body')
+        for mode in ('float', 'exact', 'decimal'):
+            response = self.client.post(
+                '/api/calculate', json={'operation': 'power', 'a': 3, 'b': 50, 'mode': mode},
+                headers=self.headers
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(calls, [True, False, False])
+
+        calls = self.record_threads('expression_body')
+        self.client.post('/api/evaluate', json={'expression': '2 ^ 10'}, headers=self.headers)
+        self.client.post('/api/evaluate', json={'expression': '2 ^ 1000', 'mode': 'exact'}, headers=self.headers)
+        self.assertEqual(calls, [True, False])
+
+        calls = self.record_threads('batch_body')
+        for mode in ('float', 'decimal'):
+            self.client.post('/api/calculate/batch', json={'operations': [
+                {'operation': 'add', 'a': 1, 'b': 2},
+                {'operation': 'add', 'a': 1, 'b': 2, 'mode': mode},
+            ]}, headers=self.headers)
+        self.assertEqual(calls, [True, False])
+
+        calls = self.record_threads('stream_line')
+        body = (
+            b'{"operation": "add", "a": 1, "b": 2}\n'
+            b'{"operation": "power", "a": 3, "b": 50, "mode": "exact"}\n'
+        )
+        response = self.client.post('/api/calculate/stream', content=body, headers=self.headers)
+        self.assertIn(f'"result": {3 ** 50}', response.text)
+        self.assertEqual(calls, [True, False])
+
+
+class TestAsyncStreaming(AsyncApiTestCase):
+    """Тесты потоковых эндпоинтов ASGI-версии."""
+
+    def test_ndjson_stream(self):
+        """Тест: строки NDJSON вычисляются по порядку, в конце - итог."""
+        body = (
+            b'{"operation": "add", "a": 1, "b": 2}\n'
+            b'\n'
+            b'not json\n'
+            b'{"operation": "power", "a": 2, "b": 10}'
+        )
+        response = self.client.post('/api/calculate/stream', content=body, headers=self.headers)
+        self.assertEqual(response.headers['Content-Type'], 'application/x-ndjson')
+        lines = response.text.splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn('"result": 3', lines[0])
+        self.assertIn('"line": 3', lines[1])
+        self.assertIn('"result": 1024', lines[2])
+        self.assertIn('"succeeded": 2, "failed": 1', lines[3])
+        self.assertEqual(len(api.calculation_history), 2)
+
+    def test_metrics_use_handler_names(self):
+        """Тест: запросы учитываются в метриках под именами обработчиков, как во Flask."""
+        before = api.REQUESTS_TOTAL.value('evaluate_expression', 'POST', 200)
+        self.client.post('/api/evaluate', json={'expression': '1 + 1'}, headers=self.headers)
+        self.assertEqual(api.REQUESTS_TOTAL.value('evaluate_expression', 'POST', 200), before + 1)
+        response = self.client.get('/api/metrics')
+        self.assertIn('endpoint="evaluate_expression"', response.text)
+
+    def test_download_result(self):
+        """Тест: все цифры большого результата выгружаются текстом."""
+        data = self.client.post(
+            '/api/calculate', json={'operation': 'power', 'a': 2, 'b': 20000, 'mode': 'exact'},
+            headers=self.headers
+        ).json()
+        response = self.client.get(data['result_url'], headers=self.headers)
+        self.assertEqual(response.headers['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(len(response.text.strip()), data['digits'])
+        flask_response = self.flask_client.get(data['result_url'], headers=self.headers)
+        self.assertEqual(response.content, flask_response.get_data())
+
+    def test_history_stream_rejects_bad_last_event_id(self):
+        """Тест: некорректный Last-Event-ID отклоняется до открытия потока."""
+        headers = dict(self.headers, **{'Last-Event-ID': 'abc'})
+        response = self.client.get('/api/history/stream', headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
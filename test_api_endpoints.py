@@ -0,0 +1,490 @@
+"""
+Модульные тесты для REST API калькулятора.
+Используют тестовый клиент Flask и не требуют запущенного сервера.
+"""
+
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+import api
+
+
+class ApiTestCase(unittest.TestCase):
+    """Базовый класс с тестовым клиентом и очисткой истории."""
+
+    def setUp(self):
+        """Настройка перед каждым тестом."""
+        self.client = api.app.test_client()
+        self.headers = {'X-API-Key': api.API_KEY}
+        self.client.delete('/api/history', headers=self.headers)
+
+    def post(self, url, payload, **kwargs):
+        """Отправляет POST-запрос с JSON-телом и API-ключом."""
+        headers = dict(self.headers, **kwargs.pop('headers', {}))
+        return self.client.post(url, json=payload, headers=headers, **kwargs)
+
+
+class TestCalculateBatch(ApiTestCase):
+    """Тесты для POST /api/calculate/batch."""
+
+    def test_batch_results_in_order(self):
+        """Тест: результаты возвращаются в порядке запроса."""
+        response = self.post('/api/calculate/batch', {'operations': [
+            {'operation': 'add', 'a': 10, 'b': 5},
+            {'operation': 'power', 'a': 2, 'b': 8},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual([item['result'] for item in data['results']], [15, 256])
+        self.assertEqual(data['succeeded'], 2)
+        self.assertEqual(data['failed'], 0)
+
+    def test_batch_errors_per_item(self):
+        """Тест: ошибка одного элемента не прерывает пакет."""
+        response = self.post('/api/calculate/batch', {'operations': [
+            {'operation': 'divide', 'a': 1, 'b': 0},
+            {'operation': 'modulo', 'a': 1, 'b': 2},
+            {'a': 1, 'b': 2},
+            {'operation': 'multiply', 'a': 3, 'b': 4},
+        ]})
+        results = response.get_json()['results']
+        self.assertEqual(results[0]['error'], 'Деление на ноль невозможно!')
+        self.assertEqual(results[0]['status'], 400)
+        self.assertIn('Неизвестная операция', results[1]['error'])
+        self.assertIn('operation', results[2]['error'])
+        self.assertEqual(results[3]['result'], 12)
+        self.assertEqual(results[3]['status'], 200)
+
+    def test_batch_history_added(self):
+        """Тест: успешные вычисления пакета попадают в историю."""
+        self.post('/api/calculate/batch', {'operations': [
+            {'operation': 'add', 'a': 1, 'b': 1},
+            {'operation': 'divide', 'a': 1, 'b': 0},
+            {'operation': 'add', 'a': 2, 'b': 2},
+        ]})
+        history = self.client.get('/api/history', headers=self.headers).get_json()
+        self.assertEqual(history['total'], 2)
+        ids = [entry['id'] for entry in history['history']]
+        self.assertEqual(len(set(ids)), 2)
+
+    def test_batch_requires_list(self):
+        """Тест: поле operations должно быть списком."""
+        response = self.post('/api/calculate/batch', {'operations': 'add'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_requires_api_key(self):
+        """Тест: пакетный запрос без API-ключа отклоняется."""
+        response = self.client.post('/api/calculate/batch', json={'operations': []})
+        self.assertEqual(response.status_code, 401)
+
+
+class TestCalculateStream(ApiTestCase):
+    """Тесты для POST /api/calculate/stream (NDJSON)."""
+
+    def stream(self, body):
+        """Отправляет тело NDJSON и возвращает разобранные строки ответа."""
+        response = self.client.post('/api/calculate/stream', data=body, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_results_per_line_in_order(self):
+        """Тест: по строке ответа на каждую запись, ошибки - в формате API."""
+        body = '\n'.join([
+            '{"operation": "add", "a": 10, "b": 5}',
+            '',
+            '{"operation": "divide", "a": 1, "b": 0}',
+            '{not json',
+            '{"operation": "power", "a": 2}',
+            '{"operation": "multiply", "a": 3, "b": 4}',
+        ])
+        lines = self.stream(body)
+        self.assertEqual([line.get('status') for line in lines[:-1]], [200, 400, 400, 400, 200])
+        self.assertEqual([line.get('line') for line in lines[:-1]], [1, 3, 4, 5, 6])
+        self.assertEqual(lines[0]['result'], 15)
+        self.assertEqual(lines[1]['error'], 'Деление на ноль невозможно!')
+        self.assertEqual(lines[3]['error'], 'Отсутствует обязательное поле: b')
+        self.assertEqual(lines[-1]['summary'], {'total': 5, 'succeeded': 2, 'failed': 3})
+
+        history = self.client.get('/api/history', headers=self.headers).get_json()
+        self.assertEqual([entry['id'] for entry in history['history']], [lines[0]['id'], lines[4]['id']])
+
+    def test_large_stream(self):
+        """Тест потока из большого количества записей."""
+        body = ''.join(
+            json.dumps({'operation': 'add', 'a': i, 'b': 1}) + '\n' for i in range(5000)
+        )
+        lines = self.stream(body)
+        self.assertEqual(len(lines), 5001)
+        self.assertEqual(lines[4999]['result'], 5000)
+        self.assertEqual(lines[-1]['summary']['succeeded'], 5000)
+
+    def test_requires_api_key(self):
+        """Тест: без API-ключа поток не обрабатывается."""
+        response = self.client.post('/api/calculate/stream', data='{}')
+        self.assertEqual(response.status_code, 401)
+
+
+class TestEvaluate(ApiTestCase):
+    """Тесты для POST /api/evaluate."""
+
+    def test_evaluate_expression(self):
+        """Тест вычисления выражения с приоритетом операций."""
+        response = self.post('/api/evaluate', {'expression': '2 × (3 + 4) ^ 2'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'expression': '2 * (3 + 4) ^ 2', 'result': 98})
+
+    def test_evaluate_float_overflow(self):
+        """Тест: переполнение float в выражении - ошибка 400, как в /api/calculate."""
+        for expression in ('10 ^ 400', '2 ** 2000', '2 power 2000'):
+            with self.subTest(expression=expression):
+                response = self.post('/api/evaluate', {'expression': expression})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('"mode": "exact"', response.get_json()['error'])
+        response = self.post('/api/evaluate', {'expression': '10 ^ 400', 'mode': 'exact'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_evaluate_errors(self):
+        """Тест ошибок разбора и деления на ноль."""
+        response = self.post('/api/evaluate', {'expression': '1 / 0'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'Деление на ноль невозможно!')
+        response = self.post('/api/evaluate', {'expression': '1 +'})
+        self.assertEqual(response.status_code, 400)
+        response = self.post('/api/evaluate', {})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestHistory(ApiTestCase):
+    """Тесты для эндпоинтов истории."""
+
+    def calculate(self, a, b):
+        """Выполняет сложение и возвращает ID записи истории."""
+        response = self.post('/api/calculate', {'operation': 'add', 'a': a, 'b': b})
+        return response.get_json()['id']
+
+    def test_history_limit(self):
+        """Тест: параметр limit возвращает последние записи."""
+        ids = [self.calculate(i, 1) for i in range(5)]
+        data = self.client.get('/api/history?limit=2', headers=self.headers).get_json()
+        self.assertEqual([entry['id'] for entry in data['history']], ids[-2:])
+        self.assertEqual(data['total'], 5)
+        self.assertEqual(data['returned'], 2)
+
+    def test_history_pagination(self):
+        """Тест постраничного вывода истории по курсору after_id."""
+        ids = [self.calculate(i, 1) for i in range(5)]
+        url = f'/api/history?after_id={ids[0]}&limit=2'
+        data = self.client.get(url, headers=self.headers).get_json()
+        self.assertEqual([entry['id'] for entry in data['history']], ids[1:3])
+        self.assertEqual(data['next_after_id'], ids[2])
+        url = f"/api/history?after_id={data['next_after_id']}&limit=2"
+        data = self.client.get(url, headers=self.headers).get_json()
+        self.assertEqual([entry['id'] for entry in data['history']], ids[3:5])
+        url = f"/api/history?after_id={data['next_after_id']}&limit=2"
+        data = self.client.get(url, headers=self.headers).get_json()
+        self.assertEqual(data['history'], [])
+        self.assertIsNone(data['next_after_id'])
+
+    def test_history_query(self):
+        """Тест поиска по истории с фильтрами."""
+        self.post('/api/calculate/batch', {'operations': [
+            {'operation': 'divide', 'a': 10, 'b': 2},
+            {'operation': 'add', 'a': 1, 'b': 1},
+            {'operation': 'divide', 'a': 1e7, 'b': 1},
+        ]})
+        url = '/api/history/query?operation=divide&min_result=1e6&last=3600'
+        data = self.client.get(url, headers=self.headers).get_json()
+        self.assertEqual([entry['result'] for entry in data['history']], [10000000])
+        self.assertIn('timestamp', data['history'][0])
+
+    def test_history_query_validation(self):
+        """Тест ошибок в параметрах поиска."""
+        response = self.client.get('/api/history/query?operation=modulo', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/history/query?min_result=abc', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/history/query?since=2024-01-01T00:00:00', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete_entry(self):
+        """Тест удаления записи по ID."""
+        entry_id = self.calculate(1, 2)
+        response = self.client.delete(f'/api/history/{entry_id}', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['deleted_entry']['result'], 3)
+        response = self.client.delete(f'/api/history/{entry_id}', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+
+
+class TestConditionalGet(ApiTestCase):
+    """Тесты условных запросов (ETag / If-None-Match)."""
+
+    def get(self, url, etag=None):
+        headers = dict(self.headers)
+        if etag:
+            headers['If-None-Match'] = etag
+        return self.client.get(url, headers=headers)
+
+    def test_operations_not_modified(self):
+        """Тест: повторный запрос списка операций с ETag возвращает 304."""
+        response = self.get('/api/operations')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['total'], 5)
+        etag = response.headers['ETag']
+        response = self.get('/api/operations', etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_history_etag_changes_with_history(self):
+        """Тест: ETag истории меняется при добавлении, удалении и очистке."""
+        etag = self.get('/api/history').headers['ETag']
+        self.assertEqual(self.get('/api/history', etag).status_code, 304)
+
+        response = self.post('/api/calculate', {'operation': 'add', 'a': 1, 'b': 2})
+        entry_id = response.get_json()['id']
+        response = self.get('/api/history', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['total'], 1)
+        etag = response.headers['ETag']
+        self.assertEqual(self.get('/api/history?limit=1', etag).status_code, 304)
+
+        self.client.delete(f'/api/history/{entry_id}', headers=self.headers)
+        response = self.get('/api/history', etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+
+        self.post('/api/calculate', {'operation': 'add', 'a': 1, 'b': 2})
+        self.client.delete('/api/history', headers=self.headers)
+        self.assertEqual(self.get('/api/history', etag).status_code, 200)
+
+    def test_not_modified_requires_api_key(self):
+        """Тест: без API-ключа условный запрос не раскрывает состояние истории."""
+        etag = self.get('/api/history').headers['ETag']
+        response = self.client.get('/api/history', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 401)
+
+
+class TestJobs(ApiTestCase):
+    """Тесты очереди заданий для дорогих вычислений."""
+
+    def setUp(self):
+        super().setUp()
+        # Порог 0: любое вычисление считается дорогим и ставится в очередь
+        patcher = patch.object(api, 'JOB_COST_THRESHOLD', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_expensive_calculation_becomes_job(self):
+        """Тест: дорогое вычисление возвращает задание, результат попадает в историю."""
+        response = self.post('/api/calculate', {'operation': 'power', 'a': 2, 'b': 10})
+        self.assertEqual(response.status_code, 202)
+        job = response.get_json()
+        self.assertIn(job['status'], ('queued', 'running', 'done'))
+        self.assertEqual(job['url'], f"/api/jobs/{job['job_id']}")
+
+        data = self.client.get(f"{job['url']}?wait=30", headers=self.headers).get_json()
+        self.assertEqual(data['status'], 'done')
+        self.assertEqual(data['result_status'], 200)
+        self.assertEqual(data['result']['result'], 1024)
+        history = self.client.get('/api/history', headers=self.headers).get_json()['history']
+        self.assertEqual([entry['id'] for entry in history], [data['result']['id']])
+
+    def test_failed_job_result(self):
+        """Тест: ошибка вычисления возвращается в результате задания с кодом ответа."""
+        job = self.post('/api/calculate', {'operation': 'divide', 'a': 1, 'b': 0}).get_json()
+        data = self.client.get(f"/api/jobs/{job['job_id']}?wait=30", headers=self.headers).get_json()
+        self.assertEqual(data['status'], 'failed')
+        self.assertEqual(data['result_status'], 400)
+        self.assertEqual(data['result']['error'], 'Деление на ноль невозможно!')
+        self.assertEqual(len(api.calculation_history), 0)
+
+    def test_cheap_calculation_stays_synchronous(self):
+        """Тест: вычисление дешевле порога выполняется сразу."""
+        with patch.object(api, 'JOB_COST_THRESHOLD', 1):
+            response = self.post('/api/calculate', {'operation': 'add', 'a': 1, 'b': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['result'], 3)
+
+    def test_exact_job_result(self):
+        """Тест: точное вычисление в задании возвращает полный результат в истории."""
+        job = self.post(
+            '/api/calculate', {'operation': 'power', 'a': 7, 'b': 3000, 'mode': 'exact'}
+        ).get_json()
+        self.assertEqual(job['mode'], 'exact')
+        data = self.client.get(f"{job['url']}?wait=30", headers=self.headers).get_json()
+        self.assertEqual(data['result']['digits'], 2536)
+        self.assertEqual(api.calculation_history.get(data['result']['id'])['result'], 7 ** 3000)
+
+    def test_batch_counts_queued(self):
+        """Тест: дорогие элементы пакета ставятся в очередь и учитываются отдельно."""
+        data = self.post('/api/calculate/batch', {'operations': [
+            {'operation': 'add', 'a': 1, 'b': 2},
+            {'operation': 'modulo', 'a': 1, 'b': 2},
+        ]}).get_json()
+        self.assertEqual(data['results'][0]['status'], 202)
+        self.assertEqual((data['succeeded'], data['failed'], data['queued']), (0, 1, 1))
+        api.job_queue.get(data['results'][0]['job_id']).wait(30)
+
+    def test_unknown_job_and_cancel_finished(self):
+        """Тест: несуществующее задание - 404, отмена завершённого - 409."""
+        response = self.client.get('/api/jobs/999999', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+        job = self.post('/api/calculate', {'operation': 'add', 'a': 1, 'b': 2}).get_json()
+        self.client.get(f"/api/jobs/{job['job_id']}?wait=30", headers=self.headers)
+        response = self.client.delete(f"/api/jobs/{job['job_id']}", headers=self.headers)
+        self.assertEqual(response.status_code, 409)
+
+
+class TestExactMode(ApiTestCase):
+    """Тесты точного режима вычислений."""
+
+    def test_exact_fraction(self):
+        """Тест: деление в точном режиме возвращает дробь строкой p/q."""
+        response = self.post('/api/calculate', {'operation': 'divide', 'a': 1, 'b': 3, 'mode': 'exact'})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['result'], '1/3')
+        self.assertEqual(data['expression'], '1 / 3 = 1/3')
+        self.assertNotIn('result_url', data)
+
+    def test_large_result_and_download(self):
+        """Тест: большой результат выводится кратко, все цифры - по result_url."""
+        data = self.post(
+            '/api/calculate', {'operation': 'power', 'a': '3', 'b': 10000, 'mode': 'exact'}
+        ).get_json()
+        self.assertEqual(data['result'], '1.6313501853426258743e+4771')
+        self.assertEqual(data['digits'], 4772)
+        self.assertEqual(data['result_url'], f"/api/history/{data['id']}/result")
+
+        response = self.client.get(data['result_url'], headers=self.headers)
+        self.assertEqual(response.mimetype, 'text/plain')
+        digits = response.get_data(as_text=True).strip()
+        self.assertEqual(len(digits), 4772)
+        self.assertEqual(int(digits[-12:]), 3 ** 10000 % 10 ** 12)
+        self.assertEqual(self.client.get('/api/history/999999/result', headers=self.headers).status_code, 404)
+
+    def test_exact_evaluate(self):
+        """Тест: выражение в точном режиме вычисляется без двоичного округления."""
+        data = self.post('/api/evaluate', {'expression': '0.1 + 0.2', 'mode': 'exact'}).get_json()
+        self.assertEqual(data, {'expression': '0.1 + 0.2', 'result': '3/10'})
+
+    def test_invalid_mode_and_operands(self):
+        """Тест: неизвестный режим и нечисловые операнды отклоняются."""
+        response = self.post('/api/calculate', {'operation': 'add', 'a': 1, 'b': 2, 'mode': 'decimal128'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['available_modes'], ['float', 'exact', 'decimal'])
+        response = self.post('/api/calculate', {'operation': 'add', 'a': '1e99', 'b': 2, 'mode': 'exact'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_float_overflow_suggests_exact_mode(self):
+        """Тест: переполнение float - ошибка 400 с подсказкой точного режима."""
+        response = self.post('/api/calculate', {'operation': 'power', 'a': 10, 'b': 400})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('"mode": "exact"', response.get_json()['error'])
+
+    def test_complex_result_rejected(self):
+        """Тест: отрицательное основание с дробным показателем - ошибка 400, история не ломается."""
+        response = self.post('/api/calculate', {'operation': 'power', 'a': -8, 'b': 0.5})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('действительным', response.get_json()['error'])
+        response = self.post('/api/evaluate', {'expression': '(0 - 8) ^ 0.5'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(api.calculation_history), 0)
+        self.assertEqual(self.client.get('/api/history', headers=self.headers).status_code, 200)
+
+
+class TestDecimalMode(ApiTestCase):
+    """Тесты десятичного режима вычислений."""
+
+    def test_decimal_result(self):
+        """Тест: десятичный результат - строка без ошибок двоичного представления."""
+        data = self.post('/api/calculate', {'operation': 'add', 'a': 0.1, 'b': 0.2, 'mode': 'decimal'}).get_json()
+        self.assertEqual(data['result'], '0.3')
+        self.assertEqual(data['expression'], '0.1 + 0.2 = 0.3')
+        data = self.post(
+            '/api/calculate', {'operation': 'multiply', 'a': '19.99', 'b': 3, 'mode': 'decimal'}
+        ).get_json()
+        self.assertEqual(data['result'], '59.97')
+
+    def test_fast_path_returns_number(self):
+        """Тест: целый результат из целых операндов вычисляется без Decimal и возвращается числом."""
+        data = self.post('/api/calculate', {'operation': 'multiply', 'a': 6, 'b': 7, 'mode': 'decimal'}).get_json()
+        self.assertEqual(data['result'], 42)
+
+    def test_precision_and_rounding(self):
+        """Тест: точность и округление задаются в запросе."""
+        payload = {'operation': 'divide', 'a': 2, 'b': 3, 'mode': 'decimal', 'precision': 4}
+        self.assertEqual(self.post('/api/calculate', payload).get_json()['result'], '0.6667')
+        payload['rounding'] = 'floor'
+        self.assertEqual(self.post('/api/calculate', payload).get_json()['result'], '0.6666')
+        data = self.post('/api/evaluate', {
+            'expression': '1 / 3 + 1', 'mode': 'decimal', 'precision': 3
+        }).get_json()
+        self.assertEqual(data['result'], '1.33')
+
+    def test_invalid_context(self):
+        """Тест: недопустимые точность и округление отклоняются."""
+        for extra in ({'precision': 0}, {'precision': '10'}, {'rounding': 'nearest'}):
+            with self.subTest(extra=extra):
+                payload = dict({'operation': 'add', 'a': 1, 'b': 2, 'mode': 'decimal'}, **extra)
+                response = self.post('/api/calculate', payload)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('half_even', response.get_json()['available_roundings'])
+        response = self.post('/api/evaluate', {'expression': '1 + 1', 'mode': 'decimal', 'precision': -1})
+        self.assertEqual(response.status_code, 400)
+
+    def test_decimal_job(self):
+        """Тест: контекст десятичного режима передаётся в задание."""
+        with patch.object(api, 'JOB_COST_THRESHOLD', 0):
+            job = self.post('/api/calculate', {
+                'operation': 'divide', 'a': 1, 'b': 7, 'mode': 'decimal', 'precision': 6, 'rounding': 'up'
+            }).get_json()
+        self.assertEqual((job['precision'], job['rounding']), (6, 'up'))
+        data = self.client.get(f"{job['url']}?wait=30", headers=self.headers).get_json()
+        self.assertEqual(data['result']['result'], '0.142858')
+
+
+class TestConcurrentRequests(ApiTestCase):
+    """Нагрузочный тест API при параллельных запросах."""
+
+    def test_parallel_calculations_keep_unique_ids(self):
+        """Тест: параллельные вычисления получают уникальные ID, записи не теряются."""
+        threads_count = 8
+        per_thread = 100
+        ids = [[] for _ in range(threads_count)]
+        barrier = threading.Barrier(threads_count)
+
+        def worker(index):
+            client = api.app.test_client()
+            barrier.wait()
+            for i in range(per_thread):
+                response = client.post(
+                    '/api/calculate',
+                    json={'operation': 'add', 'a': index, 'b': i},
+                    headers=self.headers
+                )
+                entry_id = response.get_json()['id']
+                ids[index].append(entry_id)
+                if i % 4 == 0:
+                    client.delete(f'/api/history/{entry_id}', headers=self.headers)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        all_ids = [entry_id for thread_ids in ids for entry_id in thread_ids]
+        self.assertEqual(len(set(all_ids)), threads_count * per_thread)
+        history = self.client.get('/api/history', headers=self.headers).get_json()
+        expected = threads_count * per_thread - threads_count * (per_thread // 4)
+        self.assertEqual(history['total'], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
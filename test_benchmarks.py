@@ -0,0 +1,32 @@
+"""
+Модульные тесты для сравнения результатов бенчмарков.
+"""
+
+import unittest
+
+from benchmarks import compare, measure
+
+
+class TestCompare(unittest.TestCase):
+    """Тесты для функции compare."""
+
+    def test_regression_above_threshold(self):
+        """Тест: замедление больше порога считается регрессией."""
+        baseline = {'core.add': {'ns_per_op': 100.0}, 'api.calculate': {'ns_per_op': 1000.0}}
+        current = {'core.add': {'ns_per_op': 130.0}, 'api.calculate': {'ns_per_op': 1100.0}}
+        regressions = compare(baseline, current, threshold=0.2)
+        self.assertEqual([name for name, *_ in regressions], ['core.add'])
+
+    def test_new_benchmarks_are_ignored(self):
+        """Тест: бенчмарки без базового результата не сравниваются."""
+        self.assertEqual(compare({}, {'core.add': {'ns_per_op': 1.0}}), [])
+
+    def test_measure(self):
+        """Тест структуры результата измерения."""
+        result = measure(lambda: None, 1, repeat=2, min_time=0.001)
+        self.assertGreater(result['ns_per_op'], 0)
+        self.assertLessEqual(result['ns_per_op'], result['median_ns_per_op'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,7 +10,13 @@
 """
 
 import unittest
-from calculator import add, subtract, multiply, divide, power
+from decimal import Decimal
+from fractions import Fraction
+from calculator import (
+    add, subtract, multiply, divide, power, get_operation, estimate_cost, OPERATIONS,
+    OPERATION_NAMES, DECIMAL_CONTEXT, MAX_DECIMAL_PRECISION,
+    calculate, calculate_decimal, calculate_exact, decimal_context, to_number
+)
 
 
 class TestCalculator(unittest.TestCase):
@@ -171,5 +177,169 @@ class TestCalculator(unittest.TestCase):
         self.assertAlmostEqual(power(2.5, 2), 6.25, places=7)
 
 
+
+class TestOperationRegistry(unittest.TestCase):
+    """Тесты для реестра операций."""
+    
+    def test_lookup_by_name_symbol_and_alias(self):
+        """Тест поиска операции по имени, символу и псевдониму."""
+        self.assertIs(get_operation('multiply').func, multiply)
+        self.assertIs(get_operation('*').func, multiply)
+        self.assertIs(get_operation('×').func, multiply)
+        self.assertIs(get_operation('÷').func, divide)
+        self.assertIs(get_operation('**').func, power)
+    
+    def test_unknown_operation(self):
+        """Тест неизвестной операции."""
+        self.assertIsNone(get_operation('modulo'))
+    
+    def test_all_operations_registered(self):
+        """Тест: все функции калькулятора есть в реестре."""
+        names = [operation.name for operation in OPERATIONS]
+        self.assertEqual(names, ['add', 'subtract', 'multiply', 'divide', 'power'])
+        for operation in OPERATIONS:
+            self.assertIs(get_operation(operation.symbol), operation)
+
+
+
+class TestEstimateCost(unittest.TestCase):
+    """Тесты оценки стоимости вычисления."""
+    
+    def test_float_operations_are_cheap(self):
+        """Тест: операции с float стоят 1 при любых значениях."""
+        self.assertEqual(estimate_cost('power', 10.0, 1e7), 1)
+        self.assertEqual(estimate_cost('multiply', 1e300, 1e300), 1)
+    
+    def test_integer_power_cost(self):
+        """Тест: стоимость целочисленной степени - количество цифр результата."""
+        self.assertEqual(estimate_cost('power', 10, 10_000_000), 10_000_001)
+        self.assertEqual(estimate_cost('power', 2, 10), len(str(2 ** 10)))
+        self.assertEqual(estimate_cost('power', 1, 10 ** 9), 1)
+        # Отрицательный показатель: 10 ^ -5 = 1/100000
+        self.assertEqual(estimate_cost('power', 10, -5), 6)
+    
+    def test_integer_multiply_cost(self):
+        """Тест: стоимость умножения целых - сумма разрядностей."""
+        self.assertAlmostEqual(estimate_cost('multiply', 10 ** 100, 10 ** 50), 152, delta=2)
+    
+    def test_fraction_cost(self):
+        """Тест: для дробей учитываются числитель и знаменатель."""
+        self.assertEqual(estimate_cost('power', Fraction(1, 10), 1000), 1001)
+        self.assertEqual(estimate_cost('power', 2, Fraction(1, 2)), 1)
+
+
+class TestExactMode(unittest.TestCase):
+    """Тесты точного режима вычислений."""
+    
+    def test_to_number(self):
+        """Тест: операнды приводятся к int или Fraction без потери точности."""
+        self.assertEqual(to_number('10', 'float'), 10.0)
+        self.assertEqual(to_number(10, 'exact'), 10)
+        self.assertEqual(to_number(0.1, 'exact'), Fraction(1, 10))
+        self.assertEqual(to_number('-1/3', 'exact'), Fraction(-1, 3))
+        self.assertEqual(to_number('2.50', 'exact'), Fraction(5, 2))
+        self.assertEqual(to_number('4/2', 'exact'), 2)
+        self.assertIs(type(to_number('123456789012345678901234567890', 'exact')), int)
+        for value in ('1e100000000', 'abc', float('inf'), None):
+            with self.subTest(value=value):
+                with self.assertRaises((ValueError, TypeError)):
+                    to_number(value, 'exact')
+    
+    def test_exact_operations(self):
+        """Тест: результаты точные, целые приводятся к int."""
+        self.assertEqual(calculate_exact('power', 3, 100), 3 ** 100)
+        self.assertEqual(calculate_exact('divide', 1, 3), Fraction(1, 3))
+        self.assertIs(type(calculate_exact('divide', 6, 3)), int)
+        self.assertEqual(calculate_exact('add', Fraction(1, 10), Fraction(2, 10)), Fraction(3, 10))
+        self.assertEqual(calculate_exact('power', 2, -2), Fraction(1, 4))
+        self.assertEqual(calculate_exact('multiply', 2 ** 64, 2 ** 64), 2 ** 128)
+    
+    def test_exact_errors(self):
+        """Тест: деление на ноль и дробный показатель степени - ValueError."""
+        with self.assertRaisesRegex(ValueError, 'Деление на ноль'):
+            calculate_exact('divide', 1, 0)
+        with self.assertRaisesRegex(ValueError, 'Деление на ноль'):
+            calculate_exact('power', 0, -1)
+        with self.assertRaisesRegex(ValueError, 'целого показателя'):
+            calculate_exact('power', 2, Fraction(1, 2))
+    
+    def test_calculate_dispatches_by_mode(self):
+        """Тест: calculate выбирает арифметику по режиму."""
+        self.assertEqual(calculate('divide', 1.0, 4.0), 0.25)
+        self.assertEqual(calculate('divide', 1, 4, 'exact'), Fraction(1, 4))
+        self.assertEqual(calculate('divide', 1, 4, 'decimal'), Decimal('0.25'))
+
+
+class TestDecimalMode(unittest.TestCase):
+    """Тесты десятичного режима вычислений."""
+    
+    def test_to_number(self):
+        """Тест: float и строки переводятся по десятичной записи, небольшие целые остаются int."""
+        self.assertEqual(to_number(0.1, 'decimal'), Decimal('0.1'))
+        self.assertEqual(str(to_number('19.90', 'decimal')), '19.90')
+        self.assertIs(type(to_number(3.0, 'decimal')), int)
+        self.assertIs(type(to_number('-42', 'decimal')), int)
+        self.assertEqual(to_number(2 ** 60, 'decimal'), Decimal(2 ** 60))
+        self.assertIs(type(to_number(2 ** 60, 'decimal')), Decimal)
+        for value in ('1/3', 'nan', 'Infinity', '1e99999999999999999999', float('inf'), None):
+            with self.subTest(value=value):
+                with self.assertRaises((ValueError, TypeError)):
+                    to_number(value, 'decimal')
+    
+    def test_decimal_operations(self):
+        """Тест: нет ошибок двоичного представления, знаки после запятой сохраняются."""
+        a, b = to_number(0.1, 'decimal'), to_number(0.2, 'decimal')
+        self.assertEqual(str(calculate_decimal('add', a, b)), '0.3')
+        self.assertEqual(str(calculate_decimal('multiply', Decimal('19.99'), 3)), '59.97')
+        self.assertEqual(str(calculate_decimal('add', Decimal('1.10'), Decimal('2.20'))), '3.30')
+        self.assertEqual(str(calculate_decimal('divide', 1, 3)), '0.' + '3' * 28)
+        self.assertEqual(str(calculate_decimal('power', 2, -2)), '0.25')
+    
+    def test_context(self):
+        """Тест: точность и округление задаются контекстом."""
+        self.assertEqual(str(calculate_decimal('divide', 2, 3, decimal_context(5))), '0.66667')
+        self.assertEqual(str(calculate_decimal('divide', 2, 3, decimal_context(5, 'down'))), '0.66666')
+        half = Decimal('2.5')
+        self.assertEqual(str(calculate_decimal('multiply', half, 1, decimal_context(1))), '2')
+        self.assertEqual(str(calculate_decimal('multiply', half, 1, decimal_context(1, 'ROUND_HALF_UP'))), '3')
+        # Быстрый путь не используется, если результат пришлось бы округлить
+        self.assertEqual(str(calculate_decimal('add', 12345, 1, decimal_context(3))), '1.23E+4')
+        for precision, rounding in ((0, None), (MAX_DECIMAL_PRECISION + 1, None), ('10', None), (10, 'up_down')):
+            with self.subTest(precision=precision, rounding=rounding):
+                with self.assertRaises(ValueError):
+                    decimal_context(precision, rounding)
+        self.assertIs(decimal_context(), DECIMAL_CONTEXT)
+    
+    def test_fast_path_matches_decimal(self):
+        """Тест: быстрый путь для целых операндов даёт тот же результат, что и Decimal."""
+        values = (0, 1, -1, 2, -3, 7, 53, 2 ** 26, -2 ** 26, 2 ** 53 - 1, 2 ** 53, -2 ** 53)
+        for name in OPERATION_NAMES:
+            for a in values:
+                for b in values:
+                    if name == 'power' and abs(b) > 64:
+                        continue
+                    with self.subTest(name=name, a=a, b=b):
+                        try:
+                            expected = str(calculate_decimal(name, Decimal(a), Decimal(b)))
+                        except ValueError:
+                            with self.assertRaises(ValueError):
+                                calculate_decimal(name, a, b)
+                            continue
+                        self.assertEqual(str(calculate_decimal(name, a, b)), expected)
+        self.assertIs(type(calculate_decimal('multiply', 6, 7)), int)
+    
+    def test_decimal_errors(self):
+        """Тест: деление на ноль, неопределённый результат и переполнение - ValueError."""
+        for a, b in ((1, 0), (0, 0), (Decimal('1.5'), 0)):
+            with self.assertRaisesRegex(ValueError, 'Деление на ноль'):
+                calculate_decimal('divide', a, b)
+        with self.assertRaisesRegex(ValueError, 'Деление на ноль'):
+            calculate_decimal('power', 0, -1)
+        with self.assertRaisesRegex(ValueError, 'не определён'):
+            calculate_decimal('power', -8, Decimal('0.5'))
+        with self.assertRaisesRegex(ValueError, 'Порядок результата'):
+            calculate_decimal('power', 10, 10 ** 7)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,72 @@
+"""
+Модульные тесты для пакетного режима калькулятора.
+"""
+
+import unittest
+
+import numpy as np
+
+from calculator_batch import batch_calculate
+
+
+class TestBatchCalculate(unittest.TestCase):
+    """Тесты для функции batch_calculate."""
+
+    def test_basic_operations(self):
+        """Тест основных операций над последовательностями."""
+        a = [10, 7, -3]
+        b = [5, 2, 4]
+        np.testing.assert_array_equal(batch_calculate('add', a, b).values, [15, 9, 1])
+        np.testing.assert_array_equal(batch_calculate('subtract', a, b).values, [5, 5, -7])
+        np.testing.assert_array_equal(batch_calculate('multiply', a, b).values, [50, 14, -12])
+        np.testing.assert_array_equal(batch_calculate('divide', a, b).values, [2, 3.5, -0.75])
+        np.testing.assert_array_equal(batch_calculate('power', a, b).values, [100000, 49, 81])
+
+    def test_numpy_arrays_and_scalar_broadcast(self):
+        """Тест работы с массивами NumPy и числом вместо массива."""
+        result = batch_calculate('multiply', np.arange(4), 2)
+        np.testing.assert_array_equal(result.values, [0, 2, 4, 6])
+        self.assertFalse(result.errors.any())
+
+    def test_scalar_operands(self):
+        """Тест: оба операнда - числа, в том числе с ошибкой вычисления."""
+        result = batch_calculate('power', 0, -1)
+        np.testing.assert_array_equal(result.errors, [True])
+        self.assertTrue(np.isnan(result.values[0]))
+        np.testing.assert_array_equal(batch_calculate('add', 2, 3).values, [5])
+        with self.assertRaisesRegex(ValueError, 'Деление на ноль'):
+            batch_calculate('divide', 1, 0, on_error='raise')
+
+    def test_divide_by_zero_mask(self):
+        """Тест: деление на ноль отмечается в маске, а не прерывает пакет."""
+        result = batch_calculate('divide', [10, 1, 6], [2, 0, 3])
+        np.testing.assert_array_equal(result.errors, [False, True, False])
+        self.assertEqual(result.values[0], 5)
+        self.assertTrue(np.isnan(result.values[1]))
+        self.assertEqual(result.values[2], 2)
+
+    def test_divide_by_zero_raise_policy(self):
+        """Тест политики 'raise': сообщение совпадает со скалярной функцией."""
+        with self.assertRaises(ValueError) as context:
+            batch_calculate('divide', [1, 2], [1, 0], on_error='raise')
+        self.assertEqual(str(context.exception), "Деление на ноль невозможно!")
+
+    def test_power_invalid_elements(self):
+        """Тест: ноль в отрицательной степени отмечается в маске."""
+        result = batch_calculate('power', [0, 2], [-1, 2])
+        np.testing.assert_array_equal(result.errors, [True, False])
+        self.assertEqual(result.values[1], 4)
+
+    def test_unknown_operation(self):
+        """Тест неизвестной операции."""
+        with self.assertRaises(ValueError):
+            batch_calculate('modulo', [1], [1])
+
+    def test_mismatched_lengths(self):
+        """Тест последовательностей разной длины."""
+        with self.assertRaises(ValueError):
+            batch_calculate('add', [1, 2, 3], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
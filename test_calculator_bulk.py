@@ -0,0 +1,84 @@
+"""
+Модульные тесты для массового вычисления файлов.
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from calculator_bulk import bulk_evaluate, detect_format
+
+
+class TestBulkEvaluate(unittest.TestCase):
+    """Тесты для функции bulk_evaluate."""
+
+    def test_csv_order_preserved_across_chunks(self):
+        """Тест: результаты блоков записываются в исходном порядке."""
+        lines = ['operation,a,b\n'] + [f'add,{i},1\n' for i in range(50)]
+        out = io.StringIO()
+        stats = bulk_evaluate(lines, out, 'csv', workers=2, chunk_size=7)
+        rows = out.getvalue().splitlines()
+        self.assertEqual(rows[0], 'result,error')
+        self.assertEqual(rows[1:], [f'{i + 1},' for i in range(50)])
+        self.assertEqual(stats['records'], 50)
+        self.assertEqual(stats['failed'], 0)
+
+    def test_csv_errors_match_api(self):
+        """Тест: ошибки совпадают с сообщениями API."""
+        lines = ['divide,1,0\n', 'add,x,1\n', 'add,1\n']
+        out = io.StringIO()
+        stats = bulk_evaluate(lines, out, 'csv', workers=1, chunk_size=2)
+        rows = out.getvalue().splitlines()
+        self.assertEqual(rows[0], ',Деление на ноль невозможно!')
+        self.assertIn('должны быть числами', rows[1])
+        self.assertIn('operation,a,b', rows[2])
+        self.assertEqual(stats['failed'], 3)
+
+    def test_ndjson(self):
+        """Тест NDJSON: для каждой записи выводится тело ответа API."""
+        lines = [
+            json.dumps({'operation': 'power', 'a': 2, 'b': 8}) + '\n',
+            'не json\n',
+        ]
+        out = io.StringIO()
+        stats = bulk_evaluate(lines, out, 'ndjson', workers=1)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(results[0]['result'], 256)
+        self.assertEqual(results[0]['expression'], '2.0 ^ 8.0 = 256')
+        self.assertIn('error', results[1])
+        self.assertEqual(stats['failed'], 1)
+
+    def test_exact_result_size_limited(self):
+        """Тест: слишком большой результат точного режима отклоняется до вычисления."""
+        lines = [
+            json.dumps({'operation': 'power', 'a': 9, 'b': 999999999, 'mode': 'exact'}) + '\n',
+            json.dumps({'operation': 'power', 'a': 3, 'b': 100, 'mode': 'exact'}) + '\n',
+        ]
+        out = io.StringIO()
+        stats = bulk_evaluate(lines, out, 'ndjson', workers=1)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertIn('Результат слишком велик', results[0]['error'])
+        self.assertEqual(results[1]['result'], 3 ** 100)
+        self.assertEqual(stats['failed'], 1)
+
+    def test_web_application_not_imported(self):
+        """Тест: модуль пакетной обработки не загружает API и Flask."""
+        code = 'import sys, calculator_bulk; print("api" in sys.modules, "flask" in sys.modules)'
+        output = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, check=True, timeout=60,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout
+        self.assertEqual(output.split(), ['False', 'False'])
+
+    def test_detect_format(self):
+        """Тест определения формата по расширению."""
+        self.assertEqual(detect_format('data.ndjson'), 'ndjson')
+        self.assertEqual(detect_format('data.jsonl'), 'ndjson')
+        self.assertEqual(detect_format('data.csv'), 'csv')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Модульные тесты для потокового режима калькулятора.
+"""
+
+import io
+import unittest
+
+from calculator_stream import stream, evaluate_line, format_result
+
+
+class TestStream(unittest.TestCase):
+    """Тесты для функции stream."""
+
+    def run_stream(self, text, **kwargs):
+        """Запускает потоковый режим на тексте и возвращает (вывод, ошибки, счётчики)."""
+        out = io.StringIO()
+        errors = io.StringIO()
+        counts = stream(io.StringIO(text), out, errors=errors, **kwargs)
+        return out.getvalue(), errors.getvalue(), counts
+
+    def test_records_and_expressions(self):
+        """Тест записей "операция,a,b" и выражений."""
+        output, errors, counts = self.run_stream('add,10,5\n2 * (3 + 4)\n÷,7,2\n')
+        self.assertEqual(output, '15\n14\n3.5\n')
+        self.assertEqual(errors, '')
+        self.assertEqual(counts, (3, 0))
+
+    def test_skips_blank_and_comment_lines(self):
+        """Тест пропуска пустых строк и комментариев."""
+        output, _, counts = self.run_stream('# заголовок\n\nmultiply,3,4\n')
+        self.assertEqual(output, '12\n')
+        self.assertEqual(counts, (1, 0))
+
+    def test_stops_on_error_by_default(self):
+        """Тест: по умолчанию обработка останавливается на первой ошибке."""
+        output, errors, counts = self.run_stream('1 + 1\ndivide,1,0\n2 + 2\n')
+        self.assertEqual(output, '2\n')
+        self.assertIn('Строка 2: Деление на ноль невозможно!', errors)
+        self.assertEqual(counts, (1, 1))
+
+    def test_keep_going(self):
+        """Тест: с keep_going ошибочные строки пропускаются и учитываются."""
+        output, errors, counts = self.run_stream('1 + 1\nmod,1,2\nadd,x,1\n2 + 2\n', keep_going=True)
+        self.assertEqual(output, '2\n4\n')
+        self.assertEqual(errors.count('Строка'), 2)
+        self.assertEqual(counts, (2, 2))
+
+    def test_evaluate_line_invalid_record(self):
+        """Тест записи с неверным количеством полей."""
+        with self.assertRaises(ValueError):
+            evaluate_line('add,1')
+
+    def test_format_result(self):
+        """Тест форматирования результатов."""
+        self.assertEqual(format_result(15.0), '15')
+        self.assertEqual(format_result(0.5), '0.5')
+        self.assertEqual(format_result(float('inf')), 'inf')
+
+
+if __name__ == '__main__':
+    unittest.main()
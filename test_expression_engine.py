@@ -0,0 +1,122 @@
+"""
+Модульные тесты для вычисления арифметических выражений.
+"""
+
+import unittest
+from decimal import Decimal
+from fractions import Fraction
+
+from calculator import decimal_context
+
+from expression_engine import (
+    EXACT_MAX_DIGITS, evaluate, normalize, tokenize, compile_shape, ExpressionError
+)
+
+
+class TestEvaluate(unittest.TestCase):
+    """Тесты для функции evaluate."""
+
+    def test_simple_operations(self):
+        """Тест простых выражений из двух чисел."""
+        self.assertEqual(evaluate('10 + 5'), 15)
+        self.assertEqual(evaluate('15/3'), 5)
+        self.assertEqual(evaluate('7 × 6'), 42)
+        self.assertEqual(evaluate('9 ÷ 2'), 4.5)
+        self.assertEqual(evaluate('2 ^ 10'), 1024)
+        self.assertEqual(evaluate('2 ** 3'), 8)
+        self.assertEqual(evaluate('10 add 5'), 15)
+
+    def test_precedence_and_parentheses(self):
+        """Тест приоритета операций и скобок."""
+        self.assertEqual(evaluate('2 + 3 * 4'), 14)
+        self.assertEqual(evaluate('(2 + 3) * 4'), 20)
+        self.assertEqual(evaluate('2 ^ 3 ^ 2'), 512)
+        self.assertEqual(evaluate('100 / 10 / 5'), 2)
+
+    def test_unary_minus(self):
+        """Тест унарного минуса (как в Python: -2^2 = -4)."""
+        self.assertEqual(evaluate('-5 + 3'), -2)
+        self.assertEqual(evaluate('-2 ^ 2'), -4)
+        self.assertEqual(evaluate('2 ^ -1'), 0.5)
+        self.assertEqual(evaluate('(1 + 2) * -3'), -9)
+
+    def test_divide_by_zero(self):
+        """Тест деления на ноль - сообщение из модуля calculator."""
+        with self.assertRaises(ValueError) as context:
+            evaluate('1 / (2 - 2)')
+        self.assertEqual(str(context.exception), "Деление на ноль невозможно!")
+
+    def test_invalid_expressions(self):
+        """Тест ошибок разбора."""
+        for text in ['', '1 +', '(1 + 2', '1 2', 'a + 1', '5 % 2', '-' * 500 + '1']:
+            with self.subTest(text=text):
+                with self.assertRaises(ExpressionError):
+                    evaluate(text)
+
+    def test_same_shape_is_compiled_once(self):
+        """Тест: выражения одной формы используют одну скомпилированную функцию."""
+        shape, _ = tokenize('10 + 5')
+        self.assertEqual(shape, tokenize('7.5 + 3')[0])
+        compiled = compile_shape(shape)
+        evaluate('1 + 2')
+        self.assertIs(compile_shape(shape), compiled)
+
+    def test_normalize(self):
+        """Тест приведения выражения к единому виду."""
+        self.assertEqual(normalize('2×(3+4)'), '2 * (3 + 4)')
+        self.assertEqual(normalize('-5 ** 2'), '-5 ^ 2')
+        self.assertEqual(normalize('1.5 divide 3'), '1.5 / 3')
+
+
+class TestExactEvaluate(unittest.TestCase):
+    """Тесты точного режима вычисления выражений."""
+
+    def test_exact_results(self):
+        """Тест: целые и десятичные дроби вычисляются без округления."""
+        self.assertEqual(evaluate('0.1 + 0.2', 'exact'), Fraction(3, 10))
+        self.assertEqual(evaluate('2 ^ 100 + 1', 'exact'), 2 ** 100 + 1)
+        self.assertEqual(evaluate('1 / 3 * 3', 'exact'), 1)
+        self.assertEqual(evaluate('(-2) ^ -3', 'exact'), Fraction(-1, 8))
+        self.assertEqual(evaluate('0.1 + 0.2'), 0.1 + 0.2)
+
+    def test_exact_errors(self):
+        """Тест: дробный показатель, слишком большой результат и порядок числа."""
+        with self.assertRaisesRegex(ValueError, 'целого показателя'):
+            evaluate('2 ^ 0.5', 'exact')
+        with self.assertRaisesRegex(ValueError, 'слишком велик'):
+            evaluate(f'10 ^ {EXACT_MAX_DIGITS + 1}', 'exact')
+        with self.assertRaises(ExpressionError):
+            evaluate('1e999999999 + 1', 'exact')
+
+    def test_exact_normalize(self):
+        """Тест: числа записываются как введены, без двоичного округления."""
+        self.assertEqual(normalize('123456789012345678901234567890 + 0.1', 'exact'),
+                         '123456789012345678901234567890 + 0.1')
+
+
+class TestDecimalEvaluate(unittest.TestCase):
+    """Тесты десятичного режима вычисления выражений."""
+
+    def test_decimal_results(self):
+        """Тест: десятичные дроби без ошибок округления, целые - быстрым путём."""
+        self.assertEqual(evaluate('0.1 + 0.2', 'decimal'), Decimal('0.3'))
+        self.assertEqual(str(evaluate('-(19.99 * 3) + 0.03', 'decimal')), '-59.94')
+        self.assertEqual(evaluate('2 × (3 + 4) ^ 2', 'decimal'), 98)
+        self.assertEqual(normalize('1.50 + 2', 'decimal'), '1.50 + 2')
+
+    def test_context(self):
+        """Тест: контекст применяется ко всем операциям выражения."""
+        self.assertEqual(str(evaluate('1 / 3 + 1', 'decimal', decimal_context(4))), '1.333')
+        self.assertEqual(str(evaluate('2 / 3', 'decimal', decimal_context(3, 'floor'))), '0.666')
+        self.assertEqual(str(evaluate('2 / 3', 'decimal')), '0.' + '6' * 27 + '7')
+
+    def test_decimal_errors(self):
+        """Тест: ошибки вычисления - ValueError, недопустимое число - ExpressionError."""
+        with self.assertRaisesRegex(ValueError, 'Деление на ноль'):
+            evaluate('1 / (2 - 2)', 'decimal')
+        with self.assertRaises(ExpressionError):
+            evaluate('1e99999999999999999999 + 1', 'decimal')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Модульные тесты для рассылки записей истории и потока SSE.
+"""
+
+import asyncio
+import json
+import unittest
+
+import api
+from history_events import HistoryBroadcaster, SubscriptionClosed
+
+
+def parse_events(chunks):
+    """Разбирает события SSE с данными в список словарей."""
+    events = []
+    for chunk in chunks:
+        fields = dict(
+            line.split(': ', 1) for line in chunk.strip().splitlines() if not line.startswith(':')
+        )
+        if 'data' in fields:
+            events.append({'id': fields.get('id'), 'event': fields.get('event'),
+                           'data': json.loads(fields['data'])})
+    return events
+
+
+class TestHistoryBroadcaster(unittest.TestCase):
+    """Тесты класса HistoryBroadcaster."""
+
+    def setUp(self):
+        self.broadcaster = HistoryBroadcaster(subscriber_queue_size=3)
+        self.addCleanup(self.broadcaster.shutdown)
+
+    def test_fan_out_to_subscribers(self):
+        """Тест: каждая запись доходит до всех подписчиков по порядку."""
+        first = self.broadcaster.subscribe()
+        second = self.broadcaster.subscribe()
+        self.broadcaster.publish([{'id': 1}, {'id': 2}])
+        self.broadcaster.flush()
+        for subscription in (first, second):
+            self.assertEqual([subscription.get(1)['id'], subscription.get(1)['id']], [1, 2])
+            self.assertIsNone(subscription.get(timeout=0.01))
+
+    def test_publish_without_subscribers_is_noop(self):
+        """Тест: без подписчиков записи не ставятся в очередь."""
+        self.broadcaster.publish([{'id': 1}])
+        self.assertEqual(self.broadcaster.stats()['queue_depth'], 0)
+
+    def test_slow_subscriber_is_disconnected(self):
+        """Тест: подписчик с переполненной очередью отключается, остальные получают записи."""
+        slow = self.broadcaster.subscribe()
+        fast = self.broadcaster.subscribe()
+        for entry_id in range(1, 6):
+            self.broadcaster.publish([{'id': entry_id}])
+            self.broadcaster.flush()
+            fast.get(1)
+        self.assertTrue(slow.overflowed)
+        self.assertFalse(fast.overflowed)
+        with self.assertRaises(SubscriptionClosed):
+            for _ in range(5):
+                slow.get(1)
+        stats = self.broadcaster.stats()
+        self.assertEqual((stats['subscribers'], stats['disconnected']), (1, 1))
+
+
+    def test_async_subscription(self):
+        """Тест: подписка asyncio получает записи в своём цикле событий."""
+        async def receive():
+            subscription = self.broadcaster.subscribe(loop=asyncio.get_running_loop())
+            self.broadcaster.publish([{'id': 1}, {'id': 2}])
+            first = await subscription.get(1)
+            second = await subscription.get(1)
+            idle = await subscription.get(timeout=0.01)
+            return [first['id'], second['id'], idle]
+
+        self.assertEqual(asyncio.run(receive()), [1, 2, None])
+
+    def test_slow_async_subscriber_is_disconnected(self):
+        """Тест: очередь подписки asyncio ограничена, как и у обычной."""
+        async def overflow():
+            subscription = self.broadcaster.subscribe(loop=asyncio.get_running_loop())
+            for entry_id in range(1, 6):
+                self.broadcaster.publish([{'id': entry_id}])
+                await asyncio.to_thread(self.broadcaster.flush)
+            received = []
+            with self.assertRaises(SubscriptionClosed):
+                while True:
+                    received.append((await subscription.get(1))['id'])
+            return subscription.overflowed, received
+
+        overflowed, received = asyncio.run(overflow())
+        self.assertTrue(overflowed)
+        self.assertEqual(received, [1, 2, 3])
+
+
+class TestHistoryStream(unittest.TestCase):
+    """Тесты эндпоинта /api/history/stream."""
+
+    def setUp(self):
+        self.client = api.app.test_client()
+        self.headers = {'X-API-Key': api.API_KEY}
+        self.client.delete('/api/history', headers=self.headers)
+
+    def calculate(self, a):
+        response = self.client.post('/api/calculate', json={'operation': 'add', 'a': a, 'b': 1},
+                                    headers=self.headers)
+        return response.get_json()['id']
+
+    def open_stream(self, headers=None, query=''):
+        response = self.client.get(f'/api/history/stream{query}',
+                                   headers=dict(self.headers, **(headers or {})), buffered=False)
+        self.addCleanup(response.close)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        chunks = (chunk.decode('utf-8') for chunk in response.response)
+        self.assertTrue(next(chunks).startswith('retry:'))
+        return chunks
+
+    def test_new_entries_are_pushed(self):
+        """Тест: новые записи истории приходят событиями с ID записи."""
+        chunks = self.open_stream()
+        entry_id = self.calculate(41)
+        api.history_broadcaster.flush()
+        event = parse_events([next(chunks)])[0]
+        self.assertEqual(event['id'], str(entry_id))
+        self.assertEqual(event['event'], 'calculation')
+        self.assertEqual(event['data']['result'], 42)
+
+    def test_resume_from_last_event_id(self):
+        """Тест: с Last-Event-ID сначала приходят пропущенные записи, без повторов."""
+        ids = [self.calculate(i) for i in range(3)]
+        chunks = self.open_stream({'Last-Event-ID': str(ids[0])})
+        replayed = parse_events([next(chunks), next(chunks)])
+        self.assertEqual([event['data']['id'] for event in replayed], ids[1:])
+        new_id = self.calculate(10)
+        api.history_broadcaster.flush()
+        self.assertEqual(parse_events([next(chunks)])[0]['data']['id'], new_id)
+
+    def test_api_key_in_query_and_validation(self):
+        """Тест: ключ в параметре api_key, ошибки авторизации и Last-Event-ID."""
+        response = self.client.get('/api/history/stream')
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get('/api/history/stream?last_event_id=abc', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.open_stream(headers={'X-API-Key': ''}, query=f'?api_key={api.API_KEY}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,504 @@
+"""
+Модульные тесты для хранилища истории вычислений.
+"""
+
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from collections import OrderedDict
+from decimal import Decimal
+from fractions import Fraction
+from math import inf
+from unittest.mock import patch
+
+from history_store import HistoryEntry, HistoryStore, SQLiteHistoryStore, _encode_value
+
+
+def make_entry(result, operation='add'):
+    """Создаёт минимальную запись истории."""
+    return {'operation': operation, 'a': result, 'b': 0, 'result': result}
+
+
+class TestHistoryEntry(unittest.TestCase):
+    """Тесты компактной записи истории."""
+
+    def test_lazy_expression_and_serialization(self):
+        """Тест: выражение формируется при обращении, словарь - в прежнем формате."""
+        entry = HistoryEntry('divide', 15.0, 3.0, 5)
+        self.assertFalse(hasattr(entry, '__dict__'))
+        self.assertEqual(entry['expression'], '15.0 / 3.0 = 5')
+        self.assertEqual(entry.to_dict(), {
+            'operation': 'divide', 'a': 15.0, 'b': 3.0, 'result': 5, 'expression': '15.0 / 3.0 = 5'
+        })
+        self.assertNotIn('id', entry)
+
+    def test_mapping_access_in_store(self):
+        """Тест: хранилище присваивает записи ID и время через доступ по ключу."""
+        store = HistoryStore()
+        entry = store.add(HistoryEntry('power', 2.0, 3.0, 8))
+        self.assertEqual(entry.id, 1)
+        self.assertIsNotNone(entry['timestamp'])
+        self.assertEqual(list(entry.to_dict()), list(HistoryEntry.FIELDS))
+        self.assertEqual(store.query(operation='power', min_result=8), [entry])
+        with self.assertRaises(KeyError):
+            entry['unknown'] = 1
+
+    def test_exact_values_serialization(self):
+        """Тест: дроби и большие целые выводятся строками, число хранится точно."""
+        entry = HistoryEntry('divide', 1, 3, Fraction(1, 3))
+        self.assertEqual(entry['expression'], '1 / 3 = 1/3')
+        self.assertEqual(entry.to_dict()['result'], '1/3')
+        big = HistoryEntry('power', 3, 10000, 3 ** 10000)
+        self.assertEqual(big.to_dict()['result'], '1.6313501853426258743e+4771')
+        self.assertEqual(big['result'], 3 ** 10000)
+
+    def test_decimal_values_serialization(self):
+        """Тест: Decimal выводится строкой с сохранением знаков после запятой."""
+        entry = HistoryEntry('add', Decimal('1.10'), Decimal('2.20'), Decimal('3.30'))
+        self.assertEqual(entry['expression'], '1.10 + 2.20 = 3.30')
+        self.assertEqual(entry.to_dict()['result'], '3.30')
+
+
+class TestHistoryStore(unittest.TestCase):
+    """Тесты для класса HistoryStore."""
+
+    def test_ids_are_sequential(self):
+        """Тест последовательного присвоения ID."""
+        store = HistoryStore()
+        ids = [store.add(make_entry(i))['id'] for i in range(3)]
+        self.assertEqual(ids, [1, 2, 3])
+        self.assertEqual(len(store), 3)
+
+    def test_get_and_delete_by_id(self):
+        """Тест поиска и удаления записи по ID."""
+        store = HistoryStore()
+        store.extend([make_entry(i) for i in range(3)])
+        self.assertEqual(store.get(2)['result'], 1)
+        deleted = store.delete(2)
+        self.assertEqual(deleted['id'], 2)
+        self.assertIsNone(store.get(2))
+        self.assertIsNone(store.delete(2))
+        self.assertEqual([entry['id'] for entry in store], [1, 3])
+
+    def test_ring_buffer_eviction(self):
+        """Тест вытеснения самых старых записей при переполнении."""
+        store = HistoryStore(max_size=3)
+        store.extend([make_entry(i) for i in range(5)])
+        self.assertEqual(len(store), 3)
+        self.assertEqual([entry['id'] for entry in store], [3, 4, 5])
+        self.assertIsNone(store.get(1))
+
+    def test_recent(self):
+        """Тест получения последних записей в хронологическом порядке."""
+        store = HistoryStore()
+        store.extend([make_entry(i) for i in range(5)])
+        self.assertEqual([entry['id'] for entry in store.recent(2)], [4, 5])
+        self.assertEqual(len(store.recent()), 5)
+        self.assertEqual(len(store.recent(10)), 5)
+
+    def test_page(self):
+        """Тест постраничного вывода по ID с учётом удалённых записей."""
+        store = HistoryStore()
+        store.extend([make_entry(i) for i in range(10)])
+        store.delete(3)
+        self.assertEqual([entry['id'] for entry in store.page(0, 3)], [1, 2, 4])
+        self.assertEqual([entry['id'] for entry in store.page(4, 3)], [5, 6, 7])
+        self.assertEqual([entry['id'] for entry in store.page(8, 3)], [9, 10])
+        self.assertEqual(store.page(10, 3), [])
+
+    def test_page_skips_deleted_range(self):
+        """Тест: длинный промежуток удалённых записей не перебирается по одному ID."""
+        store = HistoryStore()
+        store.extend([make_entry(i) for i in range(20000)])
+        for entry_id in range(2, 20000):
+            store.delete(entry_id)
+
+        lookups = []
+
+        class CountingDict(OrderedDict):
+            def get(self, key, default=None):
+                lookups.append(key)
+                return super().get(key, default)
+
+        store._entries = CountingDict(store._entries)
+        self.assertEqual([entry['id'] for entry in store.page(1, 10)], [20000])
+        self.assertEqual([entry['id'] for entry in store.page(0, 1)], [1])
+        self.assertLess(len(lookups), 2000)
+
+    def test_clear_keeps_id_sequence(self):
+        """Тест: после очистки ID не переиспользуются."""
+        store = HistoryStore()
+        store.add(make_entry(1))
+        self.assertEqual(store.clear(), 1)
+        self.assertEqual(store.add(make_entry(2))['id'], 2)
+
+    def test_invalid_max_size(self):
+        """Тест недопустимого размера истории."""
+        with self.assertRaises(ValueError):
+            HistoryStore(max_size=0)
+
+
+class TestSQLiteHistoryStore(unittest.TestCase):
+    """Тесты для постоянного хранилища SQLiteHistoryStore."""
+
+    def setUp(self):
+        """Создаёт временный каталог для базы данных."""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'history.db')
+        # Очистка выполняется после закрытия хранилищ (обратный порядок addCleanup)
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def open_store(self, **kwargs):
+        """Открывает хранилище, которое закрывается в конце теста."""
+        store = SQLiteHistoryStore(self.path, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_add_get_delete(self):
+        """Тест добавления, поиска и удаления записей."""
+        store = self.open_store()
+        entries = [store.add(make_entry(i)) for i in range(3)]
+        self.assertEqual([entry['id'] for entry in entries], [1, 2, 3])
+        self.assertEqual(store.get(2)['result'], 1)
+        self.assertEqual(store.delete(2)['id'], 2)
+        self.assertIsNone(store.delete(2))
+        self.assertIsNone(store.get(2))
+        self.assertEqual(len(store), 2)
+
+    def test_history_survives_restart(self):
+        """Тест: история и последовательность ID сохраняются после перезапуска."""
+        store = self.open_store()
+        store.extend([make_entry(i) for i in range(3)])
+        store.flush()
+
+        store.close()
+        reopened = self.open_store()
+        self.assertEqual(len(reopened), 3)
+        self.assertEqual(reopened.add(make_entry(3))['id'], 4)
+
+    def test_close_writes_queued_entries(self):
+        """Тест: close() записывает всю очередь, даже без flush()."""
+        store = self.open_store()
+        for start in range(0, 100000, 1000):
+            store.extend([make_entry(i) for i in range(start, start + 1000)])
+        store.close()
+        reopened = self.open_store()
+        self.assertEqual(len(reopened), 100000)
+        self.assertEqual(reopened.get(100000)['result'], 99999)
+
+    def test_api_closes_store_at_exit(self):
+        """Тест: API закрывает хранилище при завершении процесса, очередь не теряется."""
+        script = (
+            'import api\n'
+            'from history_store import HistoryEntry\n'
+            'api.calculation_history.extend(HistoryEntry("add", i, 0, i) for i in range(20000))\n'
+        )
+        environment = dict(os.environ, HISTORY_DB_PATH=self.path)
+        subprocess.run([sys.executable, '-c', script], env=environment, check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)), timeout=120)
+        self.assertEqual(len(self.open_store()), 20000)
+
+    def test_ring_buffer_eviction(self):
+        """Тест вытеснения самых старых записей при переполнении."""
+        store = self.open_store(max_size=3)
+        store.extend([make_entry(i) for i in range(5)])
+        self.assertEqual([entry['id'] for entry in store], [3, 4, 5])
+        self.assertEqual(len(store), 3)
+
+    def test_recent_and_page(self):
+        """Тест последних записей и постраничного вывода по ключу."""
+        store = self.open_store()
+        store.extend([make_entry(i) for i in range(6)])
+        self.assertEqual([entry['id'] for entry in store.recent(2)], [5, 6])
+        self.assertEqual([entry['id'] for entry in store.page(2, 3)], [3, 4, 5])
+
+    def test_clear_after_pending_writes(self):
+        """Тест: очистка выполняется после поставленных ранее записей."""
+        store = self.open_store()
+        store.extend([make_entry(i) for i in range(4)])
+        self.assertEqual(store.clear(), 4)
+        self.assertEqual(len(store), 0)
+
+    def test_concurrent_adds(self):
+        """Тест: параллельные добавления групповой фиксацией не теряют записи."""
+        store = self.open_store()
+
+        def add_many():
+            for i in range(200):
+                store.add(make_entry(i))
+
+        threads = [threading.Thread(target=add_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ids = [entry['id'] for entry in store]
+        self.assertEqual(ids, list(range(1, 801)))
+
+    def test_exact_values_round_trip(self):
+        """Тест: большие целые и дроби сохраняются в базе без потери точности."""
+        store = self.open_store()
+        store.extend([
+            HistoryEntry('power', 3, 10000, 3 ** 10000),
+            HistoryEntry('divide', 1, 3, Fraction(1, 3)),
+            HistoryEntry('power', -2, 65, -2 ** 65),
+            HistoryEntry('add', Decimal('0.1'), 2, Decimal('2.10')),
+        ])
+        self.assertEqual([entry['result'] for entry in store],
+                         [3 ** 10000, Fraction(1, 3), -2 ** 65, Decimal('2.1')])
+        self.assertEqual(store.get(4)['expression'], '0.1 + 2 = 2.10')
+        self.assertEqual(store.get(2)['expression'], '1 / 3 = 1/3')
+        # Значения, хранящиеся как BLOB, фильтруются по числовой копии
+        self.assertEqual([entry['id'] for entry in store.query(min_result=0)], [1, 2, 4])
+        self.assertEqual([entry['id'] for entry in store.query(max_result=0)], [3])
+
+    def test_expression_not_stored(self):
+        """Тест: текст выражения не форматируется при записи, а строится при чтении."""
+        store = self.open_store()
+        entries = [HistoryEntry('multiply', i, 2.5, i * 2.5) for i in range(3)]
+        with patch('history_store._expression') as expression:
+            store.extend(entries)
+            store.flush()
+        expression.assert_not_called()
+        connection = sqlite3.connect(self.path)
+        self.addCleanup(connection.close)
+        self.assertEqual(connection.execute('SELECT expression FROM history').fetchall(), [(None,)] * 3)
+        self.assertEqual(store.get(2)['expression'], '1 * 2.5 = 2.5')
+
+    def test_result_number_added_to_old_database(self):
+        """Тест: в базе без числовой копии результата столбец добавляется и заполняется."""
+        connection = sqlite3.connect(self.path)
+        connection.execute(
+            'CREATE TABLE history (id INTEGER PRIMARY KEY, operation TEXT NOT NULL, '
+            'a REAL, b REAL, result, expression TEXT, timestamp REAL)'
+        )
+        connection.execute('CREATE INDEX history_result ON history (result)')
+        connection.executemany(
+            'INSERT INTO history VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(1, 'add', 1, 2, 3, None, 1.0),
+             (2, 'power', 10, 60, _encode_value(10 ** 60), None, 2.0)]
+        )
+        connection.commit()
+        connection.close()
+
+        store = self.open_store()
+        self.assertEqual([entry['result'] for entry in store.query(min_result=1)], [3, 10 ** 60])
+        self.assertEqual([entry['id'] for entry in store.query(min_result=1e59)], [2])
+
+
+class QueryTestsMixin:
+    """Общие тесты query() для обоих хранилищ. Требует метода make_store()."""
+
+    def fill(self, store):
+        """Добавляет по 10 записей для операций add и divide вперемешку."""
+        for i in range(10):
+            store.add(make_entry(i, 'add'))
+            store.add(make_entry(i * 100, 'divide'))
+
+    def test_query_by_operation(self):
+        """Тест фильтра по операции."""
+        store = self.make_store()
+        self.fill(store)
+        entries = store.query(operation='divide', limit=100)
+        self.assertEqual(len(entries), 10)
+        self.assertTrue(all(entry['operation'] == 'divide' for entry in entries))
+        self.assertEqual(store.query(operation='power'), [])
+
+    def test_query_by_result_range(self):
+        """Тест фильтра по диапазону результата."""
+        store = self.make_store()
+        self.fill(store)
+        entries = store.query(min_result=5, max_result=300)
+        self.assertEqual(sorted(entry['result'] for entry in entries), [5, 6, 7, 8, 9, 100, 200, 300])
+        ids = [entry['id'] for entry in entries]
+        self.assertEqual(ids, sorted(ids))
+
+    def test_query_by_time(self):
+        """Тест фильтра по времени записи."""
+        store = self.make_store()
+        self.fill(store)
+        entries = list(store)
+        middle = entries[10]['timestamp']
+        newer = store.query(since=middle, limit=100)
+        self.assertTrue(all(entry['timestamp'] >= middle for entry in newer))
+        self.assertIn(entries[-1]['id'], [entry['id'] for entry in newer])
+        self.assertEqual(store.query(until=entries[0]['timestamp'] - 1), [])
+
+    def test_query_combined_with_cursor(self):
+        """Тест сочетания фильтров и курсора after_id."""
+        store = self.make_store()
+        self.fill(store)
+        first = store.query(operation='add', min_result=2, limit=3)
+        self.assertEqual([entry['result'] for entry in first], [2, 3, 4])
+        rest = store.query(operation='add', min_result=2, after_id=first[-1]['id'], limit=100)
+        self.assertEqual([entry['result'] for entry in rest], [5, 6, 7, 8, 9])
+
+    def test_query_exact_and_decimal_results(self):
+        """Тест: диапазон по результату одинаков для float, больших целых, дробей и Decimal."""
+        store = self.make_store()
+        for result in (0.3, 10 ** 60, 3, Decimal('2.50'), Fraction(-1, 3), -2 ** 70, 3 ** 1000):
+            store.add(make_entry(result))
+        results = [entry['result'] for entry in store.query(min_result=0)]
+        self.assertEqual(results, [0.3, 10 ** 60, 3, Decimal('2.50'), 3 ** 1000])
+        results = [entry['result'] for entry in store.query(min_result=-1, max_result=2.5)]
+        self.assertEqual(results, [0.3, Decimal('2.50'), Fraction(-1, 3)])
+        self.assertEqual([entry['result'] for entry in store.query(max_result=-1)], [-2 ** 70])
+
+    def test_query_skips_deleted(self):
+        """Тест: удалённые записи не попадают в результат."""
+        store = self.make_store()
+        self.fill(store)
+        target = store.query(operation='divide', min_result=300, max_result=300)[0]
+        store.delete(target['id'])
+        self.assertEqual(store.query(min_result=300, max_result=300), [])
+
+
+class TestHistoryStoreQuery(QueryTestsMixin, unittest.TestCase):
+    """Тесты query() для хранилища в памяти."""
+
+    def make_store(self):
+        return HistoryStore()
+
+    def test_indexes_rebuilt_after_eviction(self):
+        """Тест: после массового вытеснения индексы перестраиваются и остаются верными."""
+        store = HistoryStore(max_size=100)
+        for i in range(5000):
+            store.add(make_entry(i, 'add' if i % 2 else 'divide'))
+        entries = store.query(operation='add', limit=1000)
+        self.assertEqual(len(entries), 50)
+        self.assertEqual(len(store.query(min_result=0, limit=1000)), 100)
+        self.assertLess(len(store._ids), 5000)
+
+    def test_query_matches_full_scan(self):
+        """Тест: выбор индекса и перебор частями дают тот же результат, что и полный перебор."""
+        store = HistoryStore()
+        operations = ('add', 'subtract', 'divide')
+        for i in range(3000):
+            # Результаты add отрицательные: пересечение add и min_result=0 пусто
+            operation = operations[i % 3]
+            store.add(make_entry(-i if operation == 'add' else i * 7 % 1000, operation))
+        for i in range(1, 3000, 5):
+            store.delete(i)
+        entries = list(store)
+        middle = entries[len(entries) // 2]['timestamp']
+        cases = [
+            {'operation': 'add', 'min_result': 0},
+            {'operation': 'divide', 'min_result': 990},
+            {'min_result': 0, 'limit': 50},
+            {'min_result': 500, 'max_result': 510, 'limit': 1000},
+            {'since': middle, 'operation': 'subtract', 'max_result': 10, 'limit': 1000},
+            {'operation': 'divide', 'after_id': 1500, 'limit': 20},
+        ]
+        with patch.object(HistoryStore, 'QUERY_CHUNK', 7):
+            for case in cases:
+                with self.subTest(**case):
+                    limit = case.get('limit', 100)
+                    expected = [
+                        entry for entry in entries
+                        if entry['id'] > case.get('after_id', 0)
+                        and entry['operation'] == case.get('operation', entry['operation'])
+                        and entry['timestamp'] >= case.get('since', 0)
+                        and case.get('min_result', -inf) <= entry['result'] <= case.get('max_result', inf)
+                    ][:limit]
+                    self.assertEqual(store.query(**case), expected)
+
+
+class TestSQLiteHistoryStoreQuery(QueryTestsMixin, unittest.TestCase):
+    """Тесты query() для хранилища SQLite."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def make_store(self):
+        store = SQLiteHistoryStore(os.path.join(self.directory, 'history.db'))
+        self.addCleanup(store.close)
+        return store
+
+
+class TestHistoryStoreConcurrency(unittest.TestCase):
+    """Нагрузочные тесты хранилища при параллельной работе потоков."""
+
+    THREADS = 8
+    PER_THREAD = 2000
+
+    def run_threads(self, target):
+        """Запускает target в нескольких потоках одновременно и ждёт завершения."""
+        barrier = threading.Barrier(self.THREADS)
+
+        def worker(index):
+            barrier.wait()
+            target(index)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_adds_have_unique_ids(self):
+        """Тест: при параллельном добавлении ID уникальны и записи не теряются."""
+        store = HistoryStore()
+        assigned = [[] for _ in range(self.THREADS)]
+
+        def add_many(index):
+            for i in range(self.PER_THREAD):
+                assigned[index].append(store.add(make_entry(i))['id'])
+
+        self.run_threads(add_many)
+
+        all_ids = [entry_id for ids in assigned for entry_id in ids]
+        total = self.THREADS * self.PER_THREAD
+        self.assertEqual(len(set(all_ids)), total)
+        self.assertEqual(sorted(all_ids), list(range(1, total + 1)))
+        self.assertEqual(len(store), total)
+
+    def test_queries_during_adds(self):
+        """Тест: поиск параллельно с добавлением и вытеснением возвращает только подходящие записи."""
+        store = HistoryStore(max_size=5000)
+        errors = []
+
+        def add_or_query(index):
+            for i in range(self.PER_THREAD):
+                if index % 2:
+                    store.add(make_entry(i % 100, 'add' if i % 3 else 'divide'))
+                    continue
+                try:
+                    entries = store.query(operation='divide', min_result=50, limit=20)
+                    ids = [entry['id'] for entry in entries]
+                    self.assertEqual(ids, sorted(set(ids)))
+                    self.assertTrue(all(
+                        entry['operation'] == 'divide' and entry['result'] >= 50 for entry in entries
+                    ))
+                except AssertionError as e:
+                    errors.append(e)
+
+        self.run_threads(add_or_query)
+        self.assertEqual(errors, [])
+
+    def test_concurrent_adds_and_deletes(self):
+        """Тест: удаления параллельно с добавлениями не теряют чужие записи."""
+        store = HistoryStore()
+        kept = [[] for _ in range(self.THREADS)]
+
+        def add_and_delete(index):
+            for i in range(self.PER_THREAD):
+                entry = store.add(make_entry(i))
+                if i % 2:
+                    self.assertIs(store.delete(entry['id']), entry)
+                else:
+                    kept[index].append(entry['id'])
+
+        self.run_threads(add_and_delete)
+
+        expected = sorted(entry_id for ids in kept for entry_id in ids)
+        self.assertEqual(sorted(entry['id'] for entry in store), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
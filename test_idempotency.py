@@ -0,0 +1,126 @@
+"""
+Модульные тесты для кэша ключей идемпотентности и его использования в API.
+"""
+
+import threading
+import unittest
+
+import api
+from idempotency import IdempotencyCache, IdempotencyConflict, IdempotencyKeyReused
+
+
+class TestIdempotencyCache(unittest.TestCase):
+    """Тесты класса IdempotencyCache."""
+
+    def test_replay_returns_stored_response(self):
+        """Тест: повтор с тем же ключом возвращает сохранённый ответ."""
+        cache = IdempotencyCache()
+        self.assertIsNone(cache.begin('k', 'request'))
+        cache.complete('k', 'response')
+        self.assertEqual(cache.begin('k', 'request'), 'response')
+
+    def test_key_reused_with_other_request(self):
+        """Тест: ключ с другим телом запроса отклоняется."""
+        cache = IdempotencyCache()
+        cache.begin('k', 'first')
+        cache.complete('k', 'response')
+        with self.assertRaises(IdempotencyKeyReused):
+            cache.begin('k', 'second')
+
+    def test_ttl_and_size_limit(self):
+        """Тест: записи истекают и вытесняются при переполнении."""
+        cache = IdempotencyCache(ttl=0)
+        cache.begin('k', 'request')
+        cache.complete('k', 'response')
+        self.assertIsNone(cache.begin('k', 'request'))
+
+        cache = IdempotencyCache(max_size=2)
+        for key in ('a', 'b', 'c'):
+            cache.begin(key, 'request')
+            cache.complete(key, key)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.begin('a', 'request'))
+        self.assertEqual(cache.begin('c', 'request'), 'c')
+
+    def test_concurrent_request_waits_for_first(self):
+        """Тест: запрос с ключом, который ещё выполняется, ждёт его ответа."""
+        cache = IdempotencyCache()
+        self.assertIsNone(cache.begin('k', 'request'))
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(cache.begin('k', 'request')))
+        waiter.start()
+        cache.complete('k', 'response')
+        waiter.join()
+        self.assertEqual(results, ['response'])
+
+    def test_abandoned_request(self):
+        """Тест: после сбоя ожидающий получает конфликт, а ключ снова свободен."""
+        cache = IdempotencyCache(wait_timeout=5)
+        cache.begin('k', 'request')
+        errors = []
+
+        def wait():
+            try:
+                cache.begin('k', 'request')
+            except IdempotencyConflict as e:
+                errors.append(e)
+
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        cache.abandon('k')
+        waiter.join()
+        self.assertEqual(len(errors), 1)
+        self.assertIsNone(cache.begin('k', 'request'))
+
+
+class TestIdempotentCalculate(unittest.TestCase):
+    """Тесты заголовка Idempotency-Key в /api/calculate."""
+
+    def setUp(self):
+        self.client = api.app.test_client()
+        self.headers = {'X-API-Key': api.API_KEY}
+        self.client.delete('/api/history', headers=self.headers)
+        api.idempotency_cache.clear()
+
+    def calculate(self, payload, key):
+        headers = dict(self.headers, **{'Idempotency-Key': key})
+        return self.client.post('/api/calculate', json=payload, headers=headers)
+
+    def test_retry_returns_original_response(self):
+        """Тест: повтор не создаёт новую запись истории и возвращает тот же id."""
+        payload = {'operation': 'add', 'a': 2, 'b': 3}
+        first = self.calculate(payload, 'retry-1')
+        second = self.calculate(payload, 'retry-1')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.get_json(), first.get_json())
+        self.assertEqual(second.headers.get('Idempotent-Replayed'), 'true')
+        self.assertNotIn('Idempotent-Replayed', first.headers)
+        history = self.client.get('/api/history', headers=self.headers).get_json()
+        self.assertEqual(history['total'], 1)
+
+        third = self.calculate(payload, 'retry-2')
+        self.assertNotEqual(third.get_json()['id'], first.get_json()['id'])
+
+    def test_errors_are_replayed(self):
+        """Тест: ответ с ошибкой тоже сохраняется вместе с кодом."""
+        payload = {'operation': 'divide', 'a': 1, 'b': 0}
+        self.assertEqual(self.calculate(payload, 'error-1').status_code, 400)
+        replay = self.calculate(payload, 'error-1')
+        self.assertEqual(replay.status_code, 400)
+        self.assertEqual(replay.get_json()['error'], 'Деление на ноль невозможно!')
+
+    def test_key_reused_with_other_payload(self):
+        """Тест: тот же ключ с другим телом запроса - 422."""
+        self.calculate({'operation': 'add', 'a': 1, 'b': 1}, 'reuse')
+        response = self.calculate({'operation': 'add', 'a': 1, 'b': 2}, 'reuse')
+        self.assertEqual(response.status_code, 422)
+
+    def test_key_too_long(self):
+        """Тест: слишком длинный ключ отклоняется."""
+        response = self.calculate({'operation': 'add', 'a': 1, 'b': 1}, 'k' * 256)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
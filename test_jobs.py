@@ -0,0 +1,252 @@
+"""
+Модульные тесты для очереди заданий в пуле процессов.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from decimal import Decimal
+
+from calculator import decimal_context
+from jobs import (
+    CANCELLED, DONE, FAILED, CPULimitExceeded, JobCancelled, JobQueue, JobQueueFull
+)
+
+
+def loaded_modules():
+    """Имена модулей, загруженных в процессе (функция задания для тестов)."""
+    return sorted(sys.modules)
+
+
+def spin(seconds):
+    """Занимает процессор на seconds секунд (функция задания для тестов)."""
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+    return seconds
+
+
+class TestJobQueue(unittest.TestCase):
+    """Тесты класса JobQueue."""
+
+    def make_queue(self, **kwargs):
+        queue = JobQueue(**kwargs)
+        self.addCleanup(queue.shutdown)
+        return queue
+
+    def test_runs_calculator_operation(self):
+        """Тест: задание выполняет операцию калькулятора в отдельном процессе."""
+        queue = self.make_queue(workers=1)
+        job = queue.submit('power', 2.0, 10.0, context={'tag': 'x'})
+        self.assertTrue(job.wait(30))
+        self.assertEqual(job.status, DONE)
+        self.assertEqual(job.outcome(), 1024.0)
+        self.assertEqual(job.context, {'tag': 'x'})
+        self.assertIsNotNone(job.started)
+        self.assertIs(queue.get(job.id), job)
+
+    def test_exact_operation(self):
+        """Тест: точное вычисление возвращает большое целое без потерь."""
+        queue = self.make_queue(workers=1)
+        job = queue.submit('power', 3, 5000, 'exact')
+        job.wait(30)
+        self.assertEqual(job.outcome(), 3 ** 5000)
+
+    def test_decimal_operation(self):
+        """Тест: контекст десятичного режима передаётся в процесс задания."""
+        queue = self.make_queue(workers=1)
+        job = queue.submit('divide', 1, Decimal('3'), 'decimal', decimal_context(5, 'up'))
+        job.wait(30)
+        self.assertEqual(str(job.outcome()), '0.33334')
+
+    def test_operation_error(self):
+        """Тест: исключение операции передаётся в задание."""
+        queue = self.make_queue(workers=1)
+        job = queue.submit('divide', 1.0, 0.0)
+        job.wait(30)
+        self.assertEqual(job.status, FAILED)
+        with self.assertRaisesRegex(ValueError, 'Деление на ноль'):
+            job.outcome()
+
+    def test_cpu_limit(self):
+        """Тест: задание, превысившее лимит процессорного времени, прерывается, процесс переиспользуется."""
+        queue = self.make_queue(function=spin, workers=1, cpu_limit=0.5)
+        job = queue.submit(30)
+        self.assertTrue(job.wait(30))
+        self.assertEqual(job.status, FAILED)
+        self.assertIsInstance(job.error, CPULimitExceeded)
+
+        next_job = queue.submit(0.01)
+        next_job.wait(30)
+        self.assertEqual(next_job.status, DONE)
+        self.assertEqual(queue.stats()['limit_exceeded'], 1)
+
+    def test_cancel_running_job(self):
+        """Тест: отмена выполняющегося задания завершает процесс, очередь продолжает работу."""
+        queue = self.make_queue(function=spin, workers=1, cpu_limit=60)
+        job = queue.submit(60)
+        deadline = time.monotonic() + 30
+        while job.started is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIs(queue.cancel(job.id), job)
+        self.assertEqual(job.status, CANCELLED)
+        with self.assertRaises(JobCancelled):
+            job.outcome()
+
+        next_job = queue.submit(0.01)
+        self.assertTrue(next_job.wait(30))
+        self.assertEqual(next_job.status, DONE)
+
+    def test_cancel_queued_and_finished(self):
+        """Тест: задание в очереди отменяется сразу, завершённое не меняется."""
+        queue = self.make_queue(function=spin, workers=1)
+        running = queue.submit(0.2)
+        queued = queue.submit(0.01)
+        queue.cancel(queued.id)
+        self.assertEqual(queued.status, CANCELLED)
+        running.wait(30)
+        self.assertEqual(queue.cancel(running.id).status, DONE)
+        self.assertIsNone(queue.cancel(12345))
+
+    def test_queue_full(self):
+        """Тест: при переполнении очереди новое задание отклоняется."""
+        queue = self.make_queue(function=spin, workers=1, max_pending=1)
+        queue.submit(0.5)
+        with self.assertRaises(JobQueueFull):
+            for _ in range(3):
+                queue.submit(0.5)
+
+    def test_on_finish_runs_before_result_is_visible(self):
+        """Тест: on_finish вызывается до публикации результата задания."""
+        seen = []
+        queue = self.make_queue(
+            workers=1, on_finish=lambda job: seen.append((job.is_finished, job.outcome()))
+        )
+        job = queue.submit('add', 1.0, 2.0)
+        job.wait(30)
+        self.assertEqual(seen, [(False, 3.0)])
+
+    def test_cancel_while_result_in_flight(self):
+        """Тест: результат отменённого задания отбрасывается, on_finish не вызывается."""
+        finished = []
+        queue = self.make_queue(function=spin, workers=1, cpu_limit=60, on_finish=finished.append)
+        job = queue.submit(60)
+        deadline = time.monotonic() + 30
+        while job.started is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        queue.cancel(job.id)
+        # Результат, пришедший от процесса уже после отмены
+        queue._complete(job, DONE, 60)
+        self.assertEqual(finished, [])
+        self.assertEqual(job.status, CANCELLED)
+        self.assertIsInstance(job.error, JobCancelled)
+        self.assertEqual(queue.stats()['completed'], 0)
+
+    def test_cancel_during_on_finish(self):
+        """Тест: задание, результат которого уже обрабатывается, не отменяется."""
+        entered = threading.Event()
+        release = threading.Event()
+
+        def on_finish(job):
+            entered.set()
+            release.wait(30)
+
+        queue = self.make_queue(workers=1, on_finish=on_finish)
+        job = queue.submit('add', 1.0, 2.0)
+        self.assertTrue(entered.wait(30))
+        self.assertIs(queue.cancel(job.id), job)
+        release.set()
+        self.assertTrue(job.wait(30))
+        self.assertEqual(job.status, DONE)
+        self.assertEqual(job.outcome(), 3.0)
+        self.assertEqual(queue.stats()['cancelled'], 0)
+
+    def wait_started(self, job):
+        deadline = time.monotonic() + 30
+        while job.started is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_same_key_computed_once(self):
+        """Тест: задания с одним ключом вычисляются один раз, у каждого свой номер и on_finish."""
+        finished = []
+        queue = self.make_queue(function=spin, workers=2, max_pending=1, on_finish=finished.append)
+        jobs = [queue.submit(0.3, key='spin', context={'n': n}) for n in range(5)]
+        self.assertEqual(len({job.id for job in jobs}), 5)
+        for job in jobs:
+            self.assertTrue(job.wait(30))
+            self.assertEqual(job.outcome(), 0.3)
+        self.assertEqual(sorted(job.context['n'] for job in finished), [0, 1, 2, 3, 4])
+        stats = queue.stats()
+        self.assertEqual((stats['completed'], stats['coalesced'], stats['workers']), (5, 4, 1))
+
+        # После завершения ключ свободен: следующее задание вычисляется заново
+        again = queue.submit(0.01, key='spin')
+        again.wait(30)
+        self.assertEqual(again.outcome(), 0.01)
+        self.assertEqual(queue.stats()['coalesced'], 4)
+
+    def test_cancel_one_of_coalesced_jobs(self):
+        """Тест: отмена первого задания не прерывает вычисление, которое ждут другие."""
+        queue = self.make_queue(function=spin, workers=1, cpu_limit=60)
+        first = queue.submit(0.5, key='k')
+        self.wait_started(first)
+        second = queue.submit(0.5, key='k')
+        third = queue.submit(0.5, key='k')
+        self.assertEqual(second.status, 'running')
+        queue.cancel(first.id)
+        queue.cancel(third.id)
+        self.assertTrue(second.wait(30))
+        self.assertEqual(second.status, DONE)
+        self.assertEqual((first.status, third.status), (CANCELLED, CANCELLED))
+        self.assertIsInstance(first.error, JobCancelled)
+
+    def test_cancel_all_coalesced_jobs_stops_computation(self):
+        """Тест: когда вычисления никто не ждёт, процесс завершается."""
+        queue = self.make_queue(function=spin, workers=1, cpu_limit=60)
+        first = queue.submit(60, key='k')
+        self.wait_started(first)
+        second = queue.submit(60, key='k')
+        queue.cancel(first.id)
+        queue.cancel(second.id)
+        next_job = queue.submit(0.01, key='k')
+        self.assertTrue(next_job.wait(30))
+        self.assertEqual(next_job.status, DONE)
+
+    def test_worker_does_not_run_main_script(self):
+        """Тест: процесс-исполнитель не выполняет скрипт, запустивший сервер (python api.py)."""
+        directory = os.path.dirname(os.path.abspath(__file__))
+        script = textwrap.dedent(f"""
+            import json
+            import sys
+            sys.path.insert(0, {directory!r})
+            import api
+            from jobs import JobQueue
+            from test_jobs import loaded_modules
+
+            if __name__ == '__main__':
+                queue = JobQueue(function=loaded_modules, workers=1)
+                job = queue.submit()
+                job.wait(60)
+                print(json.dumps(job.outcome()))
+                queue.shutdown()
+        """)
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as file:
+            file.write(script)
+        self.addCleanup(os.remove, file.name)
+        output = subprocess.run(
+            [sys.executable, file.name], capture_output=True, text=True, check=True, timeout=120
+        ).stdout
+        modules = json.loads(output.strip().splitlines()[-1])
+        self.assertIn('calculator', modules)
+        self.assertNotIn('api', modules)
+        self.assertNotIn('flask', modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
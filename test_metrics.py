@@ -0,0 +1,111 @@
+"""
+Модульные тесты для модуля метрик.
+"""
+
+import threading
+import unittest
+
+import api
+from metrics import Counter, GaugeFunction, Histogram, Registry
+
+
+class TestMetrics(unittest.TestCase):
+    """Тесты счётчиков, гистограмм и текстового формата."""
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_with_labels(self):
+        """Тест счётчика с метками."""
+        counter = Counter('requests_total', 'Запросы', ('status',), registry=self.registry)
+        counter.inc('200')
+        counter.inc('200', amount=2)
+        counter.inc('400')
+        self.assertEqual(counter.value('200'), 3)
+        text = self.registry.render()
+        self.assertIn('# TYPE requests_total counter', text)
+        self.assertIn('requests_total{status="200"} 3', text)
+        self.assertIn('requests_total{status="400"} 1', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Тест: корзины гистограммы накопительные, есть _sum и _count."""
+        histogram = Histogram('latency_seconds', 'Время', buckets=(0.1, 1.0), registry=self.registry)
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_sum 2.65', text)
+        self.assertIn('latency_seconds_count 4', text)
+
+    def test_gauge_function_and_escaping(self):
+        """Тест показателя-функции и экранирования значений меток."""
+        GaugeFunction('queue', 'Очередь', lambda: {('a"b',): 5}, ('name',), registry=self.registry)
+        GaugeFunction('disabled', 'Выключено', lambda: None, registry=self.registry)
+        text = self.registry.render()
+        self.assertIn('queue{name="a\\"b"} 5', text)
+        self.assertNotIn('\ndisabled ', text)
+
+    def test_duplicate_name_rejected(self):
+        """Тест: два показателя с одним именем не регистрируются."""
+        Counter('dup', 'Первый', registry=self.registry)
+        with self.assertRaises(ValueError):
+            Counter('dup', 'Второй', registry=self.registry)
+
+    def test_concurrent_increments(self):
+        """Тест: параллельные увеличения не теряются."""
+        counter = Counter('concurrent_total', 'Счётчик', registry=self.registry)
+        histogram = Histogram('concurrent_seconds', 'Время', registry=self.registry)
+
+        def work():
+            for _ in range(5000):
+                counter.inc()
+                histogram.observe(0.001)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.value(), 20000)
+        self.assertEqual(histogram.count(), 20000)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    """Тесты эндпоинта /api/metrics."""
+
+    def setUp(self):
+        self.client = api.app.test_client()
+        self.headers = {'X-API-Key': api.API_KEY}
+
+    def test_calculate_is_recorded(self):
+        """Тест: вычисления учитываются по операциям и кодам ответа."""
+        before = api.OPERATIONS_TOTAL.value('power', 200)
+        errors_before = api.OPERATIONS_TOTAL.value('divide', 400)
+        self.client.post('/api/calculate', json={'operation': 'power', 'a': 2, 'b': 3},
+                         headers=self.headers)
+        self.client.post('/api/calculate', json={'operation': 'divide', 'a': 1, 'b': 0},
+                         headers=self.headers)
+        self.assertEqual(api.OPERATIONS_TOTAL.value('power', 200), before + 1)
+        self.assertEqual(api.OPERATIONS_TOTAL.value('divide', 400), errors_before + 1)
+
+        response = self.client.get('/api/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        text = response.get_data(as_text=True)
+        self.assertIn('calculator_operation_duration_seconds_count{operation="power"}', text)
+        self.assertIn('calculator_http_requests_total{endpoint="calculate",method="POST",status="200"}', text)
+        self.assertIn('calculator_history_entries ', text)
+
+    def test_unknown_operations_share_one_label(self):
+        """Тест: неизвестные операции не порождают новых меток."""
+        self.client.post('/api/calculate', json={'operation': 'modulo', 'a': 1, 'b': 2},
+                         headers=self.headers)
+        text = self.client.get('/api/metrics').get_data(as_text=True)
+        self.assertNotIn('operation="modulo"', text)
+        self.assertIn('operation="invalid"', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
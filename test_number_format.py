@@ -0,0 +1,71 @@
+"""
+Модульные тесты для вывода точных результатов.
+"""
+
+import sys
+import unittest
+from decimal import Decimal
+from fractions import Fraction
+
+from number_format import (
+    DISPLAY_DIGITS, digit_count, display, format_number, is_large, to_decimal_string
+)
+
+
+class TestDisplay(unittest.TestCase):
+    """Тесты краткого вывода чисел."""
+
+    def test_small_values_unchanged(self):
+        """Тест: float и небольшие целые выводятся как есть, дроби - строкой p/q."""
+        self.assertEqual(display(1.5), 1.5)
+        self.assertEqual(display(1024), 1024)
+        self.assertEqual(display(Fraction(-1, 3)), '-1/3')
+        self.assertEqual(display(Decimal('0.30')), '0.30')
+        self.assertEqual(format_number(15.0), '15.0')
+        self.assertFalse(is_large(10 ** (DISPLAY_DIGITS - 2)))
+
+    def test_scientific(self):
+        """Тест: большое число выводится в научной записи без полного преобразования."""
+        value = 3 ** 2000000
+        self.assertTrue(is_large(value))
+        self.assertEqual(display(value), '3.2317616635983165234e+954242')
+        self.assertEqual(display(-value), '-3.2317616635983165234e+954242')
+        self.assertEqual(display(10 ** 5000 - 1), '1.0000000000000000000e+5000')
+        self.assertEqual(display(Fraction(1, 3 ** 5000)), '2.4758618143895702080e-2386')
+
+    def test_truncated(self):
+        """Тест: сокращённая запись - первые и последние цифры."""
+        self.assertEqual(display(10 ** 5000, 'truncated'), '1' + '0' * 19 + '...' + '0' * 20)
+        self.assertEqual(display(10 ** 5000 - 1, 'truncated'), '9' * 20 + '...' + '9' * 20)
+        self.assertEqual(display(3 ** 10000, 'truncated'), '16313501853426258743...41498105206552200001')
+
+
+class TestDecimalConversion(unittest.TestCase):
+    """Тесты полной десятичной записи и количества цифр."""
+
+    def setUp(self):
+        # Для сравнения со стандартным str() снимается ограничение длины
+        limit = sys.get_int_max_str_digits()
+        sys.set_int_max_str_digits(0)
+        self.addCleanup(sys.set_int_max_str_digits, limit)
+
+    def test_to_decimal_string_matches_str(self):
+        """Тест: запись совпадает со str() для чисел разной длины и знака."""
+        for value in (0, -7, 2 ** 4096, -(3 ** 20000) + 1, 10 ** 30000, 7 ** 31337):
+            with self.subTest(bits=value.bit_length()):
+                self.assertEqual(to_decimal_string(value), str(value))
+        self.assertEqual(to_decimal_string(Fraction(2 ** 20000, 3)), f'{2 ** 20000}/3')
+        self.assertEqual(to_decimal_string(Decimal('-1.25E+3')), '-1.25E+3')
+
+    def test_digit_count_near_powers_of_ten(self):
+        """Тест: количество цифр точное и на границе разряда."""
+        for exponent in (5000, 12345):
+            power = 10 ** exponent
+            for value in (power - 1, power, power + 1):
+                with self.subTest(exponent=exponent, value=value - power):
+                    self.assertEqual(digit_count(value), len(str(value)))
+        self.assertEqual(digit_count(-(3 ** 20000)), len(str(3 ** 20000)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Модульные тесты для профилирования запросов API.
+"""
+
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import api
+from profiling import ProfileStore, ProfilingMiddleware, format_stats
+
+
+def simple_app(environ, start_response):
+    """Минимальное WSGI-приложение для тестов."""
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [str(sum(range(1000))).encode()]
+
+
+class TestProfilingMiddleware(unittest.TestCase):
+    """Тесты выбора запросов и хранения профилей."""
+
+    def call(self, middleware, **environ):
+        return b''.join(middleware(dict(environ, REQUEST_METHOD='GET', PATH_INFO='/x'),
+                                   lambda status, headers, exc_info=None: None))
+
+    def test_not_selected_requests_are_not_profiled(self):
+        """Тест: без заголовка и выборки профиль не снимается."""
+        store = ProfileStore()
+        middleware = ProfilingMiddleware(simple_app, store, admin_key='admin')
+        self.assertEqual(self.call(middleware), b'499500')
+        self.assertEqual(self.call(middleware, HTTP_X_PROFILE='1'), b'499500')
+        self.assertEqual(self.call(middleware, HTTP_X_PROFILE='1', HTTP_X_ADMIN_KEY='wrong'), b'499500')
+        self.assertEqual(len(store), 0)
+
+    def test_admin_header_profiles_request(self):
+        """Тест: заголовок X-Profile с ключом администратора включает профилирование."""
+        store = ProfileStore()
+        middleware = ProfilingMiddleware(simple_app, store, admin_key='admin')
+        self.assertEqual(self.call(middleware, HTTP_X_PROFILE='1', HTTP_X_ADMIN_KEY='admin'), b'499500')
+        info = store.list()[0]
+        self.assertEqual((info['method'], info['path'], info['status']), ('GET', '/x', 200))
+        self.assertIn('simple_app', format_stats(store.get(info['id'])[1]))
+
+    def test_sampling_and_store_bound(self):
+        """Тест: выборка с долей 1 профилирует всё, хранилище ограничено."""
+        store = ProfileStore(max_size=3)
+        middleware = ProfilingMiddleware(simple_app, store, sample_rate=1.0)
+        for _ in range(5):
+            self.call(middleware)
+        self.assertEqual([info['id'] for info in store.list()], [5, 4, 3])
+        self.assertIsNone(store.get(1))
+
+
+    def test_streaming_response_not_buffered(self):
+        """Тест: бесконечный поток не буферизуется и не занимает профилировщик."""
+        def event_stream(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/event-stream; charset=utf-8')])
+
+            def events():
+                yield b'retry: 3000\n\n'
+                while True:
+                    yield b': keep-alive\n\n'
+            return events()
+
+        store = ProfileStore()
+        middleware = ProfilingMiddleware(event_stream, store, sample_rate=1.0)
+        stream = middleware({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/stream'},
+                            lambda status, headers, exc_info=None: None)
+        self.assertEqual(next(iter(stream)), b'retry: 3000\n\n')
+        self.assertEqual(len(store), 0)
+
+        # Следующий выбранный запрос профилируется, пока поток ещё открыт
+        middleware.app = simple_app
+        self.assertEqual(self.call(middleware), b'499500')
+        self.assertEqual(len(store), 1)
+
+    def test_api_streams_are_not_profiled(self):
+        """Тест: потоковые эндпоинты API отвечают построчно и при выборке."""
+        client = api.app.test_client()
+        headers = {'X-API-Key': api.API_KEY}
+        with patch.object(api.request_profiler, 'sample_rate', 1.0):
+            count = len(api.profile_store)
+            response = client.post(
+                '/api/calculate/stream', data=b'{"operation": "add", "a": 1, "b": 2}',
+                headers=headers
+            )
+            self.assertIn('"result": 3', response.get_data(as_text=True))
+            self.assertEqual(len(api.profile_store), count)
+            client.get('/api/health')
+            self.assertEqual(len(api.profile_store), count + 1)
+
+
+class TestProfilingEndpoints(unittest.TestCase):
+    """Тесты административных эндпоинтов профилей."""
+
+    def setUp(self):
+        self.client = api.app.test_client()
+        self.headers = {'X-API-Key': api.API_KEY, 'X-Admin-Key': 'admin-secret'}
+        self.previous_key = api.request_profiler.admin_key
+        api.request_profiler.admin_key = 'admin-secret'
+        api.profile_store.clear()
+
+    def tearDown(self):
+        api.request_profiler.admin_key = self.previous_key
+        api.profile_store.clear()
+
+    def test_profile_download_in_pstats_format(self):
+        """Тест: профиль запроса скачивается и читается модулем pstats."""
+        response = self.client.post('/api/calculate', json={'operation': 'add', 'a': 1, 'b': 2},
+                                    headers=dict(self.headers, **{'X-Profile': '1'}))
+        self.assertEqual(response.get_json()['result'], 3)
+
+        profiles = self.client.get('/api/admin/profiles', headers=self.headers).get_json()['profiles']
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]['path'], '/api/calculate')
+
+        response = self.client.get(f"/api/admin/profiles/{profiles[0]['id']}", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'profile.pstats')
+        with open(path, 'wb') as f:
+            f.write(response.data)
+        functions = [name for _, _, name in pstats.Stats(path).stats]
+        self.assertIn('calculate', functions)
+
+        text = self.client.get(f"/api/admin/profiles/{profiles[0]['id']}?format=text",
+                               headers=self.headers)
+        self.assertIn('function calls', text.get_data(as_text=True))
+
+    def test_admin_key_required(self):
+        """Тест: без ключа администратора профили недоступны и не снимаются."""
+        headers = {'X-API-Key': api.API_KEY, 'X-Profile': '1'}
+        self.client.get('/api/history', headers=headers)
+        self.assertEqual(len(api.profile_store), 0)
+        self.assertEqual(self.client.get('/api/admin/profiles', headers=headers).status_code, 401)
+        response = self.client.get('/api/admin/profiles/999', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Модульные тесты для общего кэша результатов операций.
+"""
+
+import threading
+import unittest
+from decimal import Decimal
+from fractions import Fraction
+from unittest.mock import patch
+
+import api
+import result_cache
+from calculator import decimal_context
+from result_cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+    """Тесты класса ResultCache."""
+
+    def test_hits_and_misses(self):
+        """Тест: повторное вычисление берётся из кэша."""
+        cache = ResultCache()
+        self.assertEqual(cache.calculate('power', 3, 200, 'exact'), 3 ** 200)
+        self.assertEqual(cache.calculate('power', 3, 200, 'exact'), 3 ** 200)
+        self.assertEqual(cache.calculate('power', 3, 201, 'exact'), 3 ** 201)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 2, 2))
+        self.assertAlmostEqual(stats['hit_ratio'], 1 / 3)
+        self.assertEqual(cache.get('power', 3, 200, 'exact'), 3 ** 200)
+        self.assertIsNone(cache.get('power', 3, 202, 'exact'))
+
+    def test_trivial_operations_bypass(self):
+        """Тест: float и дешёвые точные операции вычисляются без кэша, большие точные - кэшируются."""
+        cache = ResultCache(min_cost=100)
+        self.assertEqual(cache.calculate('power', 2.0, 10.0), 1024.0)
+        self.assertEqual(cache.calculate('add', 1, 2, 'exact'), 3)
+        self.assertEqual(cache.calculate('divide', Decimal('1.5'), 3, 'decimal'), Decimal('0.5'))
+        self.assertEqual(cache.stats()['bypassed'], 3)
+        self.assertEqual(len(cache), 0)
+
+        cache.calculate('multiply', 3 ** 200, 7 ** 200, 'exact')
+        self.assertEqual(len(cache), 1)
+
+    def test_key_includes_mode_and_decimal_context(self):
+        """Тест: одинаковые по значению операнды разных режимов, записи и контекстов не смешиваются."""
+        cache = ResultCache()
+        self.assertEqual(cache.calculate('power', 2, -1, 'exact'), Fraction(1, 2))
+        self.assertEqual(cache.calculate('power', 2, -1, 'decimal'), Decimal('0.5'))
+        self.assertEqual(str(cache.calculate('power', Decimal('1.5'), 2, 'decimal')), '2.25')
+        self.assertEqual(str(cache.calculate('power', Decimal('1.50'), 2, 'decimal')), '2.2500')
+        self.assertEqual(str(cache.calculate('power', 2, Decimal('0.5'), 'decimal', decimal_context(3))), '1.41')
+        self.assertEqual(str(cache.calculate('power', 2, Decimal('0.5'), 'decimal', decimal_context(5))), '1.4142')
+        self.assertEqual(cache.stats()['hits'], 0)
+
+    def test_memory_limit_evicts_least_recently_used(self):
+        """Тест: при превышении объёма вытесняются давно не использованные записи."""
+        cache = ResultCache(max_bytes=1500)
+        cache.calculate('power', 7, 1000, 'exact')
+        cache.calculate('power', 7, 1001, 'exact')
+        cache.calculate('power', 7, 1000, 'exact')
+        cache.calculate('power', 7, 1002, 'exact')
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], 1500)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertIsNotNone(cache.get('power', 7, 1002, 'exact'))
+        self.assertIsNone(cache.get('power', 7, 1001, 'exact'))
+
+        cache.calculate('power', 7, 10000, 'exact')
+        self.assertIsNone(cache.get('power', 7, 10000, 'exact'))
+
+    def test_errors_are_not_cached(self):
+        """Тест: ошибка вычисления не сохраняется в кэше."""
+        cache = ResultCache()
+        for _ in range(2):
+            with self.assertRaisesRegex(ValueError, 'Деление на ноль'):
+                cache.calculate('power', 0, -1, 'exact')
+        self.assertEqual((cache.stats()['misses'], len(cache)), (2, 0))
+
+    def test_disabled(self):
+        """Тест: выключенный кэш ничего не сохраняет и не считает."""
+        cache = ResultCache(enabled=False)
+        self.assertEqual(cache.calculate('power', 3, 200, 'exact'), 3 ** 200)
+        cache.put('power', 3, 200, 3 ** 200, 'exact')
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['misses'], stats['bypassed']), (0, 0, 0))
+        with self.assertRaises(ValueError):
+            ResultCache(max_bytes=0)
+
+    def test_concurrent_calculations(self):
+        """Тест: параллельные вычисления не нарушают учёт памяти и счётчики."""
+        cache = ResultCache(max_bytes=20000)
+        errors = []
+
+        def worker(offset):
+            try:
+                for i in range(200):
+                    exponent = 100 + (i + offset) % 50
+                    self.assertEqual(cache.calculate('power', 3, exponent, 'exact'), 3 ** exponent)
+            except AssertionError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        stats = cache.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 1600)
+        self.assertLessEqual(stats['bytes'], 20000)
+
+
+class TestSharedCache(unittest.TestCase):
+    """Тесты общего кэша в API, боте и выражениях."""
+
+    def setUp(self):
+        patcher = patch.object(result_cache, 'shared_cache', ResultCache())
+        self.cache = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = api.app.test_client()
+        self.headers = {'X-API-Key': api.API_KEY}
+        self.client.delete('/api/history', headers=self.headers)
+
+    def test_api_uses_cache_and_records_history(self):
+        """Тест: повтор запроса берётся из кэша, но каждая запись истории - своя."""
+        payload = {'operation': 'power', 'a': 3, 'b': 300, 'mode': 'exact'}
+        first = self.client.post('/api/calculate', json=payload, headers=self.headers).get_json()
+        second = self.client.post('/api/calculate', json=payload, headers=self.headers).get_json()
+        self.assertEqual(first['result'], second['result'])
+        self.assertNotEqual(first['id'], second['id'])
+        self.assertEqual(len(api.calculation_history), 2)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        metrics = self.client.get('/api/metrics').get_data(as_text=True)
+        self.assertIn('calculator_result_cache{state="hits"} 1', metrics)
+
+    def test_cached_expensive_result_skips_job_queue(self):
+        """Тест: результат выполненного задания кэшируется, повтор выполняется сразу."""
+        payload = {'operation': 'power', 'a': 3, 'b': 300, 'mode': 'exact'}
+        with patch.object(api, 'JOB_COST_THRESHOLD', 0):
+            job = self.client.post('/api/calculate', json=payload, headers=self.headers)
+            self.assertEqual(job.status_code, 202)
+            self.client.get(f"{job.get_json()['url']}?wait=30", headers=self.headers)
+            response = self.client.post('/api/calculate', json=payload, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_bot_and_expressions_use_cache(self):
+        """Тест: вычисления бота и выражений точного режима проходят через общий кэш."""
+        from expression_engine import evaluate
+        from telegram_bot import calculate_operation
+        self.assertEqual(calculate_operation('^', 2, 100, 'exact')[0], 2 ** 100)
+        self.assertEqual(evaluate('2 ^ 100 + 1', 'exact'), 2 ** 100 + 1)
+        self.assertEqual(evaluate('1.5 ^ 0.5', 'decimal', decimal_context(4)), Decimal('1.225'))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
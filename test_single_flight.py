@@ -0,0 +1,177 @@
+"""
+Модульные тесты для объединения одинаковых одновременных вычислений.
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import api
+import result_cache
+from calculator import calculate
+from single_flight import SingleFlight
+
+
+def wait_until(condition, timeout=10.0):
+    """Ждёт выполнения условия (не дольше timeout секунд)."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Тесты класса SingleFlight."""
+
+    def run_concurrently(self, group, key, function, count):
+        results = [None] * count
+
+        def worker(index):
+            try:
+                results[index] = group.do(key, function)
+            except ValueError as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        return results
+
+    def test_concurrent_calls_share_one_computation(self):
+        """Тест: одновременные вызовы с одним ключом выполняют функцию один раз."""
+        group = SingleFlight()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            wait_until(lambda: group.coalesced == 4)
+            return 3 ** 1000
+
+        results = self.run_concurrently(group, 'power', compute, 5)
+        self.assertEqual(results, [3 ** 1000] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(group.stats(), {'in_flight': 0, 'executed': 1, 'coalesced': 4})
+
+    def test_error_is_shared(self):
+        """Тест: исключение вычисления получает каждый объединённый вызов."""
+        group = SingleFlight()
+
+        def fail():
+            wait_until(lambda: group.coalesced == 2)
+            raise ValueError('Деление на ноль невозможно!')
+
+        results = self.run_concurrently(group, 'divide', fail, 3)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(group.stats()['executed'], 1)
+
+    def test_sequential_calls_are_not_coalesced(self):
+        """Тест: после завершения ключ освобождается, следующий вызов вычисляет заново."""
+        group = SingleFlight()
+        self.assertEqual(group.do('k', lambda: 1), 1)
+        self.assertEqual(group.do('k', lambda: 2), 2)
+        self.assertEqual(group.stats(), {'in_flight': 0, 'executed': 2, 'coalesced': 0})
+
+
+class TestApiCoalescing(unittest.TestCase):
+    """Тесты объединения одинаковых запросов к /api/calculate."""
+
+    def setUp(self):
+        patcher = patch.object(api, 'in_flight_calculations', SingleFlight())
+        self.group = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.headers = {'X-API-Key': api.API_KEY}
+        api.app.test_client().delete('/api/history', headers=self.headers)
+        self.calls = []
+
+    def slow_calculate(self, expected_coalesced):
+        """Вычисление, которое ждёт, пока к нему присоединятся остальные запросы."""
+        def compute(name, a, b, mode='float', context=None):
+            self.calls.append((name, a, b))
+            wait_until(lambda: self.group.coalesced >= expected_coalesced)
+            return calculate(name, a, b, mode, context)
+        return compute
+
+    def post_concurrently(self, payloads):
+        responses = [None] * len(payloads)
+
+        def worker(index):
+            client = api.app.test_client()
+            responses[index] = client.post('/api/calculate', json=payloads[index], headers=self.headers)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(len(payloads))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        return responses
+
+    def test_identical_requests_coalesced(self):
+        """Тест: одинаковые запросы вычисляются один раз, но получают свои записи истории."""
+        payload = {'operation': 'power', 'a': 3, 'b': 500, 'mode': 'exact'}
+        with patch.object(result_cache, 'calculate', self.slow_calculate(3)):
+            responses = self.post_concurrently([payload] * 4)
+
+        bodies = [response.get_json() for response in responses]
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertEqual({body['result'] for body in bodies}, {3 ** 500})
+        self.assertEqual(len({body['id'] for body in bodies}), 4)
+        self.assertEqual(len(api.calculation_history), 4)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.group.stats()['coalesced'], 3)
+        metrics = api.app.test_client().get('/api/metrics').get_data(as_text=True)
+        self.assertIn('calculator_coalesced_calculations{state="coalesced"} 3', metrics)
+
+    def test_different_requests_not_coalesced(self):
+        """Тест: запросы с разными операндами, режимами или контекстами вычисляются отдельно."""
+        payloads = [
+            {'operation': 'power', 'a': 3, 'b': 500, 'mode': 'exact'},
+            {'operation': 'power', 'a': 3, 'b': 501, 'mode': 'exact'},
+            {'operation': 'power', 'a': '1.5', 'b': 2, 'mode': 'decimal'},
+            {'operation': 'power', 'a': '1.50', 'b': 2, 'mode': 'decimal'},
+            {'operation': 'power', 'a': '1.5', 'b': 2, 'mode': 'decimal', 'precision': 2},
+        ]
+        with patch.object(result_cache, 'calculate', self.slow_calculate(0)):
+            responses = self.post_concurrently(payloads)
+        self.assertEqual(len(self.calls), 5)
+        self.assertEqual(self.group.stats()['coalesced'], 0)
+        results = [response.get_json()['result'] for response in responses[2:]]
+        self.assertEqual(results, ['2.25', '2.2500', '2.2'])
+
+    def test_identical_jobs_share_computation(self):
+        """Тест: одинаковые дорогие вычисления - свои задания и записи истории, одно вычисление."""
+        client = api.app.test_client()
+        payload = {'operation': 'power', 'a': 7, 'b': 1000000, 'mode': 'exact'}
+        before = api.job_queue.stats()['coalesced']
+        with patch.object(api, 'JOB_COST_THRESHOLD', 0):
+            responses = [
+                client.post('/api/calculate', json=payload, headers=self.headers) for _ in range(4)
+            ]
+        self.assertEqual({response.status_code for response in responses}, {202})
+        self.assertEqual(len({response.get_json()['job_id'] for response in responses}), 4)
+        self.assertEqual(api.job_queue.stats()['coalesced'] - before, 3)
+
+        jobs = [
+            client.get(f"{response.get_json()['url']}?wait=30", headers=self.headers).get_json()
+            for response in responses
+        ]
+        self.assertEqual({job['status'] for job in jobs}, {'done'})
+        self.assertEqual(len({job['result']['id'] for job in jobs}), 4)
+        self.assertEqual(len({job['result']['result'] for job in jobs}), 1)
+        self.assertEqual(len(api.calculation_history), 4)
+
+    def test_float_and_disabled_bypass(self):
+        """Тест: float и выключенное объединение вычисляются без SingleFlight."""
+        client = api.app.test_client()
+        client.post('/api/calculate', json={'operation': 'power', 'a': 2, 'b': 10}, headers=self.headers)
+        with patch.object(api, 'REQUEST_COALESCING', False):
+            client.post(
+                '/api/calculate', json={'operation': 'power', 'a': 2, 'b': 10, 'mode': 'exact'},
+                headers=self.headers
+            )
+        self.assertEqual(self.group.stats()['executed'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,11 +5,16 @@
 
 import os
 import unittest
+from decimal import Decimal
+from fractions import Fraction
 from unittest.mock import patch, MagicMock, AsyncMock
 import asyncio
 
 # Импорт модулей для тестирования
-from telegram_integration import send_calculation_notification, send_notification_sync
+from telegram_integration import (
+    send_calculation_notification, send_notification_sync, NotificationDispatcher,
+    AsyncNotificationDispatcher
+)
 
 
 class TestTelegramIntegration(unittest.TestCase):
@@ -89,6 +94,74 @@ class TestTelegramIntegration(unittest.TestCase):
             mock_async.assert_called_once()
 
 
+class TestNotificationDispatcher(unittest.TestCase):
+    """Тесты для фонового диспетчера уведомлений."""
+    
+    @patch('telegram_integration.Bot')
+    def test_enqueue_and_drain_on_shutdown(self, mock_bot_class):
+        """Тест: сообщения отправляются одним ботом и дочитываются при остановке."""
+        mock_bot = AsyncMock()
+        mock_bot_class.return_value = mock_bot
+        
+        dispatcher = NotificationDispatcher(bot_token='test_token').start()
+        for i in range(3):
+            self.assertTrue(dispatcher.enqueue(f"{i} + 0 = {i}", i, "123"))
+        dispatcher.shutdown()
+        
+        self.assertEqual(mock_bot_class.call_count, 1)
+        self.assertEqual(mock_bot.send_message.call_count, 3)
+        stats = dispatcher.stats()
+        self.assertEqual(stats['sent'], 3)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertFalse(stats['running'])
+    
+    def test_queue_overflow_is_dropped(self):
+        """Тест: при переполнении очереди сообщения отбрасываются."""
+        dispatcher = NotificationDispatcher(bot_token='test_token', max_queue_size=1)
+        self.assertTrue(dispatcher.enqueue("1 + 1 = 2", 2, "123"))
+        self.assertFalse(dispatcher.enqueue("2 + 2 = 4", 4, "123"))
+        stats = dispatcher.stats()
+        self.assertEqual(stats['queue_depth'], 1)
+        self.assertEqual(stats['dropped'], 1)
+    
+    def test_enqueue_without_token(self):
+        """Тест: без токена сообщение не ставится в очередь."""
+        dispatcher = NotificationDispatcher(bot_token='')
+        self.assertFalse(dispatcher.enqueue("1 + 1 = 2", 2, "123"))
+        self.assertEqual(dispatcher.stats()['enqueued'], 0)
+
+
+class TestAsyncNotificationDispatcher(unittest.TestCase):
+    """Тесты для диспетчера уведомлений в цикле событий (ASGI)."""
+    
+    @patch('telegram_integration.Bot')
+    def test_enqueue_and_drain_on_shutdown(self, mock_bot_class):
+        """Тест: сообщения отправляются задачей asyncio и дочитываются при остановке."""
+        mock_bot = AsyncMock()
+        mock_bot_class.return_value = mock_bot
+        
+        async def run():
+            dispatcher = AsyncNotificationDispatcher(bot_token='test_token').start()
+            for i in range(3):
+                self.assertTrue(dispatcher.enqueue(f"{i} + 0 = {i}", i, "123"))
+            await dispatcher.shutdown()
+            return dispatcher.stats()
+        
+        stats = asyncio.run(run())
+        self.assertEqual(mock_bot_class.call_count, 1)
+        self.assertEqual(mock_bot.send_message.call_count, 3)
+        self.assertEqual(stats['sent'], 3)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertFalse(stats['running'])
+    
+    def test_queue_overflow_is_dropped(self):
+        """Тест: при переполнении очереди сообщения отбрасываются."""
+        dispatcher = AsyncNotificationDispatcher(bot_token='test_token', max_queue_size=1)
+        self.assertTrue(dispatcher.enqueue("1 + 1 = 2", 2, "123"))
+        self.assertFalse(dispatcher.enqueue("2 + 2 = 4", 4, "123"))
+        self.assertEqual(dispatcher.stats()['dropped'], 1)
+
+
 class TestTelegramBot(unittest.TestCase):
     """Тесты для Telegram-бота."""
     
@@ -100,6 +173,13 @@ class TestTelegramBot(unittest.TestCase):
         self.assertEqual(symbol, '+')
         self.assertIsNone(error)
     
+    def test_calculate_operation_aliases(self):
+        """Тест обозначений операций из реестра калькулятора."""
+        from telegram_bot import calculate_operation
+        self.assertEqual(calculate_operation('×', 7, 6), (42, '×', None))
+        self.assertEqual(calculate_operation('**', 2, 10), (1024, '^', None))
+        self.assertEqual(calculate_operation('mod', 1, 2), (None, None, "Неизвестная операция"))
+    
     def test_calculate_operation_divide_by_zero(self):
         """Тест обработки деления на ноль."""
         from telegram_bot import calculate_operation
@@ -107,6 +187,91 @@ class TestTelegramBot(unittest.TestCase):
         self.assertIsNone(result)
         self.assertIsNotNone(error)
         self.assertIn('ноль', error.lower())
+    
+    def make_update(self, text):
+        """Создаёт заглушку Update с текстом сообщения."""
+        update = MagicMock()
+        update.message.text = text
+        update.message.reply_text = AsyncMock()
+        update.effective_user.id = 42
+        return update
+    
+    def test_handle_message_expression(self):
+        """Тест вычисления выражения со скобками и приоритетом."""
+        from telegram_bot import handle_message, user_results
+        update = self.make_update('2 × (3 + 4)')
+        asyncio.run(handle_message(update, MagicMock()))
+        self.assertEqual(user_results[42]['result'], 14)
+        self.assertIn('2 * (3 + 4) = 14', update.message.reply_text.call_args[0][0])
+    
+    def test_exact_mode_and_digits(self):
+        """Тест: /mode exact включает точный режим, /digits присылает все цифры файлом."""
+        from telegram_bot import digits_command, handle_message, mode_command, user_modes, user_results
+        self.addCleanup(user_modes.pop, 42, None)
+        update = self.make_update('/mode exact')
+        asyncio.run(mode_command(update, MagicMock(args=['exact'])))
+        self.assertEqual(user_modes[42], 'exact')
+
+        update = self.make_update('0.1 + 0.2')
+        asyncio.run(handle_message(update, MagicMock()))
+        self.assertIn('0.1 + 0.2 = 3/10', update.message.reply_text.call_args[0][0])
+
+        update = self.make_update('2 ^ 5000')
+        asyncio.run(handle_message(update, MagicMock()))
+        self.assertIn('e+1505', update.message.reply_text.call_args[0][0])
+        self.assertIn('/digits', update.message.reply_text.call_args[0][0])
+
+        update = self.make_update('/digits')
+        update.message.reply_document = AsyncMock()
+        asyncio.run(digits_command(update, MagicMock()))
+        document = update.message.reply_document.call_args.kwargs['document']
+        self.assertEqual(len(document.getvalue()), 1506)
+        self.assertEqual(user_results[42]['result'], 2 ** 5000)
+
+    def test_calculate_operation_exact(self):
+        """Тест точного режима calculate_operation."""
+        from telegram_bot import calculate_operation
+        self.assertEqual(calculate_operation('/', 1, 3, 'exact'), (Fraction(1, 3), '÷', None))
+        result, symbol, error = calculate_operation('^', 10, 100000000, 'exact')
+        self.assertIsNone(result)
+        self.assertIn('слишком велик', error)
+
+    def test_decimal_mode(self):
+        """Тест: /mode decimal с точностью и округлением применяется к выражениям пользователя."""
+        from telegram_bot import handle_message, mode_command, user_decimal_contexts, user_modes
+        self.addCleanup(user_modes.pop, 42, None)
+        self.addCleanup(user_decimal_contexts.pop, 42, None)
+        update = self.make_update('/mode decimal 5 down')
+        asyncio.run(mode_command(update, MagicMock(args=['decimal', '5', 'down'])))
+        self.assertIn('точность 5, округление down', update.message.reply_text.call_args[0][0])
+
+        update = self.make_update('0.1 + 0.2 + 2 / 3')
+        asyncio.run(handle_message(update, MagicMock()))
+        self.assertIn('0.1 + 0.2 + 2 / 3 = 0.96666', update.message.reply_text.call_args[0][0])
+
+        update = self.make_update('/mode decimal 0')
+        asyncio.run(mode_command(update, MagicMock(args=['decimal', '0'])))
+        self.assertIn('Точность должна быть', update.message.reply_text.call_args[0][0])
+        self.assertEqual(user_decimal_contexts[42].prec, 5)
+
+        asyncio.run(mode_command(self.make_update('/mode float'), MagicMock(args=['float'])))
+        self.assertNotIn(42, user_decimal_contexts)
+
+    def test_calculate_operation_decimal(self):
+        """Тест десятичного режима calculate_operation."""
+        from calculator import decimal_context
+        from telegram_bot import calculate_operation
+        self.assertEqual(calculate_operation('+', Decimal('0.1'), Decimal('0.2'), 'decimal'),
+                         (Decimal('0.3'), '+', None))
+        result, _, _ = calculate_operation('/', 1, 3, 'decimal', decimal_context(3))
+        self.assertEqual(str(result), '0.333')
+
+    def test_handle_message_unrecognized(self):
+        """Тест сообщения, которое не является выражением."""
+        from telegram_bot import handle_message
+        update = self.make_update('привет')
+        asyncio.run(handle_message(update, MagicMock()))
+        self.assertIn('Не удалось распознать', update.message.reply_text.call_args[0][0])
 
 
 if __name__ == '__main__':